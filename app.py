@@ -1,50 +1,138 @@
+import threading
 import flask
-from flask import request, render_template, g
-import plotly.express as px
-import plotly.graph_objects as go
-from models_container.EstimatorsBTC import EstimatorsBTC
-from graph_creator.graph_creator import GraphBTC
+from flask import request, render_template, g, abort
+from datetime import datetime, timedelta
+from config import ESTIMATORS as ESTIMATORS_CONFIG
+from model_tracking.DataBaseLogs import DBLogs, PERFORMANCE_WINDOWS
+from model_tracking.SingleFlight import SingleFlight
+from graph_creator.graph_spec import GraphSpecBTC
+
+# The serving path only reads from SQLite. Heavy ML and data-provider modules (sklearn, yfinance, pandas)
+# are imported lazily through EstimatorsBTC, in a background thread and only when today's predictions are missing.
+
+DATE_FORMAT = r"%Y-%m-%d"
+ESTIMATORS = list(ESTIMATORS_CONFIG)
 
 
 app = flask.Flask(__name__)
+refreshing = threading.Lock()   # held while this process computes today's predictions in the background
 
 
-def get_engine():
-    if 'engine' not in g:
-        g.engine = EstimatorsBTC()
-    return g.engine
+def get_db() -> DBLogs:
+    if 'db' not in g:
+        g.db = DBLogs()
+        g.db.connect()
+    return g.db
 
 
+@app.teardown_appcontext
 def close_database(exception):
-    engine = g.pop('engine', None)
+    db = g.pop('db', None)
+
+    if db is not None:
+        db.close()
+
+
+def get_prediction_today() -> dict:
+    """
+    Reads today's predictions from the database (one query). When they are missing, their computation is started in
+    the background and the most recent stored predictions are served, so a request never waits for the fitting.
+    """
+    today = datetime.now().strftime(DATE_FORMAT)
+    db = get_db()
+    predictions = db.get_predictions_date(today) or {}
+
+    if all(est in predictions for est in ESTIMATORS):
+        return predictions
+
+    refresh_predictions(today)
+    last_date = db.get_last_prediction_date()
+    return (db.get_predictions_date(last_date) or {}) if last_date else {}
+
+
+def refresh_predictions(today: str) -> None:
+    """
+    Computes today's predictions in a background thread, unless this process is computing them already.
+    The thread takes the predict:<date> SingleFlight lease without waiting, so only one process computes them
+    (the daily job included). A failure (e.g. yfinance down) is printed, the next request tries again.
+    """
+    if not refreshing.acquire(blocking=False):
+        return
+
+    def compute() -> None:
+        try:
+            from models_container.EstimatorsBTC import EstimatorsBTC   # lazy: pulls in sklearn, yfinance and pandas
+            engine = EstimatorsBTC()    # its own connection, the ones of the requests belong to their threads
+            try:
+                SingleFlight(engine.modelDB, f"predict:{today}", wait=0).run(
+                    compute=lambda: engine.store_predictions_today(today), done=lambda: engine.modelDB.does_prediction_exists(today))
+            finally:
+                engine.close()
+        except Exception as exception_error:
+            print(f"Today's predictions failed: {exception_error!r}")
+        finally:
+            refreshing.release()
 
-    if engine is not None:
-        engine.close()
+    threading.Thread(target=compute, daemon=True).start()
 
 
 @app.route("/")
 def home():
-    engine = get_engine()
-    pred = engine.get_prediction_today()
-    
+    pred = get_prediction_today()
+
     return render_template("models.html",
-                            gb_pred = pred["GradientBoost"],
-                            ab_pred = pred["AdaBoost"],
-                            rf_pred = pred["RandomForest"])
+                            gb_pred = pred.get("GradientBoost"),
+                            ab_pred = pred.get("AdaBoost"),
+                            rf_pred = pred.get("RandomForest"))
 
 
 @app.route("/performance/<period>/")
 def performance(period):
-    db = get_engine().modelDB
-    performance_rf = db.get_model_performance("RandomForest")
-    performance_ab = db.get_model_performance("AdaBoost")
-    performance_gb = db.get_model_performance("GradientBoost")
-    
-    fig_rf = GraphBTC("RandomForest", performance_rf, [period]).get_graph()
-    fig_ab = GraphBTC("AdaBoost", performance_ab, [period]).get_graph()
-    fig_gb = GraphBTC("GradientBoost", performance_gb, [period]).get_graph()
-
-    return render_template("performance.html", rf_graph=fig_rf.to_json(), ab_graph=fig_ab.to_json(), gb_graph=fig_gb.to_json())
+    if period not in PERFORMANCE_WINDOWS:
+        abort(404)
+
+    # one query for all the models (and one for their confidence bands), only the columns that are drawn
+    columns = dict(metrics=["precision", "recall"], windows=[period])
+    performance = get_db().query_performance_all(**columns) or {}
+    bands = get_db().query_bands_all(**columns) or {}
+
+    # a model without metric rows yet (e.g. fewer than 150 predictions) gets an empty figure
+    empty = {"date": [], **{f"{metric}_{window}": [] for metric in columns["metrics"] for window in columns["windows"]}}
+    fig_rf = GraphSpecBTC("RandomForest", performance.get("RandomForest", empty), [period], bands=bands.get("RandomForest")).to_json()
+    fig_ab = GraphSpecBTC("AdaBoost", performance.get("AdaBoost", empty), [period], bands=bands.get("AdaBoost")).to_json()
+    fig_gb = GraphSpecBTC("GradientBoost", performance.get("GradientBoost", empty), [period], bands=bands.get("GradientBoost")).to_json()
+
+    return render_template("performance.html", rf_graph=fig_rf, ab_graph=fig_ab, gb_graph=fig_gb, period=period)
+
+
+@app.route("/api/performance/<model>")
+def api_performance(model):
+    """
+    Precision and recall of the model for one window as JSON columns, only the dates after `since` (all of them without it).
+    The performance page polls it with the last date it has, so a refresh costs the same however long the history is.
+    """
+    window = request.args.get("window", "total")
+    if model not in ESTIMATORS or window not in PERFORMANCE_WINDOWS:
+        abort(404)
+
+    since = request.args.get("since")
+    start_date = None
+    if since:
+        try:
+            start_date = (datetime.strptime(since, DATE_FORMAT) + timedelta(days=1)).strftime(DATE_FORMAT)   # newer than since
+        except ValueError:
+            abort(400)
+
+    performance = get_db().query_model_performance(model, metrics=["precision", "recall"], windows=[window], start_date=start_date)
+    if performance is None:
+        abort(500)
+
+    # NaN is not valid JSON
+    to_list = lambda values: [None if value != value else value for value in values.tolist()]
+    return flask.jsonify(model=model, window=window,
+                         date=performance["date"].tolist(),
+                         precision=to_list(performance[f"precision_{window}"]),
+                         recall=to_list(performance[f"recall_{window}"]))
 
 
 @app.route("/about/")
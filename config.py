@@ -0,0 +1,76 @@
+import os
+
+# Performance windows in days, "total" means the whole history up to the date.
+# Windows are stored in the long-format models_metrics table, so adding e.g. "90" or "365" needs no schema change.
+PERFORMANCE_WINDOWS = ["total", "7", "14", "30"]
+
+# Metrics calculated for every window.
+PERFORMANCE_METRICS = ["recall", "precision", "accuracy", "specificity", "neg_pred_value"]
+
+# Estimators trained with the best hyperparameters found in the hyperparameter tuning process.
+#   class / params  - the estimator and its hyperparameters
+#   fast_backend    - optional faster alternative, registered as a model of its own (its "name") when USE_FAST_BACKENDS is on
+#   threshold       - probability threshold of the class 1
+#   performance     - initial performance measured in the tuning process (Real-Time-Scenario CV)
+#   multi_output    - the class fits several targets at once, so all the longer HORIZONS share one fit
+# Every estimator declared here is registered in the models table automatically.
+ESTIMATORS = {
+    "GradientBoost": {"class": "sklearn.ensemble.GradientBoostingClassifier",
+                      "params": {"learning_rate": 0.1, "max_depth": 3, "n_estimators": 100},
+                      "fast_backend": {"name": "GradientBoostHist",
+                                       "class": "sklearn.ensemble.HistGradientBoostingClassifier",
+                                       "params": {"learning_rate": 0.1, "max_depth": 3, "max_leaf_nodes": 8, "max_iter": 100, "early_stopping": False}},
+                      "threshold": 0.53,
+                      "type": "anchored",
+                      "performance": {"recall": 0.51, "precision": 0.65}},
+
+    "RandomForest": {"class": "sklearn.ensemble.RandomForestClassifier",
+                     "params": {"bootstrap": False, "max_depth": 21, "n_estimators": 160},
+                     "threshold": 0.55,
+                     "type": "anchored",
+                     "multi_output": True,
+                     "performance": {"recall": 0.45, "precision": 0.63}},
+
+    "AdaBoost": {"class": "sklearn.ensemble.AdaBoostClassifier",
+                 "params": {"algorithm": "SAMME"},
+                 "threshold": 0.52,
+                 "type": "anchored",
+                 "performance": {"recall": 0.76, "precision": 0.64}},
+}
+
+# Run the fast_backend of the estimators that declare one next to them (e.g. GradientBoostHist, a HistGradientBoostingClassifier,
+# next to the GradientBoostingClassifier of GradientBoost), so their predictions, metrics and costs can be compared.
+USE_FAST_BACKENDS = os.environ.get("CRYPTO_EYE_FAST_BACKENDS", "0") == "1"
+
+# Single-flight computation of today's predictions across processes (app workers, the daily job):
+# the process holding the lease computes, the others wait up to PREDICTION_WAIT seconds for its result.
+# A lease expires after PREDICTION_LEASE_TTL seconds, so a crashed holder does not block the others forever.
+PREDICTION_LEASE_TTL = 15 * 60
+PREDICTION_WAIT = 10
+
+# Prediction horizons in days (1 = the next day). All of them are predicted from one shared feature matrix,
+# the next-day prediction is the one shown in the app.
+HORIZONS = [1, 3, 7]
+
+# Confidence bands of the windowed metrics: moving block bootstrap over the stored predictions.
+# BANDS_BLOCK consecutive days are resampled together (the predictions of neighbouring days are not independent).
+BANDS_RESAMPLES = 1000
+BANDS_BLOCK = 5
+BANDS_ALPHA = 0.1   # 90% bands
+
+# Feature drift monitor: every feature is cut into DRIFT_BINS fixed bins (the quantiles of the training matrix) and the
+# histograms of the last DRIFT_WINDOWS days are compared with the training ones (PSI and KS).
+# A mean PSI over the features above DRIFT_REFIT_PSI in the DRIFT_REFIT_WINDOW window forces a refit on a new reference:
+# the reference is rebased on the last DRIFT_TRAIN_WINDOW days and the estimators are trained from its first day on
+# (until the next trigger), so the days before the regime change leave the training set.
+DRIFT_BINS = 10
+DRIFT_WINDOWS = [30, 90]
+DRIFT_REFIT_WINDOW = 90
+DRIFT_REFIT_PSI = 0.25
+DRIFT_TRAIN_WINDOW = 365
+
+# Strategy backtest of the stored predictions: long for `horizon` days when the class 1 probability is above the threshold,
+# in cash otherwise. Every combination of threshold, fee (share of the traded amount) and sizing rule is simulated at once.
+BACKTEST_THRESHOLDS = [round(0.45 + 0.01 * i, 2) for i in range(21)]      # 0.45 - 0.65, includes the estimators' thresholds
+BACKTEST_FEES = [0.0, 0.001, 0.0025]
+BACKTEST_SIZING = ["full", "half", "kelly"]
@@ -19,6 +19,7 @@ class StockTool(discord.Client):
             await channel.send(f":)")
 
 
-client = StockTool(intents=INTENTS)
-client.run(SECRET)
+if __name__ == "__main__":
+    client = StockTool(intents=INTENTS)
+    client.run(SECRET)
 
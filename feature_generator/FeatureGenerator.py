@@ -1,6 +1,7 @@
+import re
 import pandas as pd
 import numpy as np
-from typing import List
+from typing import List, Sequence, Tuple
 
 
 class FeatureGenerator:
@@ -132,7 +133,69 @@ class FeatureGenerator:
         return data[features].iloc[:-1, :], data[[output_name]].iloc[:-1, :], data[features].iloc[-1, :]
 
 
+    @staticmethod
+    def generate_features_lean(data: pd.DataFrame, features: List[str], HLC_targets: List[str] = ["High", "Low", "Close"], output_name: str = "Growth",
+                               horizons: Sequence[int] = (1,)) -> Tuple[pd.DataFrame, pd.DataFrame, pd.Series]:
+        """
+        Lean version of generate_features: reads only the High, Low and Close columns, computes only the requested features
+        (RSI<w>, CCI<w>, SO<w>, SOMA3<w>, MACD) straight into a preallocated float32 matrix and does not modify `data`.
 
-        
+        Parameters:
+            data (pd.DataFrame): The input stock data.
+            features (List[str]): List of feature names to include in dataset.
+            HLC_targets (List[str], optional): List of column names for High, Low, and Close targets. Defaults to ["High", "Low", "Close"].
+            output_name (str, optional): Name of the output variable. Defaults to "Growth".
+            horizons (Sequence[int], optional): Horizons in days of the targets, all built on the same feature matrix. Defaults to (1,).
+                                                The target of horizon h is named target_name(output_name, h) and is -1 for the last
+                                                h - 1 rows of y_train, whose outcome is not known yet.
+
+        Returns:
+            Tuple[pd.DataFrame, pd.DataFrame, pd.Series]: X_train, y_train (one column per horizon) and X_today like generate_features,
+                                                          X is a float32 view of the matrix.
+        """
+        high, low, close = (data[column].astype(np.float64) for column in HLC_targets)
+
+        matrix = np.empty((len(data), len(features)), dtype=np.float32)
+        for j, feature in enumerate(features):
+            matrix[:, j] = FeatureGenerator.__feature(feature, high, low, close).values
+
+        # Target variables: growth of the close price after h days, -1 where the day h days later is not known yet
+        targets = np.full((len(data), len(horizons)), -1, dtype=np.int8)
+        for j, h in enumerate(horizons):
+            targets[:-h, j] = close.values[:-h] < close.values[h:]
+        targets[-1] = 0     # the last row is X_today (like the shift(-1) comparison of generate_features)
+
+        valid = ~np.isnan(matrix).any(axis=1)
+        matrix, targets, index = matrix[valid], targets[valid], data.index[valid]
+
+        X = pd.DataFrame(matrix, index=index, columns=features, copy=False)
+        y = pd.DataFrame(targets, index=index, columns=[FeatureGenerator.target_name(output_name, h) for h in horizons])
 
+               # X_train       y_train        X_today
+        return X.iloc[:-1, :], y.iloc[:-1, :], X.iloc[-1, :]
 
+
+    @staticmethod
+    def target_name(output_name: str, horizon: int) -> str:
+        """Name of the target column of the horizon: e.g. "Growth" for 1 day (as before) and "Growth_7" for 7 days."""
+        return output_name if horizon == 1 else f"{output_name}_{horizon}"
+
+
+    @staticmethod
+    def __feature(name: str, high: pd.Series, low: pd.Series, close: pd.Series) -> pd.Series:
+        """Computes a single feature given its name (e.g. "RSI14", "CCI3", "SO7", "SOMA314", "MACD")."""
+        if name == "MACD":
+            return FeatureGenerator.MACD_hist(close)[0]
+
+        match = re.fullmatch(r"(RSI|CCI|SOMA3|SO)(\d+)", name)
+        if match is None:
+            raise ValueError(f"Unknown feature: {name}")
+
+        kind, window = match.group(1), int(match.group(2))
+        if kind == "RSI":
+            return FeatureGenerator.RSI(close, window=window)
+        if kind == "CCI":
+            return FeatureGenerator.CCI(high, low, close, window=window)
+        if kind == "SO":
+            return FeatureGenerator.stochastic_oscilator(close, window=window)
+        return FeatureGenerator.stochastic_oscilator(close, window=window).rolling(3).mean()   # SOMA3<w>
@@ -1,13 +1,13 @@
 import plotly.graph_objects as go
 import pandas as pd
-from typing import List
+from typing import List, Optional
 
 
 
 class GraphBTC:
 
 
-    def __init__(self, model: str, performance_data: pd.DataFrame, windows: List[str]):
+    def __init__(self, model: str, performance_data: pd.DataFrame, windows: List[str], bands: Optional[pd.DataFrame] = None):
         self.label = model
         self.performance_data = performance_data
 
@@ -18,6 +18,11 @@ class GraphBTC:
             for window in windows:
                 self.add_line(metric, window, color)
                 self.add_points(metric, window, color)
+
+        if bands is not None:
+            for color, metric in zip(["0, 0, 255", "128, 0, 128"], ["precision", "recall"]):
+                for window in windows:
+                    self.add_band(bands, metric, window, color)
                 
         for window in windows:
             self.annotate(window)
@@ -48,6 +53,19 @@ class GraphBTC:
                         marker=dict(color=color, size=10)))
         
     
+    def add_band(self, bands: pd.DataFrame, metric: str, window: str, rgb: str) -> None:
+        # bootstrap confidence band (DBLogs.query_bands_all columns), the lower trace fills up to the upper one
+        for bound, fill in [("upper", "none"), ("lower", "tonexty")]:
+            self.figure.add_trace(go.Scatter(
+                    x=bands["date"],
+                    y=bands[f"{metric}_{window}_{bound}"],
+                    mode="lines",
+                    line=dict(width=0, color=f"rgba({rgb}, 0)"),
+                    fill=fill,
+                    fillcolor=f"rgba({rgb}, 0.15)",
+                    hoverinfo="skip"))
+
+
     def set_layout(self) -> None:
         self.figure.update_layout(
             xaxis=dict(
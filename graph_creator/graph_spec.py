@@ -0,0 +1,209 @@
+import json
+import numpy as np
+from typing import List, Mapping, Optional
+
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Downsamples a series with the Largest-Triangle-Three-Buckets algorithm.
+
+    Parameters:
+        x (np.ndarray): Monotonic numeric x values.
+        y (np.ndarray): The y values. NaN values (gaps) are never preferred over finite ones, a bucket of gaps keeps its first point.
+        n_out (int): The target number of points (at least 3).
+
+    Returns:
+        np.ndarray: Sorted indices of the points that are kept (first and last are always kept).
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # the first and the last point are fixed, the rest is split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    finite = np.isfinite(y)
+    a = int(np.argmax(finite))      # the anchor is the last selected finite point
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # average finite point of the next bucket (or the last point for the final bucket), the anchor if there is none
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        known = finite[next_start:next_end]
+        if known.any():
+            avg_x = x[next_start:next_end][known].mean()
+            avg_y = y[next_start:next_end][known].mean()
+        else:
+            avg_x, avg_y = x[next_start:next_end].mean(), y[a]
+
+        # area of the triangle (a, candidate, average) for every candidate in the bucket, gaps never win
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        areas[~finite[start:end]] = -np.inf
+        selected[i + 1] = start + int(np.argmax(areas))
+        if finite[selected[i + 1]]:
+            a = selected[i + 1]
+
+    return selected
+
+
+
+def to_json_values(values: np.ndarray) -> list:
+    """Plain list of the values with NaN as None (null in JSON, a gap in the plot)."""
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+
+class GraphSpecBTC:
+    """
+    Plotly-free counterpart of GraphBTC. Builds the same figure as plain dicts straight from the
+    performance columns, downsampling long histories with LTTB to keep the payload small.
+    Optional bootstrap confidence bands (DBLogs.query_bands_all columns) are drawn as shaded areas after the lines.
+    """
+
+
+    def __init__(self, model: str, performance_data: Mapping, windows: List[str], max_points: int = 500, bands: Optional[Mapping] = None):
+        self.label = model
+        self.dates = np.asarray(performance_data["date"]).astype(str)
+        self.performance_data = performance_data
+        self.max_points = max_points
+
+        # numeric x axis for LTTB (days since epoch)
+        self.x_numeric = self.dates.astype("datetime64[D]").astype(np.int64)
+
+        self.traces = []
+        self.annotations = []
+
+        for color, metric in zip(["blue", "purple"], ["precision", "recall"]):
+            for window in windows:
+                values = np.asarray(performance_data[f"{metric}_{window}"], dtype=np.float64)
+                self.add_line(metric, values, color)
+                self.add_points(values, color)
+
+        # the bands come after the line traces, so the trace indices used by the page for the deltas do not move
+        if bands is not None and len(bands["date"]):
+            for color, metric in zip(["0, 0, 255", "128, 0, 128"], ["precision", "recall"]):
+                for window in windows:
+                    if f"{metric}_{window}_lower" in bands:
+                        self.add_band(bands, metric, window, color)
+
+        for window in windows:
+            self.annotate(window)
+
+        self.add_title()
+        self.layout = self.get_layout()
+
+
+    def add_line(self, metric: str, values: np.ndarray, color: str) -> None:
+        keep = lttb(self.x_numeric, values, self.max_points)
+        self.traces.append(dict(type="scatter",
+                                x=self.dates[keep].tolist(),
+                                y=to_json_values(values[keep]),
+                                mode="lines",
+                                name=f"{metric.capitalize()} Across All Time",
+                                opacity=0.7,
+                                line=dict(color=color, width=4)))
+
+
+    def add_points(self, values: np.ndarray, color: str) -> None:
+        ends = self.__finite_ends(values)
+        self.traces.append(dict(type="scatter",
+                                x=[str(self.dates[i]) for i in ends],
+                                y=[float(values[i]) for i in ends],
+                                mode="markers",
+                                marker=dict(color=color, size=10)))
+
+
+    def add_band(self, bands: Mapping, metric: str, window: str, rgb: str) -> None:
+        dates = np.asarray(bands["date"]).astype(str)
+        keep = np.unique(np.linspace(0, len(dates) - 1, min(len(dates), self.max_points)).astype(np.int64))
+        x = dates[keep].tolist()
+
+        for bound, fill in [("upper", "none"), ("lower", "tonexty")]:     # the lower trace fills up to the upper one
+            values = np.asarray(bands[f"{metric}_{window}_{bound}"], dtype=np.float64)[keep]
+            self.traces.append(dict(type="scatter",
+                                    x=x,
+                                    y=to_json_values(values),
+                                    mode="lines",
+                                    name=f"{metric.capitalize()} {bound} band",
+                                    line=dict(width=0, color=f"rgba({rgb}, 0)"),
+                                    fill=fill,
+                                    fillcolor=f"rgba({rgb}, 0.15)",
+                                    hoverinfo="skip"))
+
+
+    def annotate(self, window: str) -> None:
+
+        for label, color in zip(["Recall", "Precision"], ["purple", "blue"]):
+            y_trace = np.asarray(self.performance_data[f"{label.lower()}_{window}"], dtype=np.float64)
+            ends = self.__finite_ends(y_trace)
+            if not ends:
+                continue
+            first, last = float(y_trace[ends[0]]), float(y_trace[ends[-1]])
+            # left side annotation
+            self.annotations.append(dict(xref='paper', x=0.05, y=first,
+                                         xanchor='right', yanchor='middle',
+                                         text=label + ' {}%'.format(round(100*first)),
+                                         font=dict(family='Arial', size=14, color=color),
+                                         showarrow=False))
+            # right side annotation
+            self.annotations.append(dict(xref='paper', x=0.95, y=round(last, 2),
+                                         xanchor='left', yanchor='middle',
+                                         text='{}%'.format(round(100*last, 2)),
+                                         font=dict(family='Arial', size=14, color=color),
+                                         showarrow=False))
+
+
+    def add_title(self) -> None:
+        self.annotations.append(dict(xref='paper', yref='paper', x=0.0, y=1.05,
+                                     xanchor='left', yanchor='bottom',
+                                     text=self.label,
+                                     font=dict(family='Arial', size=30, color='rgb(37,37,37)'),
+                                     showarrow=False))
+
+
+    def get_layout(self) -> dict:
+        return dict(
+            xaxis=dict(
+                showline=True,
+                showgrid=True,
+                showticklabels=True,
+                linecolor='rgb(0, 0, 0)',
+                linewidth=2,
+                ticks='outside',
+                tickfont=dict(family='Arial', size=12, color='rgb(82, 82, 82)'),
+            ),
+            yaxis=dict(
+                showgrid=True,
+                zeroline=False,
+                showline=True,
+                showticklabels=False,
+            ),
+            autosize=False,
+            margin=dict(autoexpand=False, l=100, r=20, t=110),
+            showlegend=False,
+            plot_bgcolor='white',
+            annotations=self.annotations,
+        )
+
+
+    def get_spec(self) -> dict:
+        return {"data": self.traces, "layout": self.layout}
+
+
+    def to_json(self) -> str:
+        return json.dumps(self.get_spec(), separators=(",", ":"), allow_nan=False)     # NaN is not valid JSON, the values hold None instead
+
+
+    @staticmethod
+    def __finite_ends(values: np.ndarray) -> List[int]:
+        """Indices of the first and the last finite value (empty if there is none)."""
+        known = np.flatnonzero(np.isfinite(values))
+        return [int(known[0]), int(known[-1])] if len(known) else []
@@ -0,0 +1,294 @@
+import argparse
+import os
+import pickle
+import sys
+import numpy as np
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from config import DRIFT_TRAIN_WINDOW, PREDICTION_LEASE_TTL
+from model_tracking.ColumnarStore import ColumnarStore, COLUMNAR_PATH     # DuckDB is imported only when the store is created
+from model_tracking.DataBaseLogs import DB_PATH
+from model_tracking.DriftMonitor import DriftMonitor
+from model_tracking.SingleFlight import SingleFlight
+from models_container.EstimatorsBTC import EstimatorsBTC, DATE_FORMAT, HLC_COLUMNS
+
+ARTIFACTS_DIR = os.path.join("model_tracking", "data", "models")
+
+
+
+class Stage:
+
+    def __init__(self, name: str, run: Callable[[Optional[str]], str], depends_on: List[str]):
+        self.name = name
+        self.run = run                  # takes the previous watermark, returns the new one
+        self.depends_on = depends_on
+
+
+
+class DailyJob:
+    """
+    Daily update split into checkpointed stages:
+        ingest -> features -> drift -> fit -> predict -> labels -> performance [-> export]
+
+    Every stage stores a watermark in the job_checkpoints table. A stage whose watermark already
+    reached the run date is skipped, so a rerun only does the delta and a crashed run resumes
+    from the stage that failed. The drift stage can invalidate the fit checkpoint, so that a drift of the
+    features forces a refit on the recent days (DRIFT_TRAIN_WINDOW) even on a rerun.
+    """
+
+
+    def __init__(self, db_path: str = DB_PATH, workers: int = 1, days_back: int = 0, refit_every: int = 1,
+                 artifacts_dir: str = ARTIFACTS_DIR, force: bool = False, columnar_path: Optional[str] = None):
+        self.engine = EstimatorsBTC(db_path)
+        self.db = self.engine.modelDB
+        self.workers = workers
+        self.days_back = days_back
+        self.refit_every = refit_every
+        self.artifacts_dir = artifacts_dir
+        self.force = force
+        self.columnar_path = columnar_path
+        self.run_date = datetime.now().strftime(DATE_FORMAT)
+
+        self.frames = None      # (X, y, Xtoday) from FeatureGenerator, computed at most once per run
+        self.fitted = False
+
+        self.stages = {stage.name: stage for stage in [
+            Stage("ingest", self.ingest, []),
+            Stage("features", self.features, ["ingest"]),
+            Stage("drift", self.drift, ["features"]),
+            Stage("fit", self.fit, ["features", "drift"]),
+            Stage("predict", self.predict, ["fit"]),
+            Stage("labels", self.labels, ["features", "predict"]),
+            Stage("performance", self.performance, ["labels"]),
+        ]}
+        if columnar_path:
+            self.stages["export"] = Stage("export", self.export, ["performance"])
+
+
+    def run(self, until: Optional[str] = None) -> Dict[str, str]:
+        """
+        Runs the stages in dependency order (up to and including `until`).
+
+        Returns:
+            Dict[str, str]: The status of every visited stage ("skipped", "done" or "failed").
+        """
+        statuses = {}
+        for name in self.__order(until):
+            checkpoint = self.db.get_checkpoint(name)
+            watermark = checkpoint[0] if checkpoint else None
+
+            if not self.force and checkpoint and checkpoint[1] == "done" and watermark and watermark >= self.run_date:
+                statuses[name] = "skipped"
+                continue
+
+            print(f"--------- Running stage: {name} (watermark: {watermark}) ---------")
+            self.db.set_checkpoint(name, None, "running")
+            try:
+                new_watermark = self.stages[name].run(watermark)
+            except Exception as exception_error:
+                print(exception_error)
+                self.db.set_checkpoint(name, None, "failed", message=repr(exception_error))
+                statuses[name] = "failed"
+                break
+
+            self.db.set_checkpoint(name, new_watermark, "done")
+            statuses[name] = "done"
+
+        return statuses
+
+
+    def ingest(self, watermark: Optional[str]) -> str:
+        """Downloads the price history since the watermark (the whole history on the first run) into the btc_prices table."""
+        import yfinance as yf
+
+        bitcoin = yf.Ticker("BTC-USD")
+        if watermark is None:
+            data = bitcoin.history(period="max")
+        else:
+            data = bitcoin.history(start=watermark)     # the last stored day is downloaded again, it may have been incomplete
+
+        self.db.upsert_prices(zip(data.index.strftime(DATE_FORMAT), data["Open"], data["High"], data["Low"], data["Close"], data["Volume"]))
+        return self.db.get_last_price_date()
+
+
+    def features(self, watermark: Optional[str]) -> str:
+        """Generates the features from the cached price history and reports the peak memory used."""
+        self.frames = self.engine.set_data(self.db.get_prices(columns=HLC_COLUMNS), profile=True)
+        seconds, peak = self.engine.data_cost
+        print(f"Features: {self.engine.X.shape} {self.engine.X.dtype} in {seconds:.2f}s, peak memory {peak / 2**20:.1f} MiB"
+              f" (prices up to {self.frames[2].name.strftime(DATE_FORMAT)})")
+        return self.run_date    # not the last price date: it lags the run date (weekends, late data) and the stage would never be skipped
+
+
+    def drift(self, watermark: Optional[str]) -> str:
+        """
+        Adds the days not monitored yet (today's features included) to the feature drift histograms and stores their scores.
+        When the drift is over the threshold, the reference is rebased on the last DRIFT_TRAIN_WINDOW days of the training
+        matrix and the fit is forced: from then on the estimators are trained from the start of the new reference.
+        """
+        X, _, Xtoday = self.__get_frames()
+        dates = np.append(X.index.strftime(DATE_FORMAT), Xtoday.name.strftime(DATE_FORMAT))
+        rows = np.vstack([X.values, Xtoday.values])
+
+        monitor = DriftMonitor(self.db, self.engine.features)
+        if not monitor.has_reference():
+            monitor.rebase(dates[:-1], rows[:-1])     # the first reference is the training matrix of today's fit
+
+        report = monitor.update(dates, rows)
+        print(f"Drift: {len(np.unique(report['date']))} days added")
+
+        if monitor.should_refit():
+            print(f"Drift: the features moved away from the reference, refitting on the last {DRIFT_TRAIN_WINDOW} days")
+            days = dates[:-1].astype("datetime64[D]")
+            recent = days > days[-1] - np.timedelta64(DRIFT_TRAIN_WINDOW, "D")
+            monitor.rebase(dates[:-1][recent], rows[:-1][recent])
+            monitor.update(dates, rows)
+            self.db.set_checkpoint("fit", None, "stale")    # not "done", so the fit stage runs even if it already did today
+
+        return dates[-1]
+
+
+    def fit(self, watermark: Optional[str]) -> str:
+        """
+        Fits every estimator (and horizon) on the most recent data, from the training start of the drift reference on
+        (EstimatorsBTC.set_training_window), and stores them, so that a resumed run does not refit.
+        """
+        self.__get_frames()
+        self.engine.set_training_window()     # the same window as the app path (EstimatorsBTC.store_predictions_today)
+        self.engine.fit_estimators(workers=self.workers, profile=True)
+        self.engine.fit_horizon_estimators()
+        self.engine.store_costs(self.run_date)
+        self.fitted = True
+
+        os.makedirs(self.artifacts_dir, exist_ok=True)
+        with open(os.path.join(self.artifacts_dir, "estimators.pkl"), "wb") as file:
+            pickle.dump({"date": self.run_date, "estimators": self.engine.estimators,
+                         "horizon_estimators": self.engine.horizon_estimators}, file)
+
+        return self.run_date
+
+
+    def predict(self, watermark: Optional[str]) -> str:
+        """Stores today's predictions (if missing) and, with days_back, backtests the missing past dates."""
+        def compute() -> None:
+            self.__ensure_fitted()
+            predictions = self.engine.predict_horizons(profile=True)
+            self.db.insert_model_predictions(self.run_date, predictions, self.engine.probabilities)
+            self.engine.store_costs(self.run_date)
+
+        # the app may be computing today's predictions at the same time: wait for it as long as a lease can live
+        flight = SingleFlight(self.db, f"predict:{self.run_date}", wait=PREDICTION_LEASE_TTL)
+        if not flight.run(compute, done=lambda: self.db.does_prediction_exists(self.run_date)):
+            raise RuntimeError("Today's predictions are still being computed by another process.")
+
+        if self.days_back > 0:
+            self.engine.update_predictions(days_back=self.days_back, fill_labels=False, refit_every=self.refit_every)
+
+        return self.run_date
+
+
+    def labels(self, watermark: Optional[str]) -> str:
+        """Fills the real values of the predictions that are still missing them."""
+        _, y, _ = self.__get_frames()
+        report = self.engine.fill_real_predictions(start_date=None, end_date=None, y=y)
+        print(f"Labels: {report['filled'].sum()} dates filled, {(~report['filled']).sum()} skipped")
+        return self.run_date
+
+
+    def performance(self, watermark: Optional[str]) -> str:
+        """Updates the performance (and its confidence bands) of every estimator and horizon for the dates that are missing it."""
+        for est in self.engine.estimators:
+            for horizon in self.engine.horizons:
+                self.engine.update_performance(est, horizon)
+                self.engine.update_bands(est, horizon)
+        return self.run_date
+
+
+    def export(self, watermark: Optional[str]) -> str:
+        """Writes the Parquet snapshot of the performance history for the columnar analytics (needs DuckDB)."""
+        store = ColumnarStore(self.columnar_path)
+        try:
+            print(f"Exported {store.export(self.db)} performance rows to {self.columnar_path}")
+        finally:
+            store.close()
+        return self.run_date
+
+
+    def close(self) -> None:
+        self.engine.close()
+
+
+    def __get_frames(self) -> tuple:
+        if self.frames is None:
+            self.frames = self.engine.set_data(self.db.get_prices(columns=HLC_COLUMNS))
+        return self.frames
+
+
+    def __ensure_fitted(self) -> None:
+        """Loads the estimators fitted earlier today, or fits them again if there are none."""
+        if self.fitted:
+            return
+
+        path = os.path.join(self.artifacts_dir, "estimators.pkl")
+        if os.path.exists(path):
+            with open(path, "rb") as file:
+                stored = pickle.load(file)
+            if stored["date"] == self.run_date and "horizon_estimators" in stored:
+                self.engine.estimators = stored["estimators"]
+                self.engine.horizon_estimators = stored["horizon_estimators"]
+                self.__get_frames()     # self.Xtoday is needed for predicting
+                self.fitted = True
+                return
+
+        self.fit(None)
+
+
+    def __order(self, until: Optional[str]) -> List[str]:
+        """Topological order of the stages (only the ones needed for `until` if given)."""
+        order = []
+
+        def visit(name: str) -> None:
+            if name in order:
+                return
+            for dependency in self.stages[name].depends_on:
+                visit(dependency)
+            order.append(name)
+
+        for name in ([until] if until else self.stages):
+            visit(name)
+        return order
+
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Runs the checkpointed daily job: ingest -> features -> drift -> fit -> predict -> labels -> performance.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker threads used for fitting the estimators.")
+    parser.add_argument("--days-back", type=int, default=0, help="Also backtest the missing predictions for this many past days.")
+    parser.add_argument("--refit-every", type=int, default=1, help="Refit the estimators every k days while backtesting (with --days-back).")
+    parser.add_argument("--db", default=DB_PATH, help="Path to the SQLite database.")
+    parser.add_argument("--artifacts", default=ARTIFACTS_DIR, help="Directory for the fitted estimators.")
+    parser.add_argument("--until", default=None, help="Run only up to (and including) this stage.")
+    parser.add_argument("--force", action="store_true", help="Ignore the checkpoints and run every stage.")
+    parser.add_argument("--columnar", nargs="?", const=COLUMNAR_PATH, default=None,
+                        help="Also export the performance history to a Parquet snapshot (optionally at this path, needs DuckDB).")
+    args = parser.parse_args(argv)
+
+    start = datetime.now()
+    job = DailyJob(db_path=args.db, workers=args.workers, days_back=args.days_back, refit_every=args.refit_every, artifacts_dir=args.artifacts, force=args.force,
+                   columnar_path=args.columnar)
+    try:
+        statuses = job.run(until=args.until)
+    finally:
+        job.close()
+
+    for stage, status in statuses.items():
+        print(f"{stage:12} | {status}")
+    print(f"--------- Time taken: {datetime.now()-start} ---------")
+
+    return 1 if "failed" in statuses.values() else 0
+
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,46 +1,25 @@
-from models_container.EstimatorsBTC import EstimatorsBTC
-import datetime as dt
-import matplotlib.pyplot as plt
-from app import app
-
-DEBUG = False
-APP_TEST = True
-est = ["RandomForest", "AdaBoost", "GradientBoost"]
+import argparse
+import sys
 
 
 if __name__ == "__main__":
 
-    if APP_TEST:
-        app.run(debug=True)
-
+    parser = argparse.ArgumentParser(description="CryptoEye entry point.")
+    parser.add_argument("command", nargs="?", choices=["serve", "job"], default="serve",
+                        help="serve - runs the web app (default), job - runs the daily job (see job_runner.DailyJob --help).")
+    args, rest = parser.parse_known_args()
 
+    if args.command == "serve":
+        from app import app
+        app.run(debug=True)
 
     else:
-
-        if not DEBUG:
-            print("--------- Loading and preprocessing data ---------")
-            start = dt.datetime.now()
-            btc = EstimatorsBTC()
-            btc.update_predictions(days_back=250)
-            btc.update_performance("RandomForest")
-            btc.update_performance("AdaBoost")
-            btc.update_performance("GradientBoost")
-
-            print(btc.get_prediction_today())
-            print(btc.modelDB.get_model_performance("RandomForest").tail())
-            end = dt.datetime.now()
-            print(f"--------- Time taken: {end-start} ---------")
-
-        else:
-            import yfinance as yf
-
-            btc = yf.Ticker("BTC-USD")
-            btc = btc.history(start=None, end=None, period="max")
-            print(btc.tail())
+        from job_runner.DailyJob import main as run_job
+        sys.exit(run_job(rest))   # e.g. python main.py job --workers 3 --days-back 250
 
 
 
 # TODO:
 # model performance for different time periods
 # function calcultaing model performance DONE
-# if there is already a predicted value in db - return instead of predicting again DONE
\ No newline at end of file
+# if there is already a predicted value in db - return instead of predicting again DONE
@@ -0,0 +1,222 @@
+import os
+import numpy as np
+from typing import Dict, List, Optional
+
+from model_tracking.DataBaseLogs import DBLogs, PERFORMANCE_METRICS, PERFORMANCE_WINDOWS
+
+COLUMNAR_PATH = os.path.join("model_tracking", "data", "columnar", "models_metrics.parquet")
+
+
+
+class ColumnarStore:
+    """
+    Columnar (Parquet) snapshot of the performance history, queried with DuckDB.
+
+    The daily job exports the long models_metrics table into one Parquet file, the reads below have the same
+    signatures and return the same NumPy columns as in DBLogs, so the store can be used wherever the performance
+    history is only read. On top of that it answers analytical questions across all the models, windows and dates
+    (rankings, drawdowns, rolling comparisons) with vectorized SQL instead of loops over DataFrames.
+
+    DuckDB is an optional dependency: it is imported only when a ColumnarStore is created.
+    """
+
+
+    def __init__(self, path: str = COLUMNAR_PATH):
+        try:
+            import duckdb
+        except ImportError as exception_error:
+            raise ImportError("The columnar backend needs DuckDB: pip install duckdb") from exception_error
+
+        self.path = path
+        self.conn = duckdb.connect()      # in-memory, the data stays in the Parquet file
+
+
+    def export(self, db: DBLogs) -> int:
+        """
+        Writes a snapshot of the performance history of the database (replacing the previous one atomically).
+
+        Returns:
+            int: The number of exported rows.
+        """
+        rows = db.get_performance_rows()    # referenced by name in the query below (DuckDB scans the NumPy columns)
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        self.conn.execute(f"""
+                          COPY (SELECT model_name, horizon, CAST(date AS DATE) AS date, period, metric, value
+                                FROM rows
+                                ORDER BY model_name, horizon, period, metric, date)
+                          TO '{tmp_path}' (FORMAT PARQUET);
+                          """)
+        os.replace(tmp_path, self.path)
+
+        return len(rows["date"])
+
+
+    def query_model_performance(self, model_name: str, metrics: Optional[List[str]] = None, windows: Optional[List[str]] = None,
+                                start_date: Optional[str] = None, end_date: Optional[str] = None,
+                                limit: Optional[int] = None, offset: int = 0, horizon: int = 1) -> Dict[str, np.ndarray]:
+        """Same as DBLogs.query_model_performance, read from the snapshot."""
+        try:
+            metrics, windows = self.__validate(metrics, windows)
+            return self.__query_pivot(metrics, windows, start_date, end_date, model_name, horizon, limit, offset)
+
+        except Exception as exception_error:
+            print(exception_error)
+            return None
+
+
+
+    def query_performance_all(self, metrics: Optional[List[str]] = None, windows: Optional[List[str]] = None,
+                              start_date: Optional[str] = None, end_date: Optional[str] = None, horizon: int = 1) -> Dict[str, Dict[str, np.ndarray]]:
+        """Same as DBLogs.query_performance_all, read from the snapshot."""
+        try:
+            metrics, windows = self.__validate(metrics, windows)
+            return {name: self.__query_pivot(metrics, windows, start_date, end_date, name, horizon) for name in self.get_model_names()}
+
+        except Exception as exception_error:
+            print(exception_error)
+            return None
+
+
+
+    def get_model_names(self) -> List[str]:
+        return [row[0] for row in self.conn.execute(f"""SELECT DISTINCT model_name FROM {self.__source()} ORDER BY model_name;""").fetchall()]
+
+
+    def get_rankings(self, metric: str = "precision", window: str = "30", start_date: Optional[str] = None,
+                     end_date: Optional[str] = None, horizon: int = 1) -> Dict[str, np.ndarray]:
+        """
+        Ranks the models against each other on every date (1 = best) and summarises the ranks over the date range.
+
+        Returns:
+            Dict[str, np.ndarray]: "model_name", "mean_rank", "days_first", "days", "mean_value", "last_value",
+                                   ordered by the mean rank.
+        """
+        self.__validate([metric], [window])
+        return self.__fetch(f"""
+                            WITH ranked AS (
+                                SELECT model_name, date, value,
+                                       RANK() OVER (PARTITION BY date ORDER BY value DESC) AS rank
+                                FROM {self.__source()}
+                                WHERE metric = ? AND period = ? AND horizon = ? AND value IS NOT NULL
+                                      AND date BETWEEN COALESCE(CAST(? AS DATE), DATE '0001-01-01') AND COALESCE(CAST(? AS DATE), DATE '9999-12-31'))
+                            SELECT model_name,
+                                   AVG(rank) AS mean_rank,
+                                   COUNT(*) FILTER (WHERE rank = 1) AS days_first,
+                                   COUNT(*) AS days,
+                                   AVG(value) AS mean_value,
+                                   ARG_MAX(value, date) AS last_value
+                            FROM ranked
+                            GROUP BY model_name
+                            ORDER BY mean_rank, model_name;
+                            """, [metric, window, horizon, start_date, end_date])
+
+
+    def get_drawdowns(self, metric: str = "precision", window: str = "30", horizon: int = 1) -> Dict[str, np.ndarray]:
+        """
+        Drawdowns of a metric: how far it fell below its running maximum.
+
+        Returns:
+            Dict[str, np.ndarray]: "model_name", "max_drawdown", "peak_date", "trough_date", "current_drawdown"
+                                   (drawdowns are absolute differences, e.g. 0.12 = 12 percentage points of precision).
+        """
+        self.__validate([metric], [window])
+        return self.__fetch(f"""
+                            WITH series AS (
+                                SELECT model_name, date, value,
+                                       MAX(value) OVER (PARTITION BY model_name ORDER BY date ROWS UNBOUNDED PRECEDING) AS peak
+                                FROM {self.__source()}
+                                WHERE metric = ? AND period = ? AND horizon = ? AND value IS NOT NULL),
+                            drawdowns AS (
+                                SELECT model_name, date, peak - value AS drawdown,
+                                       MAX(CASE WHEN value = peak THEN date END)
+                                           OVER (PARTITION BY model_name ORDER BY date ROWS UNBOUNDED PRECEDING) AS peak_date
+                                FROM series)
+                            SELECT model_name,
+                                   MAX(drawdown) AS max_drawdown,
+                                   strftime(ARG_MAX(peak_date, drawdown), '%Y-%m-%d') AS peak_date,
+                                   strftime(ARG_MAX(date, drawdown), '%Y-%m-%d') AS trough_date,
+                                   ARG_MAX(drawdown, date) AS current_drawdown
+                            FROM drawdowns
+                            GROUP BY model_name
+                            ORDER BY model_name;
+                            """, [metric, window, horizon])
+
+
+    def get_rolling_comparison(self, metric: str = "precision", window: str = "total", days: int = 30,
+                               start_date: Optional[str] = None, end_date: Optional[str] = None, horizon: int = 1) -> Dict[str, np.ndarray]:
+        """
+        Rolling mean of a metric over the last `days` calendar days for every model, side by side.
+
+        Returns:
+            Dict[str, np.ndarray]: "date", one column per model, "best_model" and "spread" (best minus worst rolling mean).
+        """
+        self.__validate([metric], [window])
+        names = self.get_model_names()
+        columns = ", ".join(f"MAX(rolling) FILTER (WHERE model_name = ?) AS \"{name}\"" for name in names)
+
+        return self.__fetch(f"""
+                            WITH rolling AS (
+                                SELECT model_name, date,
+                                       AVG(value) OVER (PARTITION BY model_name ORDER BY date
+                                                        RANGE BETWEEN INTERVAL {int(days) - 1} DAYS PRECEDING AND CURRENT ROW) AS rolling
+                                FROM {self.__source()}
+                                WHERE metric = ? AND period = ? AND horizon = ?)
+                            SELECT strftime(date, '%Y-%m-%d') AS date, {columns},
+                                   ARG_MAX(model_name, rolling) AS best_model,
+                                   MAX(rolling) - MIN(rolling) AS spread
+                            FROM rolling
+                            WHERE date BETWEEN COALESCE(CAST(? AS DATE), DATE '0001-01-01') AND COALESCE(CAST(? AS DATE), DATE '9999-12-31')
+                            GROUP BY date
+                            ORDER BY date;
+                            """, [metric, window, horizon, *names, start_date, end_date])
+
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+    def __query_pivot(self, metrics: List[str], windows: List[str], start_date: Optional[str], end_date: Optional[str],
+                      model_name: str, horizon: int = 1, limit: Optional[int] = None, offset: int = 0) -> Dict[str, np.ndarray]:
+        """One row per date and one column per metric and window, pivoted by DuckDB."""
+        columns = ", ".join(f"MAX(value) FILTER (WHERE metric = '{metric}' AND period = '{window}') AS {metric}_{window}"
+                            for metric in metrics for window in windows)     # metrics and windows are validated
+
+        return self.__fetch(f"""
+                            SELECT strftime(date, '%Y-%m-%d') AS date, {columns}
+                            FROM {self.__source()}
+                            WHERE model_name = ? AND horizon = ?
+                                  AND date BETWEEN COALESCE(CAST(? AS DATE), DATE '0001-01-01') AND COALESCE(CAST(? AS DATE), DATE '9999-12-31')
+                            GROUP BY date
+                            ORDER BY date
+                            LIMIT ? OFFSET ?;
+                            """, [model_name, horizon, start_date, end_date, limit, offset])
+
+
+    def __fetch(self, query: str, parameters: list) -> Dict[str, np.ndarray]:
+        """Runs the query and returns plain NumPy columns (NULLs as NaN, strings as unicode arrays)."""
+        result = {}
+        for name, column in self.conn.execute(query, parameters).fetchnumpy().items():
+            if column.dtype == object:
+                result[name] = np.asarray(column, dtype=str)
+            elif np.ma.isMaskedArray(column):
+                result[name] = column.astype(np.float64).filled(np.nan)
+            else:
+                result[name] = np.asarray(column)
+        return result
+
+
+    def __source(self) -> str:
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"No columnar snapshot at {self.path}, export one first (DailyJob --columnar).")
+        return f"read_parquet('{self.path}')"
+
+
+    @staticmethod
+    def __validate(metrics: Optional[List[str]], windows: Optional[List[str]]) -> tuple:
+        metrics, windows = metrics or PERFORMANCE_METRICS, windows or PERFORMANCE_WINDOWS
+        unknown = (set(metrics) - set(PERFORMANCE_METRICS)) | (set(windows) - set(PERFORMANCE_WINDOWS))
+        if unknown:
+            raise ValueError(f"Unknown performance metrics/windows: {sorted(unknown)}")
+        return metrics, windows
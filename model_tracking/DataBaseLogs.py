@@ -1,13 +1,22 @@
 import sqlite3
 import os
-import pandas as pd
-from model_tracking.performance_data import PerformanceWindows, PerformanceBatch
+import time
+import numpy as np
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+from model_tracking.performance_data import PerformanceBands, PerformanceRecords, METRICS, WINDOWS
+
+if TYPE_CHECKING:
+    import pandas as pd     # imported lazily at runtime, the read-only serving path should not pay for pandas
+
+DB_PATH = os.environ.get("CRYPTO_EYE_DB", "model_tracking\\data\\logs.db")
 
 
 
 class DBLogs:
-    def __init__(self, db_path: str = "model_tracking\\data\\logs.db"):
+    def __init__(self, db_path: str = DB_PATH):
         self.db_path = db_path
+        self.__model_ids = None      # in-process cache of model_name -> id (the models table only grows)
 
 
     def connect(self) -> None:
@@ -16,11 +25,11 @@ class DBLogs:
         self.create_tables()
 
 
-    def get_model_predictions(self, model_name: str) -> pd.DataFrame:
-        """Returns the history of model predictions given its name."""
+    def get_model_predictions(self, model_name: str, horizon: int = 1) -> "pd.DataFrame":
+        """Returns the history of model predictions (for the given horizon in days) given its name."""
         try:
             model_id = self.get_model_id(model_name)
-            return self.__get_model_predictions_id(model_id)
+            return self.__get_model_predictions_id(model_id, horizon)
         
         except Exception as exception_error:
             print(exception_error)
@@ -40,7 +49,7 @@ class DBLogs:
     
 
 
-    def get_model_performance(self, model_name: str) -> pd.DataFrame:
+    def get_model_performance(self, model_name: str) -> "pd.DataFrame":
         """Returns the history of model performance given its name."""
         try:
             model_id = self.get_model_id(model_name)
@@ -52,32 +61,286 @@ class DBLogs:
         
     
 
-    def insert_model_performance(self, performance_info: PerformanceWindows) -> None:
-        """Inserts the current model performance into the database."""
+    def query_model_performance(self, model_name: str, metrics: Optional[List[str]] = None, windows: Optional[List[str]] = None,
+                                start_date: Optional[str] = None, end_date: Optional[str] = None,
+                                limit: Optional[int] = None, offset: int = 0, horizon: int = 1) -> Dict[str, np.ndarray]:
+        """
+        Returns a date range of the model performance, projected to the requested metrics and windows.
+
+        Parameters:
+            model_name (str): The name of the model.
+            metrics (List[str], optional): Metrics to return, e.g. ["precision", "recall"]. Defaults to all metrics.
+            windows (List[str], optional): Windows to return, e.g. ["7", "total"]. Defaults to all windows.
+            start_date (str, optional): First date (inclusive) in the format "%Y-%m-%d".
+            end_date (str, optional): Last date (inclusive) in the format "%Y-%m-%d".
+            limit (int, optional): Maximum number of rows (page size).
+            offset (int, optional): Number of rows to skip (page start). Default is 0.
+            horizon (int, optional): Prediction horizon in days. Default is 1.
+
+        Returns:
+            Dict[str, np.ndarray]: Column name -> NumPy array, ordered by date ("date" plus e.g. "precision_7").
+                                   Can be passed directly to pandas.DataFrame or pyarrow.table.
+        """
+        try:
+            metrics, windows = metrics or PERFORMANCE_METRICS, windows or PERFORMANCE_WINDOWS
+            unknown = (set(metrics) - set(PERFORMANCE_METRICS)) | (set(windows) - set(PERFORMANCE_WINDOWS))
+            if unknown:
+                raise ValueError(f"Unknown performance metrics/windows: {sorted(unknown)}")
+
+            model_id = self.get_model_id(model_name)
+            return self.__query_performance_id(model_id, metrics, windows, start_date, end_date, limit, offset, horizon)
+
+        except Exception as exception_error:
+            print(exception_error)
+            return None
+
+
+
+    def query_model_predictions(self, model_name: str, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                                limit: Optional[int] = None, offset: int = 0, horizon: int = 1) -> Dict[str, np.ndarray]:
+        """
+        Returns a date range of the model predictions as NumPy columns ("date", "y_true", "y_pred").
+        Missing real values are NaN. See query_model_performance for the parameters.
+        """
+        try:
+            model_id = self.get_model_id(model_name)
+            self.cursor.execute("""
+                                SELECT date, COALESCE(y_true, -1), y_pred
+                                FROM models_predictions
+                                WHERE model_id = ? AND horizon = ? AND date BETWEEN COALESCE(?, '') AND COALESCE(?, '9999-12-31')
+                                ORDER BY date
+                                LIMIT ? OFFSET ?;
+                                """, (model_id, horizon, start_date, end_date, -1 if limit is None else limit, offset))
+
+            records = np.fromiter(self.cursor, dtype=[("date", "U10"), ("y_true", np.float64), ("y_pred", np.int64)])
+            y_true = records["y_true"]
+            y_true[y_true < 0] = np.nan     # NULL y_true (the real value is not known yet)
+            return {"date": records["date"], "y_true": y_true, "y_pred": records["y_pred"]}
+
+        except Exception as exception_error:
+            print(exception_error)
+            return None
+
+
+
+    def get_predictions_date(self, date: str, horizon: int = 1) -> Dict[str, int]:
+        """Returns the predictions of all the models for the given date (and horizon) in one query: model_name -> y_pred."""
+        try:
+            self.cursor.execute("""
+                                SELECT m.model_name, mp.y_pred
+                                FROM models_predictions mp
+                                JOIN models m
+                                ON m.id = mp.model_id
+                                WHERE mp.date = ? AND mp.horizon = ?;
+                                """, (date, horizon))
+            return dict(self.cursor.fetchall())
+
+        except Exception as exception_error:
+            print(exception_error)
+            return None
+
+
+
+    def query_performance_all(self, metrics: Optional[List[str]] = None, windows: Optional[List[str]] = None,
+                              start_date: Optional[str] = None, end_date: Optional[str] = None, horizon: int = 1) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Returns the performance history of all the models in one query: model_name -> columns as in query_model_performance.
+        """
+        try:
+            metrics, windows = metrics or PERFORMANCE_METRICS, windows or PERFORMANCE_WINDOWS
+            unknown = (set(metrics) - set(PERFORMANCE_METRICS)) | (set(windows) - set(PERFORMANCE_WINDOWS))
+            if unknown:
+                raise ValueError(f"Unknown performance metrics/windows: {sorted(unknown)}")
+
+            self.cursor.execute(f"""
+                                SELECT m.model_name, mm.date, mm.period, mm.metric, mm.value
+                                FROM models_metrics mm
+                                JOIN models m
+                                ON m.id = mm.model_id
+                                WHERE mm.horizon = ? AND mm.period IN ({", ".join("?" * len(windows))}) AND mm.metric IN ({", ".join("?" * len(metrics))})
+                                      AND mm.date BETWEEN COALESCE(?, '') AND COALESCE(?, '9999-12-31');
+                                """, (horizon, *windows, *metrics, start_date, end_date))
+
+            records = np.fromiter(self.cursor, dtype=[("model_name", "U64"), ("date", "U10"), ("period", "U16"), ("metric", "U32"), ("value", np.float64)])
+            return {name: self.__pivot_performance(records[records["model_name"] == name], metrics, windows)
+                    for name in np.unique(records["model_name"]).tolist()}
+
+        except Exception as exception_error:
+            print(exception_error)
+            return None
+
+
+
+    def query_predictions_returns(self, horizon: int = 1, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Returns the predictions of all the models joined with the cached close prices, in one query:
+        model_name -> "date", "y_pred", "y_prob" (NaN where it was not stored) and "return" (of the close price from the date
+        to `horizon` days later), ordered by date. Only the dates whose return is already known are returned.
+        """
+        try:
+            self.cursor.execute("""
+                                SELECT m.model_name, mp.date, mp.y_pred, COALESCE(mp.y_prob, -1), later.close / entry.close - 1
+                                FROM models_predictions mp
+                                JOIN models m
+                                ON m.id = mp.model_id
+                                JOIN btc_prices entry
+                                ON entry.date = mp.date
+                                JOIN btc_prices later
+                                ON later.date = date(mp.date, '+' || ? || ' days')
+                                WHERE mp.horizon = ? AND mp.date BETWEEN COALESCE(?, '') AND COALESCE(?, '9999-12-31')
+                                ORDER BY m.model_name, mp.date;
+                                """, (horizon, horizon, start_date, end_date))
+
+            records = np.fromiter(self.cursor, dtype=[("model_name", "U64"), ("date", "U10"), ("y_pred", np.int64), ("y_prob", np.float64), ("return", np.float64)])
+            records["y_prob"][records["y_prob"] < 0] = np.nan      # NULL y_prob (stored before the probabilities were)
+            return {name: {column: records[column][records["model_name"] == name] for column in ["date", "y_pred", "y_prob", "return"]}
+                    for name in np.unique(records["model_name"]).tolist()}
+
+        except Exception as exception_error:
+            print(exception_error)
+            return None
+
+
+
+    def query_close_prices(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """Returns the cached close prices between start_date and end_date (inclusive): "date" and "close" columns, ordered by date."""
+        try:
+            self.cursor.execute("""
+                                SELECT date, close
+                                FROM btc_prices
+                                WHERE date BETWEEN COALESCE(?, '') AND COALESCE(?, '9999-12-31')
+                                ORDER BY date;
+                                """, (start_date, end_date))
+            records = np.fromiter(self.cursor, dtype=[("date", "U10"), ("close", np.float64)])
+            return {name: records[name] for name in records.dtype.names}
+
+        except Exception as exception_error:
+            print(exception_error)
+            return None
+
+
+
+    def get_performance_rows(self) -> Dict[str, np.ndarray]:
+        """Returns the whole performance history in the long layout: "model_name", "horizon", "date", "period", "metric", "value" columns."""
+        self.cursor.execute("""
+                            SELECT m.model_name, mm.horizon, mm.date, mm.period, mm.metric, mm.value
+                            FROM models_metrics mm
+                            JOIN models m
+                            ON m.id = mm.model_id
+                            ORDER BY m.model_name, mm.horizon, mm.date;
+                            """)
+
+        records = np.fromiter(self.cursor, dtype=[("model_name", "U64"), ("horizon", np.int64), ("date", "U10"), ("period", "U16"), ("metric", "U32"), ("value", np.float64)])
+        return {name: records[name] for name in records.dtype.names}
+
+
+
+    def insert_model_performance(self, records: PerformanceRecords) -> None:
+        """Inserts a batch of model performance (many dates at once) into the database in one transaction."""
+        try:
+            model_id = self.get_model_id(records.get_estimator())
+            self.__insert_performance_id(model_id, records)
+
+        except Exception as exception_error:
+            print(exception_error)
+
+
+
+    def insert_model_bands(self, bands: PerformanceBands) -> None:
+        """Inserts a batch of bootstrap confidence bands (many dates at once) into the database in one transaction."""
+        try:
+            model_id = self.get_model_id(bands.get_estimator())
+            with self.conn:
+                self.cursor.executemany("""
+                    INSERT OR REPLACE INTO models_bands (model_id, horizon, date, period, metric, lower, upper) VALUES (?, ?, ?, ?, ?, ?, ?);""",
+                    ((model_id, bands.horizon, *row) for row in bands.long_rows()))
+
+        except Exception as exception_error:
+            print(exception_error)
+
+
+
+    def query_bands_all(self, metrics: Optional[List[str]] = None, windows: Optional[List[str]] = None,
+                        start_date: Optional[str] = None, end_date: Optional[str] = None, horizon: int = 1) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Returns the confidence bands of all the models in one query: model_name -> "date" plus e.g. "precision_7_lower"
+        and "precision_7_upper" columns, ordered by date.
+        """
         try:
-            model_id = self.get_model_id(performance_info.get_estimator())
-            self.__insert_performance_id(model_id, performance_info)
+            metrics, windows = metrics or PERFORMANCE_METRICS, windows or PERFORMANCE_WINDOWS
+            unknown = (set(metrics) - set(PERFORMANCE_METRICS)) | (set(windows) - set(PERFORMANCE_WINDOWS))
+            if unknown:
+                raise ValueError(f"Unknown performance metrics/windows: {sorted(unknown)}")
+
+            self.cursor.execute(f"""
+                                SELECT m.model_name, mb.date, mb.period, mb.metric, mb.lower, mb.upper
+                                FROM models_bands mb
+                                JOIN models m
+                                ON m.id = mb.model_id
+                                WHERE mb.horizon = ? AND mb.period IN ({", ".join("?" * len(windows))}) AND mb.metric IN ({", ".join("?" * len(metrics))})
+                                      AND mb.date BETWEEN COALESCE(?, '') AND COALESCE(?, '9999-12-31');
+                                """, (horizon, *windows, *metrics, start_date, end_date))
+
+            records = np.fromiter(self.cursor, dtype=[("model_name", "U64"), ("date", "U10"), ("period", "U16"), ("metric", "U32"),
+                                                      ("lower", np.float64), ("upper", np.float64)])
+            result = {}
+            for name in np.unique(records["model_name"]).tolist():
+                per_model = records[records["model_name"] == name]
+                result[name] = {"date": np.unique(per_model["date"])}
+                for bound in ["lower", "upper"]:
+                    columns = self.__pivot_performance(per_model[["date", "period", "metric", bound]].astype(
+                        [("date", "U10"), ("period", "U16"), ("metric", "U32"), ("value", np.float64)]), metrics, windows)
+                    result[name].update({f"{column}_{bound}": values for column, values in columns.items() if column != "date"})
+            return result
 
         except Exception as exception_error:
             print(exception_error)
+            return None
 
 
 
-    def insert_model_prediction(self, model_name: str, date: str, y_pred: int) -> None:
-        """Inserts the current model prediction into the database. Does not include the real future value."""
+    def insert_real_values(self, rows: Iterable[Tuple[str, int]], horizon: int = 1) -> None:
+        """Sets the real value of all the models' predictions of the horizon for many (date, y_true) rows in one transaction."""
+        with self.conn:
+            self.cursor.executemany("""UPDATE models_predictions SET y_true = ? WHERE date = ? AND horizon = ?;""",
+                                    ((int(y_true), date, horizon) for date, y_true in rows))
+
+
+
+    def insert_model_prediction(self, model_name: str, date: str, y_pred: int, y_prob: Optional[float] = None) -> None:
+        """Inserts the current model prediction (and its class 1 probability) into the database. Does not include the real future value."""
         try:
             model_id = self.get_model_id(model_name)
-            self.__insert_prediction_id(model_id, date, y_pred)
+            self.__insert_prediction_id(model_id, date, y_pred, y_prob)
 
         except Exception as exception_error:
             print(exception_error)
 
     
 
+    def insert_model_predictions(self, date: str, predictions: Dict[int, Dict[str, int]],
+                                 probabilities: Optional[Dict[int, Dict[str, float]]] = None) -> None:
+        """
+        Inserts the predictions of several models and horizons (horizon -> model_name -> y_pred) for the date in one transaction,
+        so readers see all or none. The class 1 probabilities (same layout) are stored with them when given.
+        """
+        try:
+            probabilities = probabilities or {}
+            rows = [(self.get_model_id(name), date, horizon, y_pred, probabilities.get(horizon, {}).get(name))
+                    for horizon, per_model in predictions.items() for name, y_pred in per_model.items()]
+            with self.conn:
+                self.cursor.executemany("""INSERT INTO models_predictions (model_id, date, horizon, y_true, y_pred, y_prob) VALUES (?, ?, ?, NULL, ?, ?);""",
+                                        rows)
+
+        except Exception as exception_error:
+            print(exception_error)
+
+
+
     def insert_real_value(self, date: str, y_true: int) -> None:
-        """Inserts the real value into the database."""
+        """Inserts the real value (of the next-day predictions) into the database."""
         try:
-            self.cursor.execute("""UPDATE models_predictions SET y_true = ? WHERE date = ?;""", 
+            self.cursor.execute("""UPDATE models_predictions SET y_true = ? WHERE date = ? AND horizon = 1;""", 
                 (int(y_true), date))
             self.conn.commit()
         except Exception as exception_error:
@@ -91,24 +354,87 @@ class DBLogs:
             self.cursor.execute("""INSERT INTO models (model_name) VALUES (?);""", 
                                 (model_name,))
             self.conn.commit()
+            self.__model_ids = None
 
         except Exception as exception_error:
             print(exception_error)
 
 
 
-    def get_missing_dates_predictions(self, start_date: str, end_date: str, difference: bool = True) -> pd.DataFrame:
+    def ensure_models(self, model_names: List[str]) -> None:
+        """Inserts the model names that are not in the database yet."""
+        with self.conn:
+            self.cursor.executemany("""INSERT OR IGNORE INTO models (model_name) VALUES (?);""", ((name,) for name in model_names))
+        self.__model_ids = None
+
+
+
+    def insert_model_cost(self, model_name: str, date: str, stage: str, seconds: float, peak_bytes: Optional[int], n_samples: int) -> None:
+        """Stores the profiled cost of fitting or predicting ("fit" / "predict") for the given date."""
+        try:
+            model_id = self.get_model_id(model_name)
+            self.cursor.execute("""
+                                INSERT OR REPLACE INTO models_costs (model_id, date, stage, seconds, peak_bytes, n_samples) VALUES (?, ?, ?, ?, ?, ?);
+                                """, (model_id, date, stage, seconds, peak_bytes, n_samples))
+            self.conn.commit()
+
+        except Exception as exception_error:
+            print(exception_error)
+
+
+
+    def get_models_cost_summary(self, window: str = "total") -> Dict[str, np.ndarray]:
+        """
+        Returns the mean fit/predict cost of every model next to its latest precision, recall and accuracy for the given window.
+
+        Returns:
+            Dict[str, np.ndarray]: "model_name", "fit_seconds", "fit_peak_bytes", "predict_seconds", "precision", "recall", "accuracy".
+        """
+        self.cursor.execute("""
+                            WITH costs AS (
+                                SELECT model_id,
+                                       AVG(CASE WHEN stage = 'fit' THEN seconds END) AS fit_seconds,
+                                       AVG(CASE WHEN stage = 'fit' THEN peak_bytes END) AS fit_peak_bytes,
+                                       AVG(CASE WHEN stage = 'predict' THEN seconds END) AS predict_seconds
+                                FROM models_costs
+                                GROUP BY model_id),
+                            latest AS (
+                                SELECT model_id, MAX(date) AS date
+                                FROM models_metrics
+                                WHERE period = ? AND horizon = 1
+                                GROUP BY model_id)
+                            SELECT m.model_name, c.fit_seconds, c.fit_peak_bytes, c.predict_seconds,
+                                   MAX(CASE WHEN mm.metric = 'precision' THEN mm.value END),
+                                   MAX(CASE WHEN mm.metric = 'recall' THEN mm.value END),
+                                   MAX(CASE WHEN mm.metric = 'accuracy' THEN mm.value END)
+                            FROM models m
+                            LEFT JOIN costs c ON c.model_id = m.id
+                            LEFT JOIN latest l ON l.model_id = m.id
+                            LEFT JOIN models_metrics mm ON mm.model_id = m.id AND mm.date = l.date AND mm.period = ? AND mm.horizon = 1
+                            GROUP BY m.id
+                            ORDER BY m.model_name;
+                            """, (window, window))
+
+        names = ["model_name", "fit_seconds", "fit_peak_bytes", "predict_seconds", "precision", "recall", "accuracy"]
+        rows = [tuple(np.nan if value is None else value for value in row) for row in self.cursor.fetchall()]
+        records = np.array(rows, dtype=[("model_name", "U64")] + [(name, np.float64) for name in names[1:]])
+        return {name: records[name] for name in names}
+
+
+
+    def get_missing_dates_predictions(self, start_date: str, end_date: str, difference: bool = True) -> "pd.DataFrame":
         """Returns the dates that are missing the predictions value."""
+        import pandas as pd
         try:
             if all([start_date, end_date]):
                 self.cursor.execute("""SELECT DISTINCT date 
                                        FROM models_predictions 
-                                       WHERE date BETWEEN ? AND ? AND y_pred IS NOT NULL;""",
+                                       WHERE date BETWEEN ? AND ? AND y_pred IS NOT NULL AND horizon = 1;""",
                                     (start_date, end_date))
             else:
                 self.cursor.execute("""SELECT DISTINCT date 
                                        FROM models_predictions 
-                                       WHERE y_true IS NULL;""")
+                                       WHERE y_true IS NULL AND horizon = 1;""")
                 
             existing_dates = pd.DataFrame(self.cursor.fetchall(), columns=["date"]).astype("datetime64[s]")
 
@@ -125,22 +451,246 @@ class DBLogs:
         
 
 
-    def get_missing_dates_performance(self, model_name: str) -> pd.DataFrame:
-        model_id = self.get_model_id(model_name)
+    def get_unlabelled_dates(self, start_date: Optional[str] = None, end_date: Optional[str] = None, horizon: int = 1) -> np.ndarray:
+        """Returns the sorted dates with predictions of the horizon that are missing the real value (y_true IS NULL)."""
         self.cursor.execute("""
+                            SELECT DISTINCT date
+                            FROM models_predictions
+                            WHERE y_true IS NULL AND horizon = ? AND date BETWEEN COALESCE(?, '') AND COALESCE(?, '9999-12-31')
+                            ORDER BY date;
+                            """, (horizon, start_date, end_date))
+        return np.fromiter((row[0] for row in self.cursor), dtype="U10")
+
+
+
+    def get_missing_dates_bands(self, model_name: str, horizon: int = 1) -> np.ndarray:
+        """Returns the sorted dates with performance of the model that miss any of the configured windows/metrics bands."""
+        model_id = self.get_model_id(model_name)
+        self.cursor.execute(f"""
+                            SELECT DISTINCT date
+                            FROM models_metrics
+                            WHERE model_id = ? AND horizon = ? AND date NOT IN(
+                                SELECT date
+                                FROM models_bands
+                                WHERE model_id = ? AND horizon = ? AND period IN ({", ".join("?" * len(PERFORMANCE_WINDOWS))})
+                                GROUP BY date
+                                HAVING COUNT(*) >= ?)
+                            ORDER BY date;
+                            """, (model_id, horizon, model_id, horizon, *PERFORMANCE_WINDOWS, len(PERFORMANCE_WINDOWS) * len(PERFORMANCE_METRICS)))
+        return np.fromiter((row[0] for row in self.cursor), dtype="U10")
+
+
+
+    def get_missing_dates_performance(self, model_name: str, horizon: int = 1) -> "pd.DataFrame":
+        """Returns the dates with known real values that miss any of the configured windows/metrics."""
+        import pandas as pd
+        model_id = self.get_model_id(model_name)
+        self.cursor.execute(f"""
                             SELECT DISTINCT date 
                             FROM models_predictions
                             WHERE date NOT IN(
-                                SELECT DISTINCT date
-                                FROM models_performance
-                                WHERE model_id = ?)
-                            AND y_true IS NOT NULL;
-                            """, (model_id,))
+                                SELECT date
+                                FROM models_metrics
+                                WHERE model_id = ? AND horizon = ? AND period IN ({", ".join("?" * len(PERFORMANCE_WINDOWS))})
+                                GROUP BY date
+                                HAVING COUNT(*) >= ?)
+                            AND y_true IS NOT NULL AND horizon = ?;
+                            """, (model_id, horizon, *PERFORMANCE_WINDOWS, len(PERFORMANCE_WINDOWS) * len(PERFORMANCE_METRICS), horizon))
         
         return pd.DataFrame(self.cursor.fetchall(), columns=["date"])
         
     
 
+    def get_drift_reference(self) -> Dict[str, np.ndarray]:
+        """
+        Returns the reference bins of the features: "feature", "bin", "upper" (inf for the last bin), "proportion", "date"
+        (the last training day) and "start_date" (the first one, "" for the references stored before it was) columns.
+        """
+        self.cursor.execute("""
+                            SELECT feature, bin, upper, proportion, date, COALESCE(start_date, '')
+                            FROM features_drift_reference
+                            ORDER BY feature, bin;
+                            """)
+        records = np.fromiter(self.cursor, dtype=[("feature", "U32"), ("bin", np.int64), ("upper", np.float64), ("proportion", np.float64),
+                                                  ("date", "U10"), ("start_date", "U10")])
+        return {name: records[name] for name in records.dtype.names}
+
+
+
+    def get_drift_histograms(self) -> Dict[str, np.ndarray]:
+        """Returns the current histograms of the rolling windows: "period", "feature", "bin" and "count" columns."""
+        self.cursor.execute("""SELECT period, feature, bin, count FROM features_drift_histograms;""")
+        records = np.fromiter(self.cursor, dtype=[("period", "U16"), ("feature", "U32"), ("bin", np.int64), ("count", np.int64)])
+        return {name: records[name] for name in records.dtype.names}
+
+
+
+    def get_feature_bins(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """Returns the bins of the monitored days between start_date and end_date (inclusive): "date", "feature" and "bin" columns."""
+        self.cursor.execute("""
+                            SELECT date, feature, bin
+                            FROM features_bins
+                            WHERE date BETWEEN COALESCE(?, '') AND COALESCE(?, '9999-12-31')
+                            ORDER BY date;
+                            """, (start_date, end_date))
+        records = np.fromiter(self.cursor, dtype=[("date", "U10"), ("feature", "U32"), ("bin", np.int64)])
+        return {name: records[name] for name in records.dtype.names}
+
+
+
+    def get_last_drift_date(self) -> Optional[str]:
+        """Returns the most recent day added to the drift histograms."""
+        self.cursor.execute("""SELECT MAX(date) FROM features_bins;""")
+        return self.cursor.fetchone()[0]
+
+
+
+    def set_drift_reference(self, reference_rows: Iterable[tuple], bins_rows: Iterable[tuple], histogram_rows: Iterable[tuple]) -> None:
+        """
+        Replaces the drift reference and restarts the histograms, in one transaction. The drift scores are kept.
+
+        Parameters:
+            reference_rows (Iterable[tuple]): (feature, bin, upper, proportion, date, start_date) rows.
+            bins_rows (Iterable[tuple]): (date, feature, bin) rows of the days already in the windows.
+            histogram_rows (Iterable[tuple]): (period, feature, bin, count) rows.
+        """
+        with self.conn:
+            for table in ["features_drift_reference", "features_drift_histograms", "features_bins"]:
+                self.cursor.execute(f"""DELETE FROM {table};""")
+            self.cursor.executemany("""INSERT INTO features_drift_reference (feature, bin, upper, proportion, date, start_date) VALUES (?, ?, ?, ?, ?, ?);""",
+                                    reference_rows)
+            self.cursor.executemany("""INSERT INTO features_bins (date, feature, bin) VALUES (?, ?, ?);""", bins_rows)
+            self.cursor.executemany("""INSERT INTO features_drift_histograms (period, feature, bin, count) VALUES (?, ?, ?, ?);""",
+                                    histogram_rows)
+
+
+
+    def insert_drift_update(self, bins_rows: Iterable[tuple], histogram_rows: Iterable[tuple], score_rows: Iterable[tuple], keep_from: str) -> None:
+        """
+        Stores a daily update of the drift monitor in one transaction: the bins of the new days, the updated histograms
+        and the (feature, period, metric, date, value) scores. The bins of the days before keep_from are dropped.
+        """
+        with self.conn:
+            self.cursor.executemany("""INSERT OR REPLACE INTO features_bins (date, feature, bin) VALUES (?, ?, ?);""", bins_rows)
+            self.cursor.executemany("""INSERT OR REPLACE INTO features_drift_histograms (period, feature, bin, count) VALUES (?, ?, ?, ?);""",
+                                    histogram_rows)
+            self.cursor.executemany("""INSERT OR REPLACE INTO features_drift (feature, period, metric, date, value) VALUES (?, ?, ?, ?, ?);""",
+                                    score_rows)
+            self.cursor.execute("""DELETE FROM features_bins WHERE date < ?;""", (keep_from,))
+
+
+
+    def query_feature_drift(self, metric: str = "psi", period: str = "30", start_date: Optional[str] = None,
+                            end_date: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """Returns a date range of the drift scores of one metric and window: "date" plus one column per feature, ordered by date."""
+        try:
+            self.cursor.execute("""
+                                SELECT date, feature, value
+                                FROM features_drift
+                                WHERE period = ? AND metric = ? AND date BETWEEN COALESCE(?, '') AND COALESCE(?, '9999-12-31');
+                                """, (period, metric, start_date, end_date))
+
+            records = np.fromiter(self.cursor, dtype=[("date", "U10"), ("feature", "U32"), ("value", np.float64)])
+            dates, date_idx = np.unique(records["date"], return_inverse=True)
+            result = {"date": dates}
+            for feature in np.unique(records["feature"]).tolist():
+                mask = records["feature"] == feature
+                column = np.full(len(dates), np.nan)
+                column[date_idx[mask]] = records["value"][mask]
+                result[feature] = column
+            return result
+
+        except Exception as exception_error:
+            print(exception_error)
+            return None
+
+
+
+    def get_checkpoint(self, stage: str) -> Optional[Tuple[str, str]]:
+        """Returns the (watermark, status) of the given job stage, or None if the stage never ran."""
+        self.cursor.execute("""SELECT watermark, status FROM job_checkpoints WHERE stage = ?;""", (stage,))
+        return self.cursor.fetchone()
+
+
+
+    def set_checkpoint(self, stage: str, watermark: Optional[str], status: str, message: Optional[str] = None) -> None:
+        """Records the watermark and status of the given job stage. A failed stage keeps its previous watermark."""
+        self.cursor.execute("""
+                            INSERT INTO job_checkpoints (stage, watermark, status, updated_at, message) VALUES (?, ?, ?, ?, ?)
+                            ON CONFLICT (stage) DO UPDATE SET watermark = COALESCE(excluded.watermark, watermark),
+                                                              status = excluded.status,
+                                                              updated_at = excluded.updated_at,
+                                                              message = excluded.message;
+                            """, (stage, watermark, status, datetime.now().isoformat(timespec="seconds"), message))
+        self.conn.commit()
+
+
+
+    def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """
+        Takes the named lease for ttl seconds if it is free, expired or already held by the owner.
+        The check and the write are one statement in a write transaction, so exactly one process gets a free lease.
+        A database locked by another writer (past the busy timeout) counts as not acquired, so the caller waits and retries.
+        """
+        now = time.time()
+        try:
+            self.cursor.execute("""
+                                INSERT INTO job_leases (name, owner, expires_at) VALUES (?, ?, ?)
+                                ON CONFLICT (name) DO UPDATE SET owner = excluded.owner,
+                                                                 expires_at = excluded.expires_at
+                                WHERE job_leases.expires_at < ? OR job_leases.owner = excluded.owner;
+                                """, (name, owner, now + ttl, now))
+            acquired = self.cursor.rowcount > 0
+            self.conn.commit()
+        except sqlite3.OperationalError as e:
+            print(f"Lease {name} not acquired: {e}")
+            self.conn.rollback()
+            return False
+        return acquired
+
+
+
+    def release_lease(self, name: str, owner: str) -> None:
+        self.cursor.execute("""DELETE FROM job_leases WHERE name = ? AND owner = ?;""", (name, owner))
+        self.conn.commit()
+
+
+
+    def upsert_prices(self, rows: Iterable[tuple]) -> None:
+        """Inserts or replaces (date, open, high, low, close, volume) rows of the cached price history."""
+        self.cursor.executemany("""INSERT OR REPLACE INTO btc_prices (date, open, high, low, close, volume) VALUES (?, ?, ?, ?, ?, ?);""",
+                                rows)
+        self.conn.commit()
+
+
+
+    def get_last_price_date(self) -> Optional[str]:
+        """Returns the most recent date of the cached price history."""
+        self.cursor.execute("""SELECT MAX(date) FROM btc_prices;""")
+        return self.cursor.fetchone()[0]
+
+
+
+    def get_prices(self, end_date: Optional[str] = None, columns: List[str] = ["Open", "High", "Low", "Close", "Volume"]) -> "pd.DataFrame":
+        """Returns the requested columns of the cached price history (up to end_date, exclusive - like yfinance) in the yfinance layout."""
+        import pandas as pd
+
+        unknown = set(columns) - set(PRICE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown price columns: {sorted(unknown)}")
+
+        self.cursor.execute(f"""
+                            SELECT date, {", ".join(column.lower() for column in columns)}
+                            FROM btc_prices
+                            WHERE date < COALESCE(?, '9999-12-31')
+                            ORDER BY date;
+                            """, (end_date,))
+
+        records = np.fromiter(self.cursor, dtype=[("Date", "U10")] + [(column, np.float64) for column in columns])
+        return pd.DataFrame({column: records[column] for column in columns}, index=pd.DatetimeIndex(records["Date"].astype("datetime64[D]"), name="Date"))
+
+
+
     def create_tables(self):
         self.cursor.execute("""
                             CREATE TABLE IF NOT EXISTS models (
@@ -148,61 +698,209 @@ class DBLogs:
                                 model_name TEXT NOT NULL UNIQUE);
                             """)
         
+        self.__rename_single_horizon_tables()
+
+        # long format (model, horizon, date, window, metric): adding a window is a config change, not a schema change
         self.cursor.execute("""
-                            CREATE TABLE IF NOT EXISTS models_performance (
-                                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            CREATE TABLE IF NOT EXISTS models_metrics (
                                 model_id INTEGER NOT NULL,
+                                horizon INTEGER NOT NULL DEFAULT 1,
                                 date TEXT NOT NULL,
-                            
-                                recall_total REAL NOT NULL,
-                                precision_total REAL NOT NULL,
-                                accuracy_total REAL NOT NULL,
-                                specificity_total REAL NOT NULL,
-                                neg_pred_value_total REAL NOT NULL,
-                            
-                                recall_7 REAL NOT NULL,
-                                precision_7 REAL NOT NULL,
-                                accuracy_7 REAL NOT NULL,
-                                specificity_7 REAL NOT NULL,
-                                neg_pred_value_7 REAL NOT NULL,
-                            
-                                recall_14 REAL NOT NULL,
-                                precision_14 REAL NOT NULL,
-                                accuracy_14 REAL NOT NULL,
-                                specificity_14 REAL NOT NULL,
-                                neg_pred_value_14 REAL NOT NULL,
-                            
-                                recall_30 REAL NOT NULL,
-                                precision_30 REAL NOT NULL,
-                                accuracy_30 REAL NOT NULL,
-                                specificity_30 REAL NOT NULL,
-                                neg_pred_value_30 REAL NOT NULL,
-
+                                period TEXT NOT NULL,
+                                metric TEXT NOT NULL,
+                                value REAL NOT NULL,
                                 FOREIGN KEY (model_id) REFERENCES models (id),
-                                UNIQUE (model_id, date));""")
+                                PRIMARY KEY (model_id, horizon, period, metric, date)) WITHOUT ROWID;
+                            """)
         
+        # bootstrap confidence bands of the metrics, same keys as models_metrics
+        self.cursor.execute("""
+                            CREATE TABLE IF NOT EXISTS models_bands (
+                                model_id INTEGER NOT NULL,
+                                horizon INTEGER NOT NULL DEFAULT 1,
+                                date TEXT NOT NULL,
+                                period TEXT NOT NULL,
+                                metric TEXT NOT NULL,
+                                lower REAL NOT NULL,
+                                upper REAL NOT NULL,
+                                FOREIGN KEY (model_id) REFERENCES models (id),
+                                PRIMARY KEY (model_id, horizon, period, metric, date)) WITHOUT ROWID;
+                            """)
+
         self.cursor.execute("""
                             CREATE TABLE IF NOT EXISTS models_predictions (
                                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                                 model_id INTEGER NOT NULL,
                                 date TEXT NOT NULL,
+                                horizon INTEGER NOT NULL DEFAULT 1,
                                 y_true INTEGER,
                                 y_pred INTEGER NOT NULL,
+                                y_prob REAL,
                                 FOREIGN KEY (model_id) REFERENCES models (id),
-                                UNIQUE (model_id, date));
+                                UNIQUE (model_id, date, horizon));
+                            """)
+        self.__add_probability_column()
+
+        self.cursor.execute("""
+                            CREATE TABLE IF NOT EXISTS models_costs (
+                                model_id INTEGER NOT NULL,
+                                date TEXT NOT NULL,
+                                stage TEXT NOT NULL,
+                                seconds REAL NOT NULL,
+                                peak_bytes INTEGER,
+                                n_samples INTEGER NOT NULL,
+                                FOREIGN KEY (model_id) REFERENCES models (id),
+                                UNIQUE (model_id, date, stage));
+                            """)
+
+        self.cursor.execute("""
+                            CREATE TABLE IF NOT EXISTS job_checkpoints (
+                                stage TEXT PRIMARY KEY,
+                                watermark TEXT,
+                                status TEXT NOT NULL,
+                                updated_at TEXT NOT NULL,
+                                message TEXT);
+                            """)
+
+        self.cursor.execute("""
+                            CREATE TABLE IF NOT EXISTS job_leases (
+                                name TEXT PRIMARY KEY,
+                                owner TEXT NOT NULL,
+                                expires_at REAL NOT NULL);
+                            """)
+
+        self.cursor.execute("""
+                            CREATE TABLE IF NOT EXISTS btc_prices (
+                                date TEXT PRIMARY KEY,
+                                open REAL NOT NULL,
+                                high REAL NOT NULL,
+                                low REAL NOT NULL,
+                                close REAL NOT NULL,
+                                volume REAL);
+                            """)
+
+        # feature drift monitor: reference bins of every feature (upper edge inf for the last bin), histograms of the rolling
+        # windows, the bin of every monitored day (kept for the longest window only) and the daily scores, long like models_metrics
+        self.cursor.execute("""
+                            CREATE TABLE IF NOT EXISTS features_drift_reference (
+                                feature TEXT NOT NULL,
+                                bin INTEGER NOT NULL,
+                                upper REAL NOT NULL,
+                                proportion REAL NOT NULL,
+                                date TEXT NOT NULL,
+                                start_date TEXT,
+                                PRIMARY KEY (feature, bin)) WITHOUT ROWID;
+                            """)
+        self.__add_drift_start_column()
+
+        self.cursor.execute("""
+                            CREATE TABLE IF NOT EXISTS features_drift_histograms (
+                                period TEXT NOT NULL,
+                                feature TEXT NOT NULL,
+                                bin INTEGER NOT NULL,
+                                count INTEGER NOT NULL,
+                                PRIMARY KEY (period, feature, bin)) WITHOUT ROWID;
+                            """)
+
+        self.cursor.execute("""
+                            CREATE TABLE IF NOT EXISTS features_bins (
+                                date TEXT NOT NULL,
+                                feature TEXT NOT NULL,
+                                bin INTEGER NOT NULL,
+                                PRIMARY KEY (date, feature)) WITHOUT ROWID;
+                            """)
+
+        self.cursor.execute("""
+                            CREATE TABLE IF NOT EXISTS features_drift (
+                                feature TEXT NOT NULL,
+                                period TEXT NOT NULL,
+                                metric TEXT NOT NULL,
+                                date TEXT NOT NULL,
+                                value REAL,
+                                PRIMARY KEY (period, metric, date, feature)) WITHOUT ROWID;
                             """)
         
         self.conn.commit()
+        self.__migrate_single_horizon_tables()
+        self.__migrate_wide_performance()
+
+
+
+    def __rename_single_horizon_tables(self) -> None:
+        """Renames the tables created before the horizon column existed, so that create_tables creates them again with it."""
+        for table in SINGLE_HORIZON_TABLES:
+            self.cursor.execute("""SELECT name FROM pragma_table_info(?);""", (table,))
+            columns = [row[0] for row in self.cursor.fetchall()]
+            if columns and "horizon" not in columns:
+                self.cursor.execute(f"""ALTER TABLE {table} RENAME TO {table}_single_horizon;""")
+        self.conn.commit()
+
+
+
+    def __add_probability_column(self) -> None:
+        """Adds the y_prob column to a models_predictions table created before it existed (the older predictions keep NULL)."""
+        self.cursor.execute("""SELECT name FROM pragma_table_info('models_predictions');""")
+        if "y_prob" not in [row[0] for row in self.cursor.fetchall()]:
+            self.cursor.execute("""ALTER TABLE models_predictions ADD COLUMN y_prob REAL;""")
+
+
+
+    def __add_drift_start_column(self) -> None:
+        """Adds the start_date column to a features_drift_reference table created before it existed (the old reference keeps NULL)."""
+        self.cursor.execute("""SELECT name FROM pragma_table_info('features_drift_reference');""")
+        if "start_date" not in [row[0] for row in self.cursor.fetchall()]:
+            self.cursor.execute("""ALTER TABLE features_drift_reference ADD COLUMN start_date TEXT;""")
+
+
+
+    def __migrate_single_horizon_tables(self) -> None:
+        """Copies the rows of the renamed tables into the new ones as 1 day horizon rows, then drops them (safe to repeat after a crash)."""
+        for table, columns in SINGLE_HORIZON_TABLES.items():
+            self.cursor.execute("""SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?;""", (f"{table}_single_horizon",))
+            if self.cursor.fetchone() is None:
+                continue
+
+            with self.conn:
+                self.cursor.execute(f"""
+                                    INSERT OR IGNORE INTO {table} ({columns}, horizon)
+                                    SELECT {columns}, 1 FROM {table}_single_horizon;
+                                    """)
+                self.cursor.execute(f"""DROP TABLE {table}_single_horizon;""")
+
+
+
+    def __migrate_wide_performance(self) -> None:
+        """Copies the rows of the legacy wide models_performance table (if any) into models_metrics, once."""
+        self.cursor.execute("""SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'models_performance';""")
+        if self.cursor.fetchone() is None:
+            return
+
+        self.cursor.execute("""SELECT EXISTS(SELECT 1 FROM models_metrics);""")
+        if self.cursor.fetchone()[0]:
+            return
+
+        with self.conn:
+            for window in ["total", "7", "14", "30"]:   # the columns of the legacy table
+                for metric in PERFORMANCE_METRICS:
+                    self.cursor.execute(f"""
+                                        INSERT OR IGNORE INTO models_metrics (model_id, date, period, metric, value)
+                                        SELECT model_id, date, ?, ?, {metric}_{window} FROM models_performance;
+                                        """, (window, metric))
 
 
 
     def get_model_id(self, model_name: str) -> int:
-        self.cursor.execute("""
-                            SELECT id 
-                            FROM models WHERE model_name = ?;
-                            """, (model_name,))
-        
-        return self.cursor.fetchone()[0]
+        """Returns the id of the model, from the in-process cache (reloaded once on a miss, e.g. after another process added a model)."""
+        if self.__model_ids is None or model_name not in self.__model_ids:
+            self.cursor.execute("""
+                                SELECT model_name, id 
+                                FROM models;
+                                """)
+            self.__model_ids = dict(self.cursor.fetchall())
+
+        if model_name not in self.__model_ids:
+            raise ValueError(f"Unknown model: {model_name}")
+        return self.__model_ids[model_name]
     
 
 
@@ -216,41 +914,43 @@ class DBLogs:
     
 
 
+    def get_last_prediction_date(self) -> Optional[str]:
+        """Returns the most recent date with predictions."""
+        self.cursor.execute("""SELECT MAX(date) FROM models_predictions;""")
+        return self.cursor.fetchone()[0]
+
+
+
     def does_prediction_exists(self, date: str) -> bool:
         self.cursor.execute("""SELECT EXISTS(SELECT 1 FROM models_predictions WHERE date = ?);""", (date,))
         return self.cursor.fetchone()[0]
     
     
 
-    def __insert_prediction_id(self, model_id: int, date: str, y_pred: int) -> None:
+    def __insert_prediction_id(self, model_id: int, date: str, y_pred: int, y_prob: Optional[float] = None) -> None:
         self.cursor.execute("""
-            INSERT INTO models_predictions (model_id, date, y_true, y_pred) VALUES (?, ?, NULL, ?);""", 
-            (model_id, date, y_pred))
+            INSERT INTO models_predictions (model_id, date, y_true, y_pred, y_prob) VALUES (?, ?, NULL, ?, ?);""", 
+            (model_id, date, y_pred, y_prob))
         
         self.conn.commit()
     
 
 
-    def __insert_performance_id(self, model_id: int, performance_info: PerformanceWindows) -> None:
-        self.cursor.execute("""
-            INSERT INTO models_performance (model_id, date, recall_total, precision_total, accuracy_total, specificity_total, neg_pred_value_total,
-                                            recall_7, precision_7, accuracy_7, specificity_7, neg_pred_value_7,
-                                            recall_14, precision_14, accuracy_14, specificity_14, neg_pred_value_14,
-                                            recall_30, precision_30, accuracy_30, specificity_30, neg_pred_value_30) 
-                            
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);""", 
-            (model_id, performance_info.get_date(), *performance_info.get_data()))
-        
-        self.conn.commit()
+    def __insert_performance_id(self, model_id: int, records: PerformanceRecords) -> None:
+        with self.conn:     # single transaction for the whole batch
+            self.cursor.executemany("""
+                INSERT OR REPLACE INTO models_metrics (model_id, horizon, date, period, metric, value) VALUES (?, ?, ?, ?, ?, ?);""",
+                ((model_id, records.horizon, *row) for row in records.long_rows()))
     
 
 
-    def __get_model_predictions_id(self, model_id: int) -> pd.DataFrame:
+    def __get_model_predictions_id(self, model_id: int, horizon: int = 1) -> "pd.DataFrame":
+        import pandas as pd
         self.cursor.execute("""
                             SELECT date, y_true, y_pred 
                             FROM models_predictions 
-                            WHERE model_id = ?;
-                            """, (model_id,))
+                            WHERE model_id = ? AND horizon = ?;
+                            """, (model_id, horizon))
         
         return pd.DataFrame(self.cursor.fetchall(), columns=["date", "y_true", "y_pred"])
     
@@ -259,28 +959,71 @@ class DBLogs:
         self.cursor.execute("""
                             SELECT y_pred
                             FROM models_predictions
-                            WHERE model_id = ? AND date = ?;
+                            WHERE model_id = ? AND date = ? AND horizon = 1;
                             """, (model_id, date))
         return self.cursor.fetchone()[0]
     
     
 
-    def __get_model_performance_id(self, model_id: int) -> pd.DataFrame:
-        self.cursor.execute("""
-                            SELECT mp.date, m.model_name, mp.recall_total, mp.precision_total, mp.accuracy_total, mp.specificity_total, mp.neg_pred_value_total,
-                                            mp.recall_7, mp.precision_7, mp.accuracy_7, mp.specificity_7, mp.neg_pred_value_7,
-                                            mp.recall_14, mp.precision_14, mp.accuracy_14, mp.specificity_14, mp.neg_pred_value_14,
-                                            mp.recall_30, mp.precision_30, mp.accuracy_30, mp.specificity_30, mp.neg_pred_value_30
-                            FROM models_performance mp
-                            JOIN models m
-                            ON m.id = mp.model_id
-                            WHERE mp.model_id = ?;
-                            """, (model_id,))
-        
-        return pd.DataFrame(self.cursor.fetchall(), columns=PERFORMANCE_COLUMNS)
+    def __get_model_performance_id(self, model_id: int) -> "pd.DataFrame":
+        import pandas as pd
+
+        data = pd.DataFrame(self.__query_performance_id(model_id, PERFORMANCE_METRICS, PERFORMANCE_WINDOWS, None, None, None, 0))
+        data.insert(1, "model_name", self.get_model_name(model_id))
+        return data[PERFORMANCE_COLUMNS]
     
 
 
+    def __query_performance_id(self, model_id: int, metrics: List[str], windows: List[str], start_date: Optional[str],
+                               end_date: Optional[str], limit: Optional[int], offset: int, horizon: int = 1) -> Dict[str, np.ndarray]:
+        metric_marks, window_marks = ", ".join("?" * len(metrics)), ", ".join("?" * len(windows))
+        if limit is None and not offset:
+            # no paging: a range scan of the primary key per (window, metric), the cost grows with the date range, not the history
+            self.cursor.execute(f"""
+                                SELECT date, period, metric, value
+                                FROM models_metrics
+                                WHERE model_id = ? AND horizon = ? AND period IN ({window_marks}) AND metric IN ({metric_marks})
+                                      AND date BETWEEN COALESCE(?, '') AND COALESCE(?, '9999-12-31');
+                                """, (model_id, horizon, *windows, *metrics, start_date, end_date))
+            records = np.fromiter(self.cursor, dtype=[("date", "U10"), ("period", "U16"), ("metric", "U32"), ("value", np.float64)])
+            return self.__pivot_performance(records, metrics, windows)
+
+        self.cursor.execute(f"""
+                            WITH page AS (
+                                SELECT DISTINCT date
+                                FROM models_metrics
+                                WHERE model_id = ? AND horizon = ? AND date BETWEEN COALESCE(?, '') AND COALESCE(?, '9999-12-31')
+                                ORDER BY date
+                                LIMIT ? OFFSET ?)
+                            SELECT date, period, metric, value
+                            FROM models_metrics
+                            WHERE model_id = ? AND horizon = ? AND period IN ({window_marks}) AND metric IN ({metric_marks})
+                                  AND date IN (SELECT date FROM page);
+                            """, (model_id, horizon, start_date, end_date, -1 if limit is None else limit, offset,
+                                  model_id, horizon, *windows, *metrics))
+
+        # reading the cursor straight into a structured array, without the intermediate list of tuples
+        records = np.fromiter(self.cursor, dtype=[("date", "U10"), ("period", "U16"), ("metric", "U32"), ("value", np.float64)])
+        return self.__pivot_performance(records, metrics, windows)
+
+
+
+    @staticmethod
+    def __pivot_performance(records: np.ndarray, metrics: List[str], windows: List[str]) -> Dict[str, np.ndarray]:
+        """Pivots long (date, period, metric, value) records into one column per metric and window, ordered by date."""
+        dates, date_idx = np.unique(records["date"], return_inverse=True)
+        result = {"date": dates}
+        for metric in metrics:
+            for window in windows:
+                mask = (records["metric"] == metric) & (records["period"] == window)
+                column = np.full(len(dates), np.nan)
+                column[date_idx[mask]] = records["value"][mask]
+                result[f"{metric}_{window}"] = column
+
+        return result
+
+
+
     def close(self):
         self.conn.close()
 
@@ -288,18 +1031,25 @@ class DBLogs:
 
 
 
-PERFORMANCE_COLUMNS = ["date", "model_name", "recall_total", "precision_total", "accuracy_total", "specificity_total", "neg_pred_value_total",
-                       "recall_7", "precision_7", "accuracy_7", "specificity_7", "neg_pred_value_7",
-                       "recall_14", "precision_14", "accuracy_14", "specificity_14", "neg_pred_value_14",
-                       "recall_30", "precision_30", "accuracy_30", "specificity_30", "neg_pred_value_30"]
+PERFORMANCE_METRICS = list(METRICS)
+PERFORMANCE_WINDOWS = list(WINDOWS)
+
+PERFORMANCE_COLUMNS = ["date", "model_name"] + [f"{metric}_{window}" for window in PERFORMANCE_WINDOWS for metric in PERFORMANCE_METRICS]
 
 PREDICTION_COLUMNS = ["date", "y_true", "y_pred"]
 
+# tables that got the horizon column, with the columns copied by the migration
+SINGLE_HORIZON_TABLES = {"models_metrics": "model_id, date, period, metric, value",
+                         "models_predictions": "id, model_id, date, y_true, y_pred"}
+
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
 
 
 if __name__ == "__main__": 
+    from models_container.EstimatorRegistry import EstimatorRegistry
+
     db = DBLogs()
-    db.insert_model("GradientBoost")
-    db.insert_model("RandomForest")
-    db.insert_model("AdaBoost")
+    db.connect()
+    EstimatorRegistry().register_models(db)     # the estimators declared in config.ESTIMATORS
     db.close()
\ No newline at end of file
@@ -0,0 +1,244 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+from config import DRIFT_BINS, DRIFT_REFIT_PSI, DRIFT_REFIT_WINDOW, DRIFT_WINDOWS
+from model_tracking.DataBaseLogs import DBLogs
+
+DRIFT_METRICS = ["psi", "ks"]
+EPSILON = 1e-4      # floor of the bin shares in the PSI, an empty bin would make it infinite
+
+
+
+class DriftMonitor:
+    """
+    Drift of the model inputs away from their training distribution.
+
+    The reference cuts every feature into fixed bins (the quantiles of the training matrix) and keeps the share of the
+    training rows in every bin. Every new day is assigned to its bins once and the histograms of the rolling windows are
+    updated incrementally: the day entering a window is added and the day leaving it is subtracted, so a daily update
+    costs O(features x bins) whatever the length of the history. The PSI and KS scores of every window against the
+    reference are stored in the features_drift table, next to models_metrics.
+
+    Usage:
+        monitor = DriftMonitor(db, engine.features)
+        monitor.rebase(dates, X)        # once, with the training matrix
+        monitor.update(dates, X)        # every day, only the days not monitored yet are added
+        monitor.should_refit()          # then rebase on the recent rows and train from get_training_start() on
+    """
+
+
+    def __init__(self, db: DBLogs, features: Sequence[str], bins: int = DRIFT_BINS, windows: Sequence[int] = DRIFT_WINDOWS):
+        """
+        Parameters:
+            db (DBLogs): Connected database holding the reference, the histograms and the scores.
+            features (Sequence[str]): Names of the columns of the feature matrices.
+            bins (int): Number of bins per feature. Default is config.DRIFT_BINS.
+            windows (Sequence[int]): Rolling windows in calendar days. Default is config.DRIFT_WINDOWS.
+        """
+        self.db = db
+        self.features = list(features)
+        self.bins = bins
+        self.windows = [int(window) for window in windows]
+
+
+    def has_reference(self) -> bool:
+        """Checks whether a reference of the same features and bins is stored."""
+        reference = self.db.get_drift_reference()
+        return sorted(set(reference["feature"].tolist())) == sorted(self.features) and len(reference["bin"]) == len(self.features) * self.bins
+
+
+    def rebase(self, dates: np.ndarray, X: np.ndarray) -> None:
+        """
+        Sets the reference to the distribution of X (the training matrix) and restarts the histograms of the windows
+        from its last days. The only step that reads the whole history, done when the estimators are refitted.
+        The first date of X is stored as the start of the training window (see get_training_start).
+
+        Parameters:
+            dates (np.ndarray): Sorted dates of the rows in the format "%Y-%m-%d".
+            X (np.ndarray): Feature matrix, one column per feature.
+        """
+        dates, X = np.asarray(dates, dtype="U10"), np.asarray(X, dtype=np.float64)
+        edges = np.quantile(X, np.linspace(0, 1, self.bins + 1)[1:-1], axis=0).T       # (features, bins - 1)
+        binned = self.__assign(X, edges)
+        proportions = self.__histogram(binned) / len(X)
+
+        uppers = np.hstack([edges, np.full((len(self.features), 1), np.inf)])
+        reference_rows = [(feature, b, uppers[f, b], proportions[f, b], dates[-1], dates[0])
+                          for f, feature in enumerate(self.features) for b in range(self.bins)]
+
+        days = dates.astype("datetime64[D]").astype(np.int64)
+        kept = days > days[-1] - max(self.windows)
+        histograms = np.stack([self.__histogram(binned[days > days[-1] - window]) for window in self.windows])
+
+        self.db.set_drift_reference(reference_rows, self.__bins_rows(dates[kept], binned[kept]), self.__histogram_rows(histograms))
+
+
+    def update(self, dates: np.ndarray, X: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Adds the days newer than the last monitored one to the windows and stores their drift scores.
+        The older rows of X are ignored, so the whole feature matrix of the day can be passed.
+
+        Parameters:
+            dates (np.ndarray): Sorted dates of the rows in the format "%Y-%m-%d".
+            X (np.ndarray): Feature matrix, one column per feature.
+
+        Returns:
+            Dict[str, np.ndarray]: Scores of the new days in the long layout: "date", "period", "feature", "psi" and "ks".
+        """
+        edges, proportions = self.__load_reference()
+        last = self.db.get_last_drift_date()
+
+        dates = np.asarray(dates, dtype="U10")
+        new = dates > last
+        dates, binned = dates[new], self.__assign(np.asarray(X, dtype=np.float64)[new], edges)
+        if not len(dates):
+            return {"date": dates, "period": np.array([], dtype="U16"), "feature": np.array([], dtype="U32"),
+                    "psi": np.array([]), "ks": np.array([])}
+
+        days = dates.astype("datetime64[D]").astype(np.int64)
+        last_day = np.datetime64(last, "D").astype(np.int64)
+        rows, features = np.arange(len(days))[:, None], np.arange(len(self.features))[None, :]
+
+        # change of every window histogram on every new day: +1 in the bins of the day entering the window,
+        # -1 in the bins of the day leaving it (stored days leave first, then the new days themselves)
+        delta = np.zeros((len(days), len(self.windows), len(self.features), self.bins), dtype=np.int64)
+        for w, window in enumerate(self.windows):
+            np.add.at(delta, (rows, w, features, binned), 1)
+
+            leaving_days, leaving_bins = self.__get_stored_bins(last_day - window + 1, days[-1] - window)
+            leaving_days = np.concatenate([leaving_days, days[days + window <= days[-1]]])
+            leaving_bins = np.concatenate([leaving_bins, binned[days + window <= days[-1]]])
+            leaves = np.searchsorted(days, leaving_days + window)      # first new day without the leaving day
+            np.add.at(delta, (leaves[:, None], w, features, leaving_bins), -1)
+
+        histograms = self.__load_histograms() + np.cumsum(delta, axis=0)     # (days, windows, features, bins)
+        psi, ks = self.get_scores(histograms, proportions)
+
+        periods = [str(window) for window in self.windows]
+        score_rows = [(feature, period, metric, date, value)
+                      for metric, values in zip(DRIFT_METRICS, [psi.tolist(), ks.tolist()])
+                      for date, per_window in zip(dates.tolist(), values)
+                      for period, per_feature in zip(periods, per_window)
+                      for feature, value in zip(self.features, per_feature)]
+
+        keep_from = str(np.datetime64(int(days[-1]) - max(self.windows) + 1, "D"))
+        self.db.insert_drift_update(self.__bins_rows(dates, binned), self.__histogram_rows(histograms[-1]), score_rows, keep_from)
+
+        shape = psi.shape
+        return {"date": np.repeat(dates, shape[1] * shape[2]),
+                "period": np.tile(np.repeat(np.array(periods), shape[2]), shape[0]),
+                "feature": np.tile(np.array(self.features), shape[0] * shape[1]),
+                "psi": psi.ravel(), "ks": ks.ravel()}
+
+
+    def should_refit(self, window: int = DRIFT_REFIT_WINDOW, threshold: float = DRIFT_REFIT_PSI) -> bool:
+        """
+        Checks whether the mean PSI of the features in the window on the last monitored day is above the threshold.
+        Only once the window holds no day of the reference, so a rebase is not followed by another one the next day.
+        """
+        reference, last = self.db.get_drift_reference(), self.db.get_last_drift_date()
+        if not len(reference["date"]) or last is None:
+            return False
+        if np.datetime64(last, "D") - np.datetime64(reference["date"][0], "D") < window:
+            return False
+
+        scores = self.db.query_feature_drift(metric="psi", period=str(window), start_date=last, end_date=last)
+        if not scores or not len(scores["date"]):
+            return False
+
+        values = np.array([scores[feature][-1] for feature in self.features if feature in scores])
+        return bool(len(values)) and float(np.nanmean(values)) > threshold
+
+
+    def get_training_start(self) -> Optional[str]:
+        """
+        Returns the first day of the training matrix of the reference: the estimators are trained from it on, so after a
+        drift rebase on the recent rows they leave the old regime out. None (the whole history) without a reference.
+        """
+        start = self.db.get_drift_reference()["start_date"]
+        return str(start[0]) if len(start) and start[0] else None
+
+
+    @staticmethod
+    def get_scores(histograms: np.ndarray, proportions: np.ndarray) -> tuple:
+        """
+        Population stability index and Kolmogorov-Smirnov distance (on the binned CDFs) of histograms against the reference.
+
+        Parameters:
+            histograms (np.ndarray): Counts with the bins on the last axis, e.g. (days, windows, features, bins).
+            proportions (np.ndarray): Reference shares (features, bins), broadcast against the histograms.
+
+        Returns:
+            tuple: (psi, ks) arrays of the histograms' shape without the bins axis, NaN for empty histograms.
+        """
+        totals = histograms.sum(axis=-1, keepdims=True)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            shares = histograms / totals
+
+        p, q = np.maximum(shares, EPSILON), np.maximum(proportions, EPSILON)
+        psi = ((p - q) * np.log(p / q)).sum(axis=-1)
+        ks = np.abs(np.cumsum(shares, axis=-1) - np.cumsum(proportions, axis=-1)).max(axis=-1)
+
+        empty = totals[..., 0] == 0
+        psi[empty], ks[empty] = np.nan, np.nan
+        return psi, ks
+
+
+    def __assign(self, X: np.ndarray, edges: np.ndarray) -> np.ndarray:
+        """Bin of every value (rows, features): the number of upper edges of the feature that are <= the value."""
+        return (X[:, :, None] >= edges[None, :, :]).sum(axis=2)
+
+
+    def __histogram(self, binned: np.ndarray) -> np.ndarray:
+        """Counts (features, bins) of binned rows."""
+        offsets = np.arange(len(self.features)) * self.bins
+        return np.bincount((binned + offsets).ravel(), minlength=len(self.features) * self.bins).reshape(len(self.features), self.bins)
+
+
+    def __load_reference(self) -> tuple:
+        """Returns the inner bin edges (features, bins - 1) and the reference shares (features, bins) in the order of self.features."""
+        if not self.has_reference():
+            raise ValueError("No drift reference for these features, call DriftMonitor.rebase with the training matrix first.")
+
+        reference = self.db.get_drift_reference()
+        stored = {feature: f for f, feature in enumerate(reference["feature"][::self.bins].tolist())}     # stored by feature name
+        order = [stored[feature] for feature in self.features]
+        uppers = reference["upper"].reshape(-1, self.bins)[order]
+        proportions = reference["proportion"].reshape(-1, self.bins)[order]
+        return uppers[:, :-1], proportions
+
+
+    def __load_histograms(self) -> np.ndarray:
+        """Returns the current histograms (windows, features, bins)."""
+        stored = self.db.get_drift_histograms()
+        histograms = np.zeros((len(self.windows), len(self.features), self.bins), dtype=np.int64)
+        periods, features = [str(window) for window in self.windows], {feature: f for f, feature in enumerate(self.features)}
+        for period, feature, b, count in zip(*(stored[name].tolist() for name in ["period", "feature", "bin", "count"])):
+            if period in periods and feature in features:
+                histograms[periods.index(period), features[feature], b] = count
+        return histograms
+
+
+    def __get_stored_bins(self, first_day: int, last_day: int) -> tuple:
+        """Returns the ordinal days and the bins (days, features) of the stored days between first_day and last_day (inclusive)."""
+        if last_day < first_day:
+            return np.array([], dtype=np.int64), np.zeros((0, len(self.features)), dtype=np.int64)
+
+        stored = self.db.get_feature_bins(str(np.datetime64(int(first_day), "D")), str(np.datetime64(int(last_day), "D")))
+        dates, date_idx = np.unique(stored["date"], return_inverse=True)
+        features = {feature: f for f, feature in enumerate(self.features)}
+
+        binned = np.zeros((len(dates), len(self.features)), dtype=np.int64)
+        binned[date_idx, [features[feature] for feature in stored["feature"].tolist()]] = stored["bin"]
+        return dates.astype("datetime64[D]").astype(np.int64), binned
+
+
+    def __bins_rows(self, dates: np.ndarray, binned: np.ndarray) -> List[tuple]:
+        return [(date, feature, b) for date, per_feature in zip(dates.tolist(), binned.tolist()) for feature, b in zip(self.features, per_feature)]
+
+
+    def __histogram_rows(self, histograms: np.ndarray) -> List[tuple]:
+        return [(str(window), feature, b, count)
+                for window, per_window in zip(self.windows, histograms.tolist())
+                for feature, per_feature in zip(self.features, per_window)
+                for b, count in enumerate(per_feature)]
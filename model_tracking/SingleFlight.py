@@ -0,0 +1,64 @@
+import os
+import socket
+import threading
+import time
+from typing import Callable
+
+from config import PREDICTION_LEASE_TTL, PREDICTION_WAIT
+from model_tracking.DataBaseLogs import DBLogs
+
+
+
+class SingleFlight:
+    """
+    Cross-process single flight on top of the job_leases table: of all the processes (and threads) that need the
+    same result at the same time, exactly one computes it while the others wait for it to appear in the database.
+
+    Usage:
+        SingleFlight(db, f"predict:{today}").run(compute=..., done=lambda: db.does_prediction_exists(today))
+    """
+
+
+    def __init__(self, db: DBLogs, name: str, ttl: float = PREDICTION_LEASE_TTL, wait: float = PREDICTION_WAIT, poll: float = 0.5):
+        """
+        Parameters:
+            db (DBLogs): Connected database holding the leases.
+            name (str): Name of the lease, e.g. "predict:2024-07-17".
+            ttl (float): Seconds after which the lease of a holder that crashed expires.
+            wait (float): Maximum seconds to wait for the result computed by another process.
+            poll (float): Seconds between the checks while waiting.
+        """
+        self.db = db
+        self.name = name
+        self.ttl = ttl
+        self.wait = wait
+        self.poll = poll
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+    def run(self, compute: Callable[[], None], done: Callable[[], bool]) -> bool:
+        """
+        Computes the result unless it is done already or another process is computing it.
+
+        Parameters:
+            compute (Callable[[], None]): Computes and stores the result, called only by the lease holder.
+            done (Callable[[], bool]): Checks whether the result is stored.
+
+        Returns:
+            bool: True if the result is available, False if the wait timed out while another process was still computing.
+        """
+        deadline = time.monotonic() + self.wait
+        while not done():
+            if self.db.acquire_lease(self.name, self.owner, self.ttl):
+                try:
+                    if not done():      # checked again under the lease: the previous holder may have just finished
+                        compute()
+                finally:
+                    self.db.release_lease(self.name, self.owner)
+                return True
+
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(self.poll)
+
+        return True
@@ -0,0 +1,208 @@
+import argparse
+import sys
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+from config import BACKTEST_FEES, BACKTEST_SIZING, BACKTEST_THRESHOLDS
+from model_tracking.DataBaseLogs import DBLogs, DB_PATH
+from models_container.EstimatorRegistry import EstimatorRegistry
+
+TRADING_DAYS = 365      # BTC trades every day
+
+# Share of the equity invested on a signal, from the class 1 probabilities (broadcast against the long signals)
+SIZING_RULES = {
+    "full": lambda y_prob: 1.0,
+    "half": lambda y_prob: 0.5,
+    "kelly": lambda y_prob: np.clip(2 * y_prob - 1, 0, 1),    # Kelly fraction of an even-money bet
+}
+
+
+
+class StrategyBacktest:
+    """
+    Trading outcome of the stored predictions: the predictions of every model are put on a continuous daily calendar
+    with the cached close prices and a long / cash strategy is simulated for the whole grid of probability thresholds
+    x fees x sizing rules in one vectorized pass (the scenarios are broadcast against each other, there is no loop per scenario).
+
+    On every date the strategy buys when the class 1 probability is above the threshold and holds for `horizon` days.
+    For horizons longer than a day the equity is split in `horizon` tranches, one entering every day, so every
+    position is 1/horizon of the equity and earns the daily close to close returns while it is held. Fees are paid on
+    the traded amount (the change of the position of the tranche). A day without a stored prediction opens no position.
+
+    Predictions stored before the probabilities were have no y_prob: their stored decision (y_pred as 0 / 1) is used,
+    so they trade the same way at every threshold.
+    """
+
+
+    def __init__(self, db: DBLogs, thresholds: Sequence[float] = BACKTEST_THRESHOLDS, fees: Sequence[float] = BACKTEST_FEES,
+                 sizing: Sequence[str] = BACKTEST_SIZING):
+        """
+        Parameters:
+            db (DBLogs): Connected database with the predictions and the cached prices.
+            thresholds (Sequence[float]): Probability thresholds of the class 1. Default is config.BACKTEST_THRESHOLDS.
+            fees (Sequence[float]): Fees as a share of the traded amount, e.g. 0.001 = 0.1%. Default is config.BACKTEST_FEES.
+            sizing (Sequence[str]): Sizing rules, keys of SIZING_RULES. Default is config.BACKTEST_SIZING.
+        """
+        unknown = set(sizing) - set(SIZING_RULES)
+        if unknown:
+            raise ValueError(f"Unknown sizing rules: {sorted(unknown)}")
+
+        self.db = db
+        self.thresholds = np.asarray(thresholds, dtype=np.float64)
+        self.fees = np.asarray(fees, dtype=np.float64)
+        self.sizing = list(sizing)
+
+
+    def run(self, models: Optional[List[str]] = None, horizon: int = 1, start_date: Optional[str] = None,
+            end_date: Optional[str] = None) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Simulates the whole grid for every model (all the estimators with stored predictions by default, fast backends included).
+
+        Returns:
+            Dict[str, Dict[str, np.ndarray]]: model_name -> one row per scenario: "threshold", "fee", "sizing", "total_return",
+                                              "sharpe", "max_drawdown", "hit_rate", "trades", "exposure", plus the scenario
+                                              independent "buy_and_hold", "days" and "with_probability" (share of the predictions with a stored y_prob).
+        """
+        data = self.db.query_predictions_returns(horizon=horizon, start_date=start_date, end_date=end_date) or {}
+        first = min((predictions["date"][0] for predictions in data.values() if len(predictions["date"])), default=None)
+        prices = self.db.query_close_prices(start_date=first) if first else None
+
+        results = {}
+        for name in models or list(data):
+            if name not in data or prices is None:
+                continue
+            y_prob = np.where(np.isnan(data[name]["y_prob"]), data[name]["y_pred"], data[name]["y_prob"])
+            y_prob, returns = self.to_calendar(data[name]["date"], y_prob, prices["date"], prices["close"], horizon)
+            results[name] = self.to_rows(self.simulate(y_prob, returns, horizon))
+            results[name]["with_probability"] = np.full(len(results[name]["threshold"]), np.mean(~np.isnan(data[name]["y_prob"])))
+
+        return results
+
+
+    @staticmethod
+    def to_calendar(dates: np.ndarray, y_prob: np.ndarray, price_dates: np.ndarray, close: np.ndarray, horizon: int = 1) -> tuple:
+        """
+        Puts the predictions on a continuous daily calendar, from the first prediction date to the last day on which its
+        positions are held (the last date + horizon - 1).
+
+        Parameters:
+            dates (np.ndarray): Sorted dates of the predictions in the format "%Y-%m-%d".
+            y_prob (np.ndarray): Class 1 probabilities of the dates.
+            price_dates (np.ndarray): Sorted dates of the close prices, covering the calendar and the day after it.
+            close (np.ndarray): The close prices.
+            horizon (int): Holding period in days. Default is 1.
+
+        Returns:
+            tuple: (y_prob, returns) of every calendar day: NaN probabilities on the days without a prediction and the return
+                   of the close price from the day to the next one (a missing close is carried forward from the previous day).
+        """
+        days = np.asarray(dates).astype("datetime64[D]")
+        calendar = np.arange(days[0], days[-1] + horizon + 1)      # the calendar days and the day after the last one
+
+        daily_prob = np.full(len(calendar) - 1, np.nan)
+        daily_prob[(days - days[0]).astype(np.int64)] = y_prob
+
+        closes = np.asarray(close, dtype=np.float64)[np.searchsorted(np.asarray(price_dates).astype("datetime64[D]"), calendar, side="right") - 1]
+        return daily_prob, closes[1:] / closes[:-1] - 1
+
+
+    def simulate(self, y_prob: np.ndarray, returns: np.ndarray, horizon: int = 1, equity: bool = False) -> Dict[str, np.ndarray]:
+        """
+        Simulates every scenario on one series of predictions on a continuous daily calendar (see to_calendar).
+
+        Parameters:
+            y_prob (np.ndarray): Class 1 probabilities, one per day (NaN on the days without a prediction).
+            returns (np.ndarray): Return of the close price from every day to the next one.
+            horizon (int): Holding period in days. Default is 1.
+            equity (bool): Also return the equity curves (fees, sizing, thresholds, days). Default is False.
+
+        Returns:
+            Dict[str, np.ndarray]: Metrics of shape (fees, sizing, thresholds): "total_return", "sharpe", "max_drawdown",
+                                   "hit_rate" (share of the days in the market with a positive net return), "trades" (number of
+                                   entries) and "exposure" (mean share of the equity invested), plus "buy_and_hold" and "days".
+        """
+        y_prob, returns = np.asarray(y_prob, dtype=np.float64), np.asarray(returns, dtype=np.float64)
+        thresholds = self.thresholds[:, None]
+
+        long = y_prob[None, :] > thresholds                                                      # (thresholds, days), False without a prediction
+        entries = np.stack([np.where(long, SIZING_RULES[rule](y_prob), 0.0) for rule in self.sizing]) / horizon     # (sizing, thresholds, days)
+
+        # the tranche entering on a day replaces the one that entered `horizon` days earlier,
+        # the invested share of a day is the sum of the `horizon` tranches held on it
+        previous = np.zeros_like(entries)
+        previous[..., horizon:] = entries[..., :-horizon]
+        traded = np.abs(entries - previous)
+        held = entries.copy()
+        for lag in range(1, horizon):
+            held[..., lag:] += entries[..., :-lag]
+
+        net = held * returns - self.fees[:, None, None, None] * traded                          # (fees, sizing, thresholds, days)
+        curves = np.cumprod(1 + net, axis=-1)
+        peaks = np.maximum(np.maximum.accumulate(curves, axis=-1), 1)
+
+        invested = held > 0
+        trades = (traded > 0) & (entries > 0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sharpe = net.mean(axis=-1) / net.std(axis=-1) * np.sqrt(TRADING_DAYS)
+            hit_rate = ((net > 0) & invested).sum(axis=-1) / invested.sum(axis=-1)
+
+        result = {"total_return": curves[..., -1] - 1 if len(returns) else np.zeros(net.shape[:-1]),
+                  "sharpe": sharpe,
+                  "max_drawdown": (1 - curves / peaks).max(axis=-1, initial=0),
+                  "hit_rate": hit_rate,
+                  "trades": np.broadcast_to(trades.sum(axis=-1), net.shape[:-1]),
+                  "exposure": np.broadcast_to(held.mean(axis=-1) if len(returns) else 0.0, net.shape[:-1]),
+                  "buy_and_hold": np.prod(1 + returns) - 1,     # the close prices of the calendar, from its first day to the day after its last
+                  "days": len(returns)}
+        if equity:
+            result["equity"] = curves
+        return result
+
+
+    def to_rows(self, simulation: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Flattens the (fees, sizing, thresholds) metrics of simulate into one row per scenario."""
+        fee, sizing, threshold = np.meshgrid(self.fees, np.array(self.sizing), self.thresholds, indexing="ij")
+        rows = {"threshold": threshold.ravel(), "fee": fee.ravel(), "sizing": sizing.ravel()}
+        for metric in ["total_return", "sharpe", "max_drawdown", "hit_rate", "trades", "exposure"]:
+            rows[metric] = np.asarray(simulation[metric]).ravel()
+        for name in ["buy_and_hold", "days"]:
+            rows[name] = np.full(len(rows["threshold"]), simulation[name])
+        return rows
+
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Backtests the stored predictions over a grid of thresholds, fees and sizing rules.")
+    parser.add_argument("--db", default=DB_PATH, help="Path to the SQLite database.")
+    parser.add_argument("--horizon", type=int, default=1, help="Prediction horizon (holding period) in days.")
+    parser.add_argument("--start", default=None, help="First date (inclusive) in the format %%Y-%%m-%%d.")
+    parser.add_argument("--end", default=None, help="Last date (inclusive) in the format %%Y-%%m-%%d.")
+    parser.add_argument("--top", type=int, default=5, help="Number of best scenarios (by Sharpe ratio) shown per model.")
+    args = parser.parse_args(argv)
+
+    db = DBLogs(args.db)
+    db.connect()
+    try:
+        results = StrategyBacktest(db).run(horizon=args.horizon, start_date=args.start, end_date=args.end)
+    finally:
+        db.close()
+
+    specs = EstimatorRegistry(use_fast_backends=True).get_specs()
+    for name, rows in results.items():
+        print(f"--------- {name}: {rows['days'][0]} days, buy and hold {rows['buy_and_hold'][0]:+.1%},"
+              f" probabilities stored for {rows['with_probability'][0]:.0%} of the predictions ---------")
+
+        configured = np.isclose(rows["threshold"], specs[name]["threshold"]) if name in specs else np.zeros(len(rows["threshold"]), dtype=bool)
+        best = np.argsort(-np.nan_to_num(rows["sharpe"], nan=-np.inf))[:args.top]
+        for label, indices in [("configured", np.flatnonzero(configured)), ("best", best)]:
+            for i in indices.tolist():
+                print(f"{label:10} | threshold {rows['threshold'][i]:.2f} | fee {rows['fee'][i]:.2%} | {rows['sizing'][i]:5} | return {rows['total_return'][i]:+8.1%}"
+                      f" | sharpe {rows['sharpe'][i]:5.2f} | drawdown {rows['max_drawdown'][i]:6.1%} | hit rate {rows['hit_rate'][i]:6.1%}"
+                      f" | {rows['trades'][i]:4d} trades | exposure {rows['exposure'][i]:.0%}")
+
+    return 0
+
+
+
+if __name__ == "__main__":
+    sys.exit(main())
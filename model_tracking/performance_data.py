@@ -1,45 +1,316 @@
+import numpy as np
+from typing import Iterator, Optional, Sequence, Tuple
+from config import BANDS_ALPHA, BANDS_BLOCK, BANDS_RESAMPLES, PERFORMANCE_METRICS, PERFORMANCE_WINDOWS
 
 
+METRICS = tuple(PERFORMANCE_METRICS)
+WINDOWS = tuple(PERFORMANCE_WINDOWS)
 
-class PerformanceBatch:
 
-    def __init__(self, recall: float, precision: float, accuracy: float, specificity: float, neg_pred_value: float):
-        self.recall = recall
-        self.precision = precision
-        self.accuracy = accuracy
-        self.specificity = specificity
-        self.neg_pred_value = neg_pred_value
 
-    
-    def get_data(self):
-        return self.recall, self.precision, self.accuracy, self.specificity, self.neg_pred_value
+class PerformanceRecords:
+    """
+    Columnar batch of model performance (of one prediction horizon): one float64 array of shape (dates, windows, metrics).
+    Filled in place and handed to DBLogs.insert_model_performance as a whole for one bulk insert.
+    """
 
+    __slots__ = ("estimator", "dates", "windows", "metrics", "values", "horizon")
 
 
-class PerformanceWindows:
+    def __init__(self, estimator: str, dates: Sequence[str], windows: Sequence[str] = WINDOWS, metrics: Sequence[str] = METRICS,
+                 horizon: int = 1):
+        self.estimator = estimator
+        self.horizon = horizon
+        self.dates = np.asarray(dates, dtype="U10")
+        self.windows = tuple(windows)
+        self.metrics = tuple(metrics)
+        self.values = np.full((len(self.dates), len(self.windows), len(self.metrics)), np.nan)
+
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+
+    def set(self, date_idx: int, window: str, metric_values: Sequence[float]) -> None:
+        self.values[date_idx, self.windows.index(window)] = metric_values
+
+
+    def long_rows(self) -> Iterator[Tuple[str, str, str, float]]:
+        """Yields (date, window, metric, value) rows ready for executemany into the long-format table."""
+        for date, per_window in zip(self.dates.tolist(), self.values.tolist()):
+            for window, per_metric in zip(self.windows, per_window):
+                for metric, value in zip(self.metrics, per_metric):
+                    yield date, window, metric, value
+
+
+    def get_estimator(self) -> str:
+        return self.estimator
+
+
+
+class SlidingConfusion:
+    """
+    Confusion counts (tp, fp, tn, fn) over the last `days` calendar days, kept in a ring buffer of daily counts.
+    Pushing a new day adds it and drops the expired days, so a daily update costs O(1) instead of re-filtering the history.
+    With days=None the counts are cumulative (the "total" window).
+    """
+
+    __slots__ = ("days", "counts", "buffer", "last_day")
+
+
+    def __init__(self, days: Optional[int] = None):
+        self.days = days
+        self.counts = [0, 0, 0, 0]
+        self.buffer = [[0, 0, 0, 0] for _ in range(days)] if days else None
+        self.last_day = None
+
+
+    def push(self, day: int, y_true: int, y_pred: int) -> None:
+        """
+        Adds one observation.
+
+        Parameters:
+            day (int): Ordinal day of the observation (non-decreasing between calls).
+            y_true (int): The real value.
+            y_pred (int): The predicted value.
+        """
+        # tp -> 0, fp -> 1, tn -> 2, fn -> 3
+        cell = 2 * (1 - int(y_pred)) + int(int(y_true) != int(y_pred))
+
+        if self.buffer is not None:
+            self.__advance(day)
+            self.buffer[day % self.days][cell] += 1
+
+        self.counts[cell] += 1
+
+
+    def get_metrics(self, metrics: Sequence[str] = METRICS) -> Tuple[float, ...]:
+        """Returns the requested metrics (in the given order) for the current window, 0 on zero division like sklearn."""
+        tp, fp, tn, fn = self.counts
+        total = tp + fp + tn + fn
+
+        values = {
+            "recall": tp / (tp + fn) if tp + fn else 0.0,
+            "precision": tp / (tp + fp) if tp + fp else 0.0,
+            "accuracy": (tp + tn) / total if total else 0.0,
+            "specificity": tn / (tn + fp) if tn + fp else 0.0,       # recall for the negative class
+            "neg_pred_value": tn / (tn + fn) if tn + fn else 0.0,   # precision for the negative class
+        }
+        return tuple(values[metric] for metric in metrics)
+
+
+    def __advance(self, day: int) -> None:
+        """Clears the slots of the days that left the window (at most `days` slots, however long the gap is)."""
+        if self.last_day is None:
+            self.last_day = day
+            return
+
+        for expired in range(self.last_day + 1, min(day, self.last_day + self.days) + 1):
+            slot = self.buffer[expired % self.days]
+            for cell in range(4):
+                self.counts[cell] -= slot[cell]
+                slot[cell] = 0
+
+        self.last_day = max(self.last_day, day)
+
+
+
+def metrics_from_counts(counts: np.ndarray, metrics: Sequence[str] = METRICS) -> np.ndarray:
+    """
+    Vectorized SlidingConfusion.get_metrics: counts has shape (..., 4) with (tp, fp, tn, fn) in the last axis,
+    the result has shape (..., len(metrics)). Zero divisions give 0 like sklearn.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    tp, fp, tn, fn = (counts[..., i] for i in range(4))
+
+    def ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+        return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+    values = {
+        "recall": lambda: ratio(tp, tp + fn),
+        "precision": lambda: ratio(tp, tp + fp),
+        "accuracy": lambda: ratio(tp + tn, tp + fp + tn + fn),
+        "specificity": lambda: ratio(tn, tn + fp),
+        "neg_pred_value": lambda: ratio(tn, tn + fn),
+    }
+    return np.stack([values[metric]() for metric in metrics], axis=-1)
+
+
+
+PERFORMANCE_START = 150     # the performance starts with the 150th labelled prediction
 
 
-    def __init__(self, estimator: str,  date: str, batch_total: PerformanceBatch, batch_7: PerformanceBatch, batch_14: PerformanceBatch, batch_30: PerformanceBatch):
+
+def get_performance_records(estimator: str, dates: np.ndarray, y_true: np.ndarray, y_pred: np.ndarray,
+                            targets: Optional[Sequence[str]] = None, horizon: int = 1) -> PerformanceRecords:
+    """
+    Sliding window performance of the labelled predictions: every prediction is pushed once into one SlidingConfusion
+    per window and the metrics are read on the target dates, from the PERFORMANCE_START-th prediction on.
+
+    Parameters:
+        estimator (str): The name of the estimator.
+        dates (np.ndarray): Sorted dates of the labelled predictions in the format "%Y-%m-%d".
+        y_true (np.ndarray): The real values.
+        y_pred (np.ndarray): The predicted values.
+        targets (Sequence[str], optional): The dates to calculate, e.g. the missing ones. Default is all of them.
+        horizon (int): The prediction horizon in days. Default is 1.
+
+    Returns:
+        PerformanceRecords: The metrics of the target dates (empty with fewer than PERFORMANCE_START predictions).
+    """
+    dates = np.asarray(dates, dtype="U10")
+    selected = np.arange(len(dates)) >= PERFORMANCE_START - 1
+    if targets is not None:
+        selected &= np.isin(dates, np.asarray(targets, dtype="U10"))
+
+    records = PerformanceRecords(estimator, dates[selected], horizon=horizon)     # one array for all the dates x windows x metrics
+    if not len(records):
+        return records
+
+    # one sliding confusion counter per window: every day is added once and dropped once when it expires
+    counters = {window: SlidingConfusion(None if window == "total" else int(window)) for window in records.windows}
+    days = dates.astype("datetime64[D]").astype(np.int64)
+
+    i = 0
+    for day, true, pred, target in zip(days.tolist(), np.asarray(y_true).tolist(), np.asarray(y_pred).tolist(), selected.tolist()):
+        for counter in counters.values():
+            counter.push(day, true, pred)
+
+        if target:
+            for window, counter in counters.items():
+                records.set(i, window, counter.get_metrics(records.metrics))
+            i += 1
+
+    return records
+
+
+
+PACKED_LIMIT = 2**16     # BlockBootstrap packs the confusion counts into 16 bit fields
+
+
+
+class PerformanceBands:
+    """
+    Columnar batch of bootstrap confidence bands (of one prediction horizon): lower and upper float64 arrays of shape
+    (dates, windows, metrics), handed to DBLogs.insert_model_bands as a whole like PerformanceRecords.
+    """
+
+    __slots__ = ("estimator", "dates", "windows", "metrics", "lower", "upper", "horizon")
+
+
+    def __init__(self, estimator: str, dates: Sequence[str], windows: Sequence[str] = WINDOWS, metrics: Sequence[str] = METRICS,
+                 horizon: int = 1):
         self.estimator = estimator
-        self.date = date
-        self.batch_total = batch_total
-        self.batch_7 = batch_7
-        self.batch_14 = batch_14
-        self.batch_30 = batch_30
+        self.horizon = horizon
+        self.dates = np.asarray(dates, dtype="U10")
+        self.windows = tuple(windows)
+        self.metrics = tuple(metrics)
+        self.lower = np.full((len(self.dates), len(self.windows), len(self.metrics)), np.nan)
+        self.upper = np.full((len(self.dates), len(self.windows), len(self.metrics)), np.nan)
+
 
+    def __len__(self) -> int:
+        return len(self.dates)
 
-    def get_data(self):
-        return *self.batch_total.get_data(), *self.batch_7.get_data(), *self.batch_14.get_data(), *self.batch_30.get_data()
-    
-    def get_estimator(self):
+
+    def long_rows(self) -> Iterator[Tuple[str, str, str, float, float]]:
+        """Yields (date, window, metric, lower, upper) rows ready for executemany into the long-format table."""
+        for date, lower_w, upper_w in zip(self.dates.tolist(), self.lower.tolist(), self.upper.tolist()):
+            for window, lower_m, upper_m in zip(self.windows, lower_w, upper_w):
+                for metric, lower, upper in zip(self.metrics, lower_m, upper_m):
+                    yield date, window, metric, lower, upper
+
+
+    def get_estimator(self) -> str:
         return self.estimator
-    
-    def get_date(self):
-        return self.date
-        
 
 
 
+class BlockBootstrap:
+    """
+    Moving block bootstrap of the windowed metrics, done on confusion counts.
+
+    Every observation is one-hot encoded into (tp, fp, tn, fn) and summed into prefix sums, so the counts of any block
+    are one subtraction. The four counts are packed into 16 bit fields of one int64, so a block costs two gathers.
+    A resample of a window draws ceil(L / block) blocks of consecutive observations from the window (the last one cut
+    to fit L), which keeps the day-to-day dependence of the predictions. All the resamples of a chunk of dates are
+    drawn, summed and turned into metrics with batched NumPy operations.
+    """
+
+
+    def __init__(self, n_boot: int = BANDS_RESAMPLES, block: int = BANDS_BLOCK, alpha: float = BANDS_ALPHA, seed: Optional[int] = 0,
+                 max_elements: int = 2**22):
+        """
+        Parameters:
+            n_boot (int): Number of resamples. Default is config.BANDS_RESAMPLES.
+            block (int): Block length in observations. Default is config.BANDS_BLOCK.
+            alpha (float): The bands are the alpha/2 and 1 - alpha/2 quantiles (0.1 = 90% band). Default is config.BANDS_ALPHA.
+            seed (int, optional): Seed of the random generator. Default is 0.
+            max_elements (int): Upper bound of dates x resamples x blocks drawn at once, bounds the memory (about 100 MB at 2**22).
+        """
+        self.n_boot = n_boot
+        self.block = block
+        self.alpha = alpha
+        self.seed = seed
+        self.max_elements = max_elements
+
+
+    def get_bands(self, days: np.ndarray, y_true: np.ndarray, y_pred: np.ndarray, targets: np.ndarray, window: Optional[int],
+                  metrics: Sequence[str] = METRICS) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Parameters:
+            days (np.ndarray): Ordinal days of the observations, sorted.
+            y_true (np.ndarray): The real values.
+            y_pred (np.ndarray): The predicted values.
+            targets (np.ndarray): Positions (in the observations) of the dates to compute the bands for.
+            window (int, optional): Window in calendar days, (day - window, day] like SlidingConfusion. None = all the history.
+            metrics (Sequence[str]): The metrics.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Lower and upper band, both of shape (len(targets), len(metrics)).
+        """
+        y_true, y_pred = np.asarray(y_true, dtype=np.int64), np.asarray(y_pred, dtype=np.int64)
+        if len(y_true) >= PACKED_LIMIT:
+            raise ValueError(f"At most {PACKED_LIMIT - 1} observations are supported.")
+
+        cells = 2 * (1 - y_pred) + (y_true != y_pred)       # tp -> 0, fp -> 1, tn -> 2, fn -> 3 like SlidingConfusion.push
+        prefix = np.zeros(len(cells) + 1, dtype=np.int64)
+        prefix[1:] = np.cumsum(np.left_shift(1, 16 * cells), dtype=np.int64)     # packed counts, every field stays < 2**16
+
+        targets = np.asarray(targets, dtype=np.int64)
+        ends = targets + 1
+        starts = np.zeros_like(ends) if window is None else np.searchsorted(days, days[targets] - window, side="right")
+
+        rng = np.random.default_rng(self.seed)
+        lower = np.empty((len(targets), len(metrics)))
+        upper = np.empty((len(targets), len(metrics)))
+
+        n_blocks = -(-(ends - starts) // self.block)    # ceil
+        chunk = max(1, self.max_elements // (self.n_boot * max(1, int(n_blocks.max(initial=1)))))
+        for first in range(0, len(targets), chunk):
+            part = slice(first, first + chunk)
+            low, high = self.__resample(prefix, starts[part], ends[part], rng, metrics)
+            lower[part], upper[part] = low, high
+
+        return lower, upper
+
+
+    def __resample(self, prefix: np.ndarray, starts: np.ndarray, ends: np.ndarray, rng: np.random.Generator,
+                   metrics: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        lengths = ends - starts                                           # (T,)
+        k = np.arange(-(-int(lengths.max()) // self.block))               # (K,)
+        block_lengths = np.clip(lengths[:, None] - k * self.block, 0, self.block)              # (T, K), 0 = unused block
+
+        # uniform block starts inside the window, so that every block fits (int32: fewer than 2**16 observations)
+        room = (lengths[:, None] - block_lengths + 1)[:, None, :]                             # (T, 1, K)
+        block_starts = rng.integers(0, room, size=(len(starts), self.n_boot, len(k)), dtype=np.int32)
+        block_starts += starts.astype(np.int32)[:, None, None]
 
+        gathered = prefix[block_starts + block_lengths.astype(np.int32)[:, None, :]]
+        gathered -= prefix[block_starts]
+        packed = gathered.sum(axis=2)                                                          # (T, B), fields < 2**16
+        counts = (packed[..., None] >> (16 * np.arange(4))) & 0xFFFF                           # (T, B, 4)
 
-    
\ No newline at end of file
+        values = metrics_from_counts(counts, metrics)                                          # (T, B, M)
+        low, high = np.quantile(values, [self.alpha / 2, 1 - self.alpha / 2], axis=1)
+        return low, high
@@ -0,0 +1,147 @@
+import importlib
+import os
+import threading
+import time
+import tracemalloc
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+from config import ESTIMATORS, USE_FAST_BACKENDS
+
+RSS_INTERVAL = 0.005     # seconds between the samples of the resident set size while profiling
+
+
+
+class EstimatorRegistry:
+    """
+    Builds the estimators declared in config.ESTIMATORS (sklearn is imported only when they are built),
+    registers them in the models table and profiles the cost of fitting and predicting.
+    """
+
+
+    def __init__(self, config: dict = ESTIMATORS, use_fast_backends: bool = USE_FAST_BACKENDS):
+        self.config = config
+        self.use_fast_backends = use_fast_backends
+
+
+    def get_specs(self) -> dict:
+        """
+        Returns the declared estimators: name -> spec. When use_fast_backends is on, every fast_backend is added as an
+        estimator of its own (under its "name"), so its predictions, metrics and costs are stored next to the ones of the
+        original estimator and both can be compared. It inherits the threshold and the type unless it declares them.
+        """
+        specs = {}
+        for name, spec in self.config.items():
+            specs[name] = spec
+            if self.use_fast_backends and "fast_backend" in spec:
+                fast = spec["fast_backend"]
+                specs[fast["name"]] = {"threshold": spec["threshold"], "type": spec.get("type", "anchored"),
+                                       **{key: value for key, value in fast.items() if key != "name"}}
+        return specs
+
+
+    def get_names(self) -> list:
+        return list(self.get_specs())
+
+
+    def build(self) -> dict:
+        """
+        Returns the estimators in the EstimatorsBTC.estimators layout: name -> {"estimator", "threshold", "type"}.
+        """
+        return {name: {"estimator": self.__load_class(spec["class"])(**spec.get("params", {})),
+                       "threshold": spec["threshold"],
+                       "type": spec.get("type", "anchored")}
+                for name, spec in self.get_specs().items()}
+
+
+    def get_performances(self) -> dict:
+        """Returns the initial performances measured in the tuning process: name -> {"recall", "precision"}."""
+        return {name: spec.get("performance", {}) for name, spec in self.get_specs().items()}
+
+
+    def is_multi_output(self, name: str) -> bool:
+        """Whether the estimator can be fitted on several targets (horizons) at once."""
+        return bool(self.get_specs()[name].get("multi_output", False))
+
+
+    def register_models(self, modelDB) -> None:
+        """Makes sure that every declared estimator has its row in the models table."""
+        modelDB.ensure_models(self.get_names())
+
+
+    @staticmethod
+    def profile_fit(estimator: object, X: np.ndarray, y: np.ndarray, trace_memory: bool = True) -> Tuple[float, Optional[int]]:
+        """
+        Fits the estimator (once) and measures the cost.
+
+        Returns:
+            Tuple[float, Optional[int]]: Wall time in seconds and the peak of the memory used while fitting in bytes
+                                         (None when trace_memory is False, e.g. when other threads are fitting at the same time).
+        """
+        return EstimatorRegistry.__profile(lambda: estimator.fit(X, y), trace_memory)[:2]
+
+
+    @staticmethod
+    def profile_predict_proba(estimator: object, X: np.ndarray, trace_memory: bool = True) -> Tuple[float, Optional[int], np.ndarray]:
+        """
+        Calls predict_proba (once) and measures the cost.
+
+        Returns:
+            Tuple[float, Optional[int], np.ndarray]: Wall time in seconds, the peak memory in bytes and the probabilities.
+        """
+        return EstimatorRegistry.__profile(lambda: estimator.predict_proba(X), trace_memory)
+
+
+    @staticmethod
+    def __profile(call, trace_memory: bool) -> Tuple[float, Optional[int], object]:
+        """
+        Times the call and, with trace_memory, measures its memory in the same pass: the peak of the resident set size
+        above its value before the call, sampled by a background thread every RSS_INTERVAL seconds. It also counts the
+        native (and OpenMP) allocations of the compiled backends and, unlike tracemalloc, does not slow the call down.
+        Where the RSS cannot be read it falls back to tracemalloc, which only sees the Python allocations and inflates the time.
+        """
+        baseline = _get_rss() if trace_memory else None
+        tracing = trace_memory and baseline is None and not tracemalloc.is_tracing()
+        peak, done = [baseline], threading.Event()
+
+        def sample() -> None:
+            while not done.wait(RSS_INTERVAL):
+                peak[0] = max(peak[0], _get_rss() or 0)
+
+        sampler = threading.Thread(target=sample, daemon=True) if baseline is not None else None
+        if sampler is not None:
+            sampler.start()
+        elif tracing:
+            tracemalloc.start()
+
+        try:
+            start = time.perf_counter()
+            result = call()
+            seconds = time.perf_counter() - start
+        finally:
+            if sampler is not None:
+                done.set()
+                sampler.join()
+            elif tracing:
+                peak[0] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+        if sampler is not None:
+            return seconds, max(peak[0], _get_rss() or 0) - baseline, result
+        return seconds, peak[0] if tracing else None, result
+
+
+    @staticmethod
+    def __load_class(path: str) -> type:
+        module, name = path.rsplit(".", 1)
+        return getattr(importlib.import_module(module), name)
+
+
+
+def _get_rss() -> Optional[int]:
+    """Resident set size of the process in bytes, None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
@@ -1,74 +1,97 @@
+import time
+import tracemalloc
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier, AdaBoostClassifier
-from sklearn.metrics import recall_score, precision_score, accuracy_score
-import yfinance as yf
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
+from config import HORIZONS, PREDICTION_WAIT
 from feature_generator.FeatureGenerator import FeatureGenerator
-from model_tracking.DataBaseLogs import DBLogs
-from model_tracking.performance_data import PerformanceBatch, PerformanceWindows
+from model_tracking.DataBaseLogs import DBLogs, DB_PATH
+from model_tracking.DriftMonitor import DriftMonitor
+from model_tracking.performance_data import BlockBootstrap, PerformanceBands, PERFORMANCE_START, get_performance_records
+from model_tracking.SingleFlight import SingleFlight
+from models_container.EstimatorRegistry import EstimatorRegistry
 
-DEBUG = False
 DATE_FORMAT = r"%Y-%m-%d"
+HLC_COLUMNS = ["High", "Low", "Close"]
 
 
 class EstimatorsBTC:
 
 
 
-    def __init__(self):
+    def __init__(self, db_path: str = DB_PATH):
 
         self.X: np.ndarray
         self.y: np.ndarray
+        self.Y: np.ndarray      # targets of all the horizons (one column each, -1 = not known yet), self.y is the 1 day column
         self.Xtoday: np.ndarray
+        self.dates: np.ndarray  # dates of the rows of self.X in the format "%Y-%m-%d"
 
-        self.modelDB = DBLogs()
+        self.modelDB = DBLogs(db_path)
         self.connect()
 
+        self.horizons = [1] + [h for h in HORIZONS if h != 1]   # the next day first, it is the one shown in the app
         self.features = ["RSI5", "RSI7", "RSI14", "RSI20", "CCI3", "CCI5", "CCI7", "CCI14", "CCI20", "SOMA37", "SOMA314", "MACD"]
         
-        # Estimators trained with the best hyperparameters found in the hyperparameter tuning process
-        self.estimators = {
-            'GradientBoost': {"estimator": GradientBoostingClassifier(learning_rate=0.1,
-                                                                         max_depth=3,
-                                                                         n_estimators=100),
-                                 "threshold": 0.53,
-                                      "type": "anchored"},
-
-            'RandomForest': {"estimator": RandomForestClassifier(bootstrap=False,
-                                                                 max_depth=21,
-                                                                 n_estimators=160), 
-                             "threshold": 0.55,
-                                  "type": "anchored"},
-
-            'AdaBoost': {"estimator": AdaBoostClassifier(algorithm="SAMME"),
-                         "threshold": 0.52,
-                              "type": "anchored"},
-        }
+        # Estimators (declared in config.ESTIMATORS) trained with the best hyperparameters found in the hyperparameter tuning process
+        self.registry = EstimatorRegistry()
+        self.estimators = self.registry.build()     # lazy: sklearn is imported here
+        self.registry.register_models(self.modelDB)
 
         # Initial performances measured with the best hyperparameters found in the hyperparameter tuning process (Real-Time-Scenario CV)
-        self.performances = {
-            'GradientBoost': {"recall": 0.51, "precision": 0.65},
-            'RandomForest': {"recall": 0.45, "precision": 0.63},
-            'AdaBoost': {"recall": 0.76, "precision": 0.64}
-        }
+        self.performances = self.registry.get_performances()
 
-        if not DEBUG:
-            today_date = datetime.now().strftime(DATE_FORMAT)
+        # Estimators of the longer horizons, fitted on the same features: name -> [(horizons, fitted estimator), ...]
+        self.horizon_estimators = {}
 
-            if not self.modelDB.does_prediction_exists(today_date): # if the prediction for today does not exist, make a prediction
-                self.__initialize_estimators()
-                res = self.predict_today()
+        # Class 1 probabilities of the last predictions: horizon -> estimator -> y_prob (stored with them, used by the backtests)
+        self.probabilities = {}
 
-                for est in res:
-                    self.modelDB.insert_model_prediction(est, datetime.now().strftime(DATE_FORMAT), res[est])
-            
-            self.fill_real_predictions(start_date=None, end_date=None)  # always fill the real missing values
+        # Cost of the last fit / predict per estimator: {"fit": (seconds, peak_bytes, n_samples), "predict": (...)}
+        self.costs = {est: {} for est in self.estimators}
+        self.data_cost = None   # (seconds, peak_bytes) of the last profiled feature generation
+
+
+    def run_daily(self) -> None:
+        """
+        Runs the whole daily update in one go: predicts today (if missing), fills the real values and updates the performance.
+        The scheduled equivalent with checkpoints is job_runner.DailyJob.
+        """
+        self.predict_and_store_today()
+        self.fill_real_predictions(start_date=None, end_date=None)  # always fill the real missing values
+
+        for est in self.estimators.keys():  # update the performance for the estimators
+            for horizon in self.horizons:
+                self.update_performance(est, horizon)
+                self.update_bands(est, horizon)
 
-            for est in self.estimators.keys():  # update the performance for the estimators
-                self.update_performance(est)
+
+    def predict_and_store_today(self, wait: float = PREDICTION_WAIT) -> bool:
+        """
+        Fits the estimators on the most recent data and stores today's predictions of every horizon, unless they already exist.
+        Only one process computes them at a time (SingleFlight), the others wait up to `wait` seconds for its result.
+
+        Returns:
+            bool: True if today's predictions are stored, False if another process was still computing them.
+        """
+        today_date = datetime.now().strftime(DATE_FORMAT)
+
+        return SingleFlight(self.modelDB, f"predict:{today_date}", wait=wait).run(
+            lambda: self.store_predictions_today(today_date), done=lambda: self.modelDB.does_prediction_exists(today_date))
+
+
+    def store_predictions_today(self, today_date: str) -> None:
+        """
+        Fits the estimators on the most recent data and stores the predictions of every horizon for today_date.
+        Takes no lease: the caller must hold the predict:<date> SingleFlight lease (see predict_and_store_today).
+        """
+        self.__initialize_estimators()
+        self.fit_horizon_estimators()
+        predictions = self.predict_horizons()
+        self.modelDB.insert_model_predictions(today_date, predictions, self.probabilities)    # all the estimators and horizons in one transaction
 
 
     def get_prediction_today(self) -> dict:
@@ -76,50 +99,131 @@ class EstimatorsBTC:
         Returns the predictions for today.
         """
         today = str(datetime.now().strftime(DATE_FORMAT))
+        predictions = self.modelDB.get_predictions_date(today) or {}    # one query for all the models
 
-        return {est: self.modelDB.get_model_prediction_date(est, today) for est in self.estimators} # dictionary with the predictions for today
+        return {est: predictions.get(est) for est in self.estimators} # dictionary with the predictions for today
 
 
-    def predict_today(self) -> dict:
+    def predict_today(self, profile: bool = False) -> dict:
         """
         Predicts the potential growth for current self.Xtoday values by every estimator.
+        With profile=True the time and peak memory of every predict_proba call are kept in self.costs.
+        The class 1 probabilities are kept in self.probabilities[1].
         """
         results = {}    # dictionary to store the results
+        self.probabilities[1] = {}
         for est in self.estimators: 
-            y_prob = self.estimators[est]["estimator"].predict_proba(self.Xtoday)[:,1]
-            y_pred = int((y_prob > self.estimators[est]["threshold"])[0])
+            seconds, peak, y_prob = self.registry.profile_predict_proba(self.estimators[est]["estimator"], self.Xtoday, trace_memory=profile)
+            y_pred = int((y_prob[:,1] > self.estimators[est]["threshold"])[0])
             results[est] = y_pred
+            self.probabilities[1][est] = float(y_prob[0, 1])
+            if profile:
+                self.costs[est]["predict"] = (seconds, peak, len(self.Xtoday))
         return results
 
 
+    def predict_horizons(self, profile: bool = False) -> Dict[int, Dict[str, int]]:
+        """
+        Predicts every horizon for the current self.Xtoday values: horizon -> estimator -> prediction.
+        The longer horizons use the estimators fitted by fit_horizon_estimators and the threshold of the 1 day estimator.
+        The class 1 probabilities are kept in self.probabilities with the same layout.
+        """
+        self.probabilities = {}
+        predictions = {1: self.predict_today(profile=profile)}
+        for est, fitted in self.horizon_estimators.items():
+            for horizons, estimator in fitted:
+                y_prob = estimator.predict_proba(self.Xtoday)
+                y_probs = y_prob if isinstance(y_prob, list) else [y_prob]     # multi-output estimators return one array per target
+                for horizon, prob in zip(horizons, y_probs):
+                    predictions.setdefault(horizon, {})[est] = int(prob[0, 1] > self.estimators[est]["threshold"])
+                    self.probabilities.setdefault(horizon, {})[est] = float(prob[0, 1])
+        return predictions
+
+
+    def fit_horizon_estimators(self) -> None:
+        """
+        Fits the estimators of the longer horizons on the current self.X (the features are shared by all the horizons).
+        Estimators declared multi_output are fitted once on all the longer horizons, the others once per horizon.
+        Every fit uses the rows whose targets are already known.
+        """
+        from sklearn.base import clone    # lazy: sklearn
+
+        self.horizon_estimators = {}
+        longer = list(range(1, len(self.horizons)))     # columns of self.Y
+        if not longer:
+            return
+
+        for est in self.estimators:
+            base = self.estimators[est]["estimator"]
+            if self.registry.is_multi_output(est):
+                known = (self.Y[:, longer] >= 0).all(axis=1)
+                fitted = [(tuple(self.horizons[j] for j in longer), clone(base).fit(self.X[known], self.Y[known][:, longer]))]
+            else:
+                fitted = []
+                for j in longer:
+                    known = self.Y[:, j] >= 0
+                    fitted.append(((self.horizons[j],), clone(base).fit(self.X[known], self.Y[known, j])))
+            self.horizon_estimators[est] = fitted
+
+
+    def store_costs(self, date: str) -> None:
+        """Stores the profiled fit/predict costs of every estimator for the given date."""
+        for est in self.costs:
+            for stage, (seconds, peak, n_samples) in self.costs[est].items():
+                self.modelDB.insert_model_cost(est, date, stage, seconds, peak, n_samples)
+
+
     
-    def update_performance(self, estimator: str) -> None:
+    def update_performance(self, estimator: str, horizon: int = 1) -> None:
             """Update the performance metrics for a given estimator. Starts with the 150th day and goes on for the missing days.
 
             Parameters:
                 estimator (str): The name of the estimator.
+                horizon (int): The prediction horizon in days. Default is 1.
 
             Returns:
                 None
             """
-            data = self.modelDB.get_model_predictions(estimator).sort_values(by="date", ascending=True).dropna() # getting the predictions from the database in order to use iloc
-            missing_dates = self.modelDB.get_missing_dates_performance(estimator) # getting the missing performance dates for the estimator
-            date_range = np.ravel(missing_dates[missing_dates["date"] >= data["date"].iloc[149]].values) # getting the missing dates that are after the date150
+            data = self.modelDB.get_model_predictions(estimator, horizon).sort_values(by="date", ascending=True).dropna() # getting the labelled predictions in date order
+            if len(data) < PERFORMANCE_START:
+                return
+            missing_dates = self.modelDB.get_missing_dates_performance(estimator, horizon) # getting the missing performance dates for the estimator
 
-            for d in date_range:   # rolling window for the days after 150th day
-                current_date = datetime.strptime(d, DATE_FORMAT)
+            records = get_performance_records(estimator, data["date"].values, data["y_true"].values, data["y_pred"].values,
+                                              targets=missing_dates["date"].values, horizon=horizon)
+            if not len(records):
+                return
 
-                #total
-                batch_total = PerformanceBatch(*self.calculate_performance_metrics(data, 0, current_date)) # calculating the performance metrics for different windows
-                # 7
-                batch_7 = PerformanceBatch(*self.calculate_performance_metrics(data, 7, current_date))
-                # 14
-                batch_14 = PerformanceBatch(*self.calculate_performance_metrics(data, 14, current_date))
-                # 30
-                batch_30 = PerformanceBatch(*self.calculate_performance_metrics(data, 30, current_date))
+            self.modelDB.insert_model_performance(records)  # adding the whole batch to the database
 
-                # creating the PerformanceWindows object
-                self.modelDB.insert_model_performance(PerformanceWindows(estimator, d, batch_total, batch_7, batch_14, batch_30))  # adding the performance to the database
+
+
+    def update_bands(self, estimator: str, horizon: int = 1, bootstrap: Optional[BlockBootstrap] = None) -> None:
+        """
+        Computes the bootstrap confidence bands of every window and metric for the performance dates that are missing them.
+
+        Parameters:
+            estimator (str): The name of the estimator.
+            horizon (int): The prediction horizon in days. Default is 1.
+            bootstrap (BlockBootstrap, optional): The resampling settings. Defaults to the config ones.
+        """
+        bootstrap = bootstrap or BlockBootstrap()
+        data = self.modelDB.query_model_predictions(estimator, horizon=horizon)
+        labelled = ~np.isnan(data["y_true"])
+        dates, y_true, y_pred = data["date"][labelled], data["y_true"][labelled], data["y_pred"][labelled]
+
+        missing = self.modelDB.get_missing_dates_bands(estimator, horizon)
+        targets = np.flatnonzero(np.isin(dates, missing))   # positions of the dates in the labelled history
+        if not len(targets):
+            return
+
+        bands = PerformanceBands(estimator, dates[targets], horizon=horizon)
+        days = dates.astype("datetime64[D]").astype(np.int64)
+        for w, window in enumerate(bands.windows):
+            bands.lower[:, w], bands.upper[:, w] = bootstrap.get_bands(days, y_true, y_pred, targets,
+                                                                       None if window == "total" else int(window), bands.metrics)
+
+        self.modelDB.insert_model_bands(bands)     # adding the whole batch to the database
 
 
 
@@ -140,6 +244,8 @@ class EstimatorsBTC:
                 - specificity: The specificity score.
                 - neg_pred_value: The negative predictive value.
         """
+        from sklearn.metrics import recall_score, precision_score, accuracy_score
+
         ago = str(current_date - timedelta(days=window))
 
         if window != 0:         
@@ -160,32 +266,58 @@ class EstimatorsBTC:
 
 
 
-    def fill_real_predictions(self, start_date: str, end_date: str) -> None:
+    def fill_real_predictions(self, start_date: Optional[str], end_date: Optional[str], y: Optional[pd.DataFrame] = None) -> Dict[str, np.ndarray]:
         """
-        Fills all the missing real predictions for the last 150 days.
+        Fills the missing real values (y_true IS NULL) of the predictions between start_date and end_date (None = no bound).
+        If y (the target dataframe, one column per horizon) is not given, the most recent data is downloaded.
+
+        For every horizon the missing dates are joined with the label dates in one vectorized lookup,
+        and all the found labels are written in a single transaction.
+
+        Returns:
+            Dict[str, np.ndarray]: Report with one row per missing date and horizon: "date", "horizon", "filled" (bool)
+                                   and "reason" ("" for filled dates, otherwise why the date was skipped).
         """
-        dates = self.modelDB.get_missing_dates_predictions(start_date=start_date,   # returns dates that are EXISTING in database, but have NULL y_true value
-                                                end_date=end_date,
-                                                  difference=False)
+        if y is None:
+            _, y, _ = self.__load_data(retrieve=True)   # returns the pandas dataframes for X, y, Xtoday,
+                                                        # also sets the self.X, self.y, self.Xtoday for the most recent values
+
+        label_dates = pd.Index(y.index.strftime(DATE_FORMAT))
+        reports = []
+        for horizon in self.horizons:
+            column = FeatureGenerator.target_name("Growth", horizon)
+            if column not in y:
+                continue
+
+            dates = self.modelDB.get_unlabelled_dates(start_date=start_date, end_date=end_date, horizon=horizon)
+            position = label_dates.get_indexer(dates)      # -1 where there is no label for the date
+            values = y[column].to_numpy()[position]
+            filled = (position >= 0) & (values >= 0)       # the target is -1 while the day `horizon` days later is unknown
 
-        _, y, _ = self.__load_data(retrieve=True)   # returns the pandas dataframes for X, y, Xtoday,
-                                                    # also sets the self.X, self.y, self.Xtoday for the most recent values
+            self.modelDB.insert_real_values(zip(dates[filled].tolist(), values[filled].tolist()), horizon=horizon)   # one batched update
 
-        for date in dates:      # fill the missing values with the real ones from the y dataframe
-            try:
-                y_true = y[y.index == date].values[0][0]
-                self.modelDB.insert_real_value(y_true=y_true, date=date)    # db update
-            except:
-                print("Skipped date: ", date)   # it is going to skip the today's date (because we dont know the result yet),
-                                                # and the missing ones from yahoo finance
+            # the latest dates are not known yet, the earlier ones are missing from the price history
+            last_label = label_dates.max() if len(label_dates) else ""
+            not_known = (dates > last_label) | ((position >= 0) & (values < 0))
+            reason = np.where(filled, "", np.where(not_known, "label not known yet", "no label in the price history"))
 
+            for date, why in zip(dates[~filled].tolist(), reason[~filled].tolist()):
+                print(f"Skipped date: {date}, horizon {horizon} ({why})")
 
+            reports.append({"date": dates, "horizon": np.full(len(dates), horizon), "filled": filled, "reason": reason})
 
+        return {name: np.concatenate([report[name] for report in reports]) for name in ["date", "horizon", "filled", "reason"]}
 
-    def update_predictions(self, days_back: int = 150) -> None:
+
+
+    def update_predictions(self, days_back: int = 150, fill_labels: bool = True, refit_every: int = 1) -> None:
         """
         Updates the missing prediction values for the estimators for the last 150 days.
-        Checks on which days the predictions are missing and performs the backtesting evaluation.
+        Checks on which days the predictions are missing and performs the backtesting evaluation (1 day horizon).
+
+        With refit_every=k the missing dates are cut into blocks of at most k consecutive dates, the estimators are refitted
+        once per block and its dates are scored with one batched predict_proba call (see CrossValidateTS.refit_schedule_report
+        for the effect of k).
 
         This method should be called only in order to keep the prediction values updated.
         
@@ -198,24 +330,73 @@ class EstimatorsBTC:
 
         missing_dates = self.modelDB.get_missing_dates_predictions(today_nback, today)  # getting the missing prediction dates for the last days_back days
         
-        for date in missing_dates:  # for every of these dates, make a prediction and store it in the database
-            print(f"""Evaluating date: {date}""")
-            self.__initialize_estimators(max_date=date)   # gets the data for historical dates and fits the estimators
-            res = self.predict_today()  # predicts for self.Xtoday
-            for est in res:
-                self.modelDB.insert_model_prediction(est, date, res[est])   # for every estimator in res(dict), insert into the db
+        if refit_every > 1:
+            days = np.asarray(missing_dates, dtype="datetime64[D]").astype(np.int64)
+            runs = np.split(np.asarray(missing_dates), np.flatnonzero(np.diff(days) != 1) + 1)     # runs of consecutive dates
+            for run in runs:
+                for start in range(0, len(run), refit_every):
+                    self.__predict_block(list(run[start:start+refit_every]))
+
+        else:
+            for date in missing_dates:  # for every of these dates, make a prediction and store it in the database
+                print(f"""Evaluating date: {date}""")
+                self.__initialize_estimators(max_date=date)   # gets the data for historical dates and fits the estimators
+                res = self.predict_today()  # predicts for self.Xtoday
+                for est in res:
+                    self.modelDB.insert_model_prediction(est, date, res[est], self.probabilities[1][est])   # for every estimator in res(dict), insert into the db
 
-        self.fill_real_predictions(start_date=None, end_date=None)  # fills all the missing real values that are available in the database and yahoo finance
+        if fill_labels:
+            self.fill_real_predictions(start_date=None, end_date=None)  # fills all the missing real values that are available in the database and yahoo finance
 
 
 
 
 
+    def __predict_block(self, dates: List[str]) -> None:
+        """
+        Fits the estimators once with the data available before dates[0] and predicts every date of the block in one batch.
+        The prediction for a date uses the features of the previous day computed from the prices up to that day only,
+        like __initialize_estimators(max_date=date) does, so the CCI normalisation (a mean over the whole series) does not
+        see the later prices of the block.
+        """
+        print(f"""Evaluating dates: {dates[0]} - {dates[-1]}""")
+        import yfinance as yf   # lazy: data-provider import
+
+        data = yf.Ticker("BTC-USD").history(start=None, end=dates[-1], period="max")[HLC_COLUMNS]    # downloaded once for the block
+        history = data.index.strftime(DATE_FORMAT)
+
+        self.set_data(data[history < dates[0]])      # the same training data as __initialize_estimators(max_date=dates[0])
+        self.__fit_estimators()
+
+        previous = lambda date: (datetime.strptime(date, DATE_FORMAT) - timedelta(days=1)).strftime(DATE_FORMAT)
+        known, rows = [], []
+        for date in dates:
+            if previous(date) not in history:
+                print("Skipped date: ", date)   # missing from yahoo finance
+                continue
+            _, _, Xtoday = FeatureGenerator.generate_features_lean(data[history < date], HLC_targets=HLC_COLUMNS, features=self.features,
+                                                                   output_name="Growth")
+            known.append(date)
+            rows.append(Xtoday.values)
+        if not known:
+            return
+
+        X_block = np.vstack(rows)
+        for est in self.estimators:
+            y_prob = self.estimators[est]["estimator"].predict_proba(X_block)[:, 1]     # one call for the whole block
+            for date, y_pred, prob in zip(known, (y_prob > self.estimators[est]["threshold"]).astype(int), y_prob.tolist()):
+                self.modelDB.insert_model_prediction(est, date, int(y_pred), prob)
+
+
+
     def __initialize_estimators(self, max_date: str = None) -> None:
         """
         Loads the data with given time delay and fits the estimators.
+        Today's estimators (no max_date) are trained on the drift training window, see set_training_window.
         """
         self.__load_data(max_date=max_date) # loads the data for the most recent date
+        if max_date is None:
+            self.set_training_window()
         self.__fit_estimators() # fits the estimators with that data
 
 
@@ -233,20 +414,63 @@ class EstimatorsBTC:
         retrieve : bool, optional
             If True, returns the X, y, Xtoday values in pandas DataFrame. Default is False.
         """
+        import yfinance as yf   # lazy: data-provider import
+
         bitcoin = yf.Ticker("BTC-USD")
-        data = bitcoin.history(start=None, end=max_date, period="max")
+        data = bitcoin.history(start=None, end=max_date, period="max")[HLC_COLUMNS]    # only the columns the features use
+
+        X, y, Xtoday = self.set_data(data)
+
+        if retrieve:
+            return X, y, Xtoday
+
+
+    def set_data(self, data: pd.DataFrame, profile: bool = False) -> Tuple[pd.DataFrame, pd.DataFrame, pd.Series]:
+        """
+        Generates the features for the given price history (yfinance layout) and sets the self.X, self.y, self.Y, self.Xtoday values.
+        Only the High/Low/Close columns are read and only self.features are computed, into a float32 matrix shared by all the horizons.
+        With profile=True the time and peak memory of the feature generation are kept in self.data_cost.
+
+        Returns:
+            Tuple[pd.DataFrame, pd.DataFrame, pd.Series]: X, y and Xtoday as returned by FeatureGenerator.generate_features_lean.
+        """
+        start = time.perf_counter()
+        if profile:
+            tracemalloc.start()
+
+        X, y, Xtoday = FeatureGenerator.generate_features_lean(data,
+                                                               HLC_targets=HLC_COLUMNS,
+                                                               features=self.features,
+                                                               output_name="Growth",
+                                                               horizons=self.horizons)
 
-        X, y, Xtoday = FeatureGenerator.generate_features(data,
-                                                          HLC_targets=["High", "Low", "Close"],
-                                                          features=self.features,
-                                                          output_name="Growth")
+        if profile:
+            self.data_cost = (time.perf_counter() - start, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
 
         self.X = X.values
-        self.y = np.ravel(y.values)
+        self.Y = y.values
+        self.y = self.Y[:, 0]    # the 1 day horizon
         self.Xtoday = np.atleast_2d(Xtoday.values)
+        self.dates = np.asarray(X.index.strftime(DATE_FORMAT))
 
-        if retrieve:
-            return X, y, Xtoday
+        return X, y, Xtoday
+
+
+    def set_training_window(self) -> None:
+        """
+        Keeps the training rows (self.X, self.y, self.Y) from the first day of the drift reference on (DriftMonitor.get_training_start),
+        so after a drift trigger every process that fits today's estimators trains on the same recent window.
+        Without a reference (or before the first trigger) the whole history is kept.
+        """
+        start = DriftMonitor(self.modelDB, self.features).get_training_start()
+        if start is None:
+            return
+
+        recent = self.dates >= start
+        self.X, self.Y, self.dates = self.X[recent], self.Y[recent], self.dates[recent]
+        self.y = self.Y[:, 0]
+        print(f"Training on {recent.sum()} days since {start}")
         
 
 
@@ -254,8 +478,30 @@ class EstimatorsBTC:
         """
         Simply fits all the estimators with the current self.X, self.y values.
         """
-        for est in self.estimators:
-            self.estimators[est]["estimator"].fit(self.X, self.y)
+        self.fit_estimators()
+
+
+    def fit_estimators(self, workers: int = 1, profile: bool = False) -> None:
+        """
+        Fits all the estimators with the current self.X, self.y values, using up to `workers` threads.
+        With profile=True the fit time (and, with a single worker, the peak memory) of every estimator is kept in self.costs.
+        """
+        trace_memory = profile and workers <= 1     # the memory is process-wide, the peaks of concurrent fits would mix
+
+        def fit(est: str) -> None:
+            seconds, peak = self.registry.profile_fit(self.estimators[est]["estimator"], self.X, self.y, trace_memory=trace_memory)
+            if profile:
+                self.costs[est]["fit"] = (seconds, peak, len(self.X))
+
+        if workers <= 1:
+            for est in self.estimators:
+                fit(est)
+            return
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(fit, est) for est in self.estimators]
+            for future in futures:
+                future.result()     # re-raises the fitting errors
 
 
     def connect(self) -> None:
@@ -0,0 +1,69 @@
+"""
+Import-time regression check for the serving path.
+
+Imports the given modules in a fresh interpreter (python -X importtime) and fails when
+the cumulative import time exceeds the budget, or when any of the heavy modules
+(sklearn, yfinance, plotly, pandas, matplotlib) was pulled in.
+
+Usage (from the repository root):
+    python perf_checks/check_import_time.py [--budget 1.0] [--module app ...]
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FORBIDDEN = ["sklearn", "yfinance", "plotly", "pandas", "matplotlib"]
+SERVING_MODULES = ["app", "model_tracking.DataBaseLogs", "graph_creator.graph_spec"]
+
+
+def measure_import(module: str) -> Tuple[float, List[str]]:
+    """
+    Imports the module in a fresh interpreter.
+
+    Returns:
+        Tuple[float, List[str]]: The cumulative import time in seconds and the forbidden top-level modules that got imported.
+    """
+    code = (f"import sys, {module}\n"
+            f"print(','.join(sorted({{m.split('.')[0] for m in sys.modules}} & set({FORBIDDEN!r}))))")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    total_us = 0
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package", top-level imports are not indented
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            total_us += int(cumulative)
+
+    heavy = [m for m in result.stdout.strip().split(",") if m]
+    return total_us / 1e6, heavy
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Serving path import-time regression check.")
+    parser.add_argument("--budget", type=float, default=1.0, help="Maximum cumulative import time per module in seconds.")
+    parser.add_argument("--module", action="append", help="Module to check (repeatable). Defaults to the serving modules.")
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.module or SERVING_MODULES:
+        seconds, heavy = measure_import(module)
+        status = "OK"
+        if seconds > args.budget or heavy:
+            status = "FAIL"
+            failed = True
+        print(f"{status:4} | {module:30} | {seconds:.3f}s | heavy imports: {', '.join(heavy) or '-'}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+Equivalence check of the fast performance metrics.
+
+Builds a seeded synthetic prediction history with calendar gaps and unlabelled days, and fails when
+get_performance_records (the SlidingConfusion ring buffers) differs from the sklearn computation it
+replaced (EstimatorsBTC.calculate_performance_metrics) on any date, window or metric, or when the
+BlockBootstrap bands (packed counts, window bounds) differ from a naive loop over the same draws.
+
+Usage (from the repository root):
+    python perf_checks/check_metrics.py [--days 400] [--seed 0]
+"""
+import argparse
+import os
+import sys
+import warnings
+import numpy as np
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from model_tracking.performance_data import BlockBootstrap, SlidingConfusion, METRICS, PERFORMANCE_START, get_performance_records
+
+
+DATE_FORMAT = r"%Y-%m-%d"
+
+
+def make_history(days: int, seed: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns the dates, real values and predictions of `days` predictions spread over a calendar with gaps
+    (runs of missing days of up to 40 days), about 5% of them unlabelled (y_true = NaN).
+    """
+    rng = np.random.default_rng(seed)
+    steps = np.where(rng.random(days) < 0.1, rng.integers(2, 41, days), 1)
+    dates = (np.datetime64("2022-01-01") + np.cumsum(steps)).astype(str)
+
+    y_true = rng.integers(0, 2, days).astype(float)
+    y_true[rng.random(days) < 0.05] = np.nan
+    y_pred = np.where(rng.random(days) < 0.6, y_true, 1 - y_true)       # better than chance, errors on both classes
+    y_pred[np.isnan(y_pred)] = rng.integers(0, 2, int(np.isnan(y_pred).sum()))
+    return dates, y_true, y_pred
+
+
+def check_performance_records(days: int, seed: int) -> int:
+    """Compares every date, window and metric of get_performance_records with the sklearn baseline, returns the mismatches."""
+    import pandas as pd
+    from models_container.EstimatorsBTC import EstimatorsBTC
+
+    dates, y_true, y_pred = make_history(days, seed)
+    labelled = ~np.isnan(y_true)
+    records = get_performance_records("check", dates[labelled], y_true[labelled], y_pred[labelled])
+
+    engine = EstimatorsBTC.__new__(EstimatorsBTC)      # only the metric method is used, no database or data download
+    data = pd.DataFrame({"date": dates, "y_true": y_true, "y_pred": y_pred})
+
+    mismatches = 0
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")     # sklearn warns on the windows without positives
+        for i, date in enumerate(records.dates.tolist()):
+            current_date = datetime.strptime(date, DATE_FORMAT)
+            for w, window in enumerate(records.windows):
+                expected = [float(value) for value in engine.calculate_performance_metrics(data, 0 if window == "total" else int(window), current_date)]
+                if records.values[i, w].tolist() != expected:
+                    mismatches += 1
+                    if mismatches <= 5:
+                        print(f"  {date} window {window}: {records.values[i, w].tolist()} != {expected}")
+
+    print(f"{'OK' if not mismatches else 'FAIL':4} | performance records   | {len(records)} dates x {len(records.windows)} windows "
+          f"| {days} days over {np.ptp(dates.astype('datetime64[D]')).astype(int) + 1} calendar days | mismatches {mismatches}")
+    return mismatches
+
+
+def naive_bands(days: np.ndarray, y_true: np.ndarray, y_pred: np.ndarray, targets: Sequence[int], window: Optional[int],
+                n_boot: int, block: int, alpha: float, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    BlockBootstrap.get_bands written as plain loops: the window of every target is found by scanning the days, the
+    blocks are counted one observation at a time. Only the random draws are made like BlockBootstrap (in one chunk).
+    """
+    rng = np.random.default_rng(seed)
+    windows = [[i for i in range(t + 1) if window is None or days[t] - window < days[i]] for t in targets]
+    n_blocks = -(-max(len(rows) for rows in windows) // block)
+    block_lengths = [[min(block, max(0, len(rows) - k * block)) for k in range(n_blocks)] for rows in windows]
+    room = np.array([[len(rows) - length + 1 for length in lengths] for rows, lengths in zip(windows, block_lengths)])
+    offsets = rng.integers(0, room[:, None, :], size=(len(targets), n_boot, n_blocks), dtype=np.int32)
+
+    lower, upper = [], []
+    for rows, lengths, draws in zip(windows, block_lengths, offsets.tolist()):
+        values = []
+        for draw in draws:
+            counter = SlidingConfusion()
+            for offset, length in zip(draw, lengths):
+                for i in rows[offset:offset + length]:
+                    counter.push(days[i], y_true[i], y_pred[i])
+            values.append(counter.get_metrics(METRICS))
+        low, high = np.quantile(values, [alpha / 2, 1 - alpha / 2], axis=0)
+        lower.append(low)
+        upper.append(high)
+    return np.array(lower), np.array(upper)
+
+
+def check_bootstrap(seed: int, n_boot: int = 40, block: int = 5, alpha: float = 0.1) -> int:
+    """
+    Compares BlockBootstrap with naive_bands on 1500 gappy days whose first 1200 predictions are 90% true positives,
+    so the packed tp field goes far past 8 bits, for the total and two calendar windows. Returns the mismatches.
+    """
+    rng = np.random.default_rng(seed)
+    n = 1500
+    days = np.cumsum(np.where(rng.random(n) < 0.1, rng.integers(2, 41, n), 1))
+    positive = (np.arange(n) < 1200) & (rng.random(n) < 0.9)
+    y_true = np.where(positive, 1, rng.integers(0, 2, n))
+    y_pred = np.where(positive, 1, rng.integers(0, 2, n))
+    targets = np.sort(rng.choice(np.arange(PERFORMANCE_START - 1, n), 20, replace=False))
+
+    mismatches: List[str] = []
+    bootstrap = BlockBootstrap(n_boot=n_boot, block=block, alpha=alpha, seed=seed)      # the default max_elements draws them in one chunk
+    for window in [None, 7, 30]:
+        lower, upper = bootstrap.get_bands(days, y_true, y_pred, targets, window)
+        expected_lower, expected_upper = naive_bands(days, y_true, y_pred, targets.tolist(), window, n_boot, block, alpha, seed)
+        if lower.tolist() != expected_lower.tolist() or upper.tolist() != expected_upper.tolist():
+            mismatches.append(f"window {window}: max difference {max(np.abs(lower - expected_lower).max(), np.abs(upper - expected_upper).max())}")
+
+    try:
+        bootstrap.get_bands(np.arange(2**16), np.ones(2**16), np.ones(2**16), [0], None)
+        mismatches.append("2**16 observations did not raise ValueError")
+    except ValueError:
+        pass
+
+    for mismatch in mismatches:
+        print(f"  {mismatch}")
+    print(f"{'OK' if not mismatches else 'FAIL':4} | block bootstrap       | {len(targets)} dates x 3 windows | {n_boot} resamples of blocks of {block} "
+          f"| mismatches {len(mismatches)}")
+    return len(mismatches)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Equivalence check of the fast performance metrics.")
+    parser.add_argument("--days", type=int, default=400, help="Number of predictions of the synthetic history.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic history.")
+    args = parser.parse_args()
+
+    failed = check_performance_records(args.days, args.seed) > 0
+    failed = check_bootstrap(args.seed) > 0 or failed
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
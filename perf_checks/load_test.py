@@ -0,0 +1,210 @@
+"""
+HTTP load test for the Flask routes.
+
+Seeds a synthetic logs.db (prices, predictions, real values and performance of every configured estimator),
+replaces yfinance with an offline stand-in that serves the seeded prices, starts the app in a threaded
+werkzeug server and drives it with concurrent clients. Reports p50/p95/p99 latency, requests per second and
+the error rate per route, and fails when any route breaks the thresholds.
+
+By default today's predictions are seeded, so "/" only reads from SQLite. With --cold they are left out
+and "/" serves the previous predictions while one background thread fits on the synthetic prices.
+
+Usage (from the repository root):
+    python perf_checks/load_test.py [--clients 8] [--duration 10] [--max-p95 250] [--max-p99 1000] [--cold]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import types
+import urllib.error
+import urllib.request
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import ESTIMATORS
+from model_tracking.performance_data import get_performance_records
+
+DATE_FORMAT = r"%Y-%m-%d"
+ROUTES = ["/", "/performance/7/", "/performance/30/", "/performance/total/", "/api/performance/AdaBoost?window=7", "/about/"]
+
+
+def seed_database(db_path: str, days: int = 3 * 365, predicted_days: int = 400, cold: bool = False, seed: int = 0) -> None:
+    """
+    Creates a reproducible synthetic database: a random walk of BTC prices for `days` days up to today and, for every
+    configured estimator, noisy predictions of the growth for the last `predicted_days` days with their performance.
+    """
+    from model_tracking.DataBaseLogs import DBLogs
+
+    rng = np.random.default_rng(seed)
+    dates = [(date.today() - timedelta(days=days - 1 - i)).strftime(DATE_FORMAT) for i in range(days)]
+
+    close = 20000 * np.exp(np.cumsum(rng.normal(0, 0.03, days)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.02, days))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.02, days))
+    volume = rng.uniform(1e9, 5e10, days)
+    growth = (close[1:] > close[:-1]).astype(int)      # the real value of day i is known on day i + 1
+
+    db = DBLogs(db_path)
+    db.connect()
+    try:
+        db.upsert_prices(zip(dates, open_.tolist(), high.tolist(), low.tolist(), close.tolist(), volume.tolist()))
+        db.ensure_models(list(ESTIMATORS))
+
+        predicted = range(days - predicted_days, days - (1 if cold else 0))
+        for name in ESTIMATORS:
+            hits = rng.random(days) < 0.55
+            y_pred = np.where(hits[:-1], growth, 1 - growth).tolist() + [int(rng.integers(2))]
+            for i in predicted:
+                db.insert_model_prediction(name, dates[i], y_pred[i])
+
+        for i in predicted:
+            if i < days - 1:
+                db.insert_real_value(dates[i], int(growth[i]))
+
+        for name in ESTIMATORS:
+            seed_performance(db, name)
+    finally:
+        db.close()
+
+
+def seed_performance(db, name: str) -> None:
+    """Computes the performance of the seeded predictions with the helper of EstimatorsBTC.update_performance."""
+    data = db.query_model_predictions(name)
+    labelled = ~np.isnan(data["y_true"])
+    db.insert_model_performance(get_performance_records(name, data["date"][labelled], data["y_true"][labelled], data["y_pred"][labelled]))
+
+
+def install_offline_yfinance(db_path: str) -> None:
+    """Registers a yfinance stand-in in sys.modules whose Ticker.history serves the seeded btc_prices table."""
+    from model_tracking.DataBaseLogs import DBLogs
+
+    class Ticker:
+
+        def __init__(self, symbol: str):
+            self.symbol = symbol
+
+        def history(self, period: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None, **kwargs):
+            db = DBLogs(db_path)
+            db.connect()
+            try:
+                data = db.get_prices(end_date=end)
+            finally:
+                db.close()
+            return data if start is None else data[data.index >= start]
+
+    module = types.ModuleType("yfinance")
+    module.Ticker = Ticker
+    sys.modules["yfinance"] = module
+
+
+def start_server(app) -> Tuple[object, str]:
+    """Starts the app in a threaded werkzeug server on a free local port, returns the server and its base url."""
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)     # no access log line per request
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def run_client(base_url: str, routes: List[str], deadline: float, offset: int) -> List[Tuple[str, float, bool]]:
+    """Requests the routes round robin until the deadline, returns (route, seconds, ok) for every request."""
+    results = []
+    i = offset
+    while time.perf_counter() < deadline:
+        route = routes[i % len(routes)]
+        i += 1
+
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(base_url + route, timeout=30) as response:
+                response.read()
+                ok = response.status == 200
+        except (urllib.error.URLError, OSError):
+            ok = False
+        results.append((route, time.perf_counter() - start, ok))
+
+    return results
+
+
+def summarize(results: List[Tuple[str, float, bool]], elapsed: float) -> Dict[str, Dict[str, float]]:
+    """Returns route -> {"requests", "p50_ms", "p95_ms", "p99_ms", "rps", "error_rate"}."""
+    routes = np.array([route for route, _, _ in results])
+    seconds = np.array([seconds for _, seconds, _ in results])
+    ok = np.array([ok for _, _, ok in results], dtype=bool)
+
+    summary = {}
+    for route in dict.fromkeys(routes.tolist()):
+        mask = routes == route
+        p50, p95, p99 = np.percentile(seconds[mask] * 1000, [50, 95, 99])
+        summary[route] = {"requests": int(mask.sum()), "p50_ms": p50, "p95_ms": p95, "p99_ms": p99,
+                          "rps": mask.sum() / elapsed, "error_rate": 1 - ok[mask].mean()}
+    return summary
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load test of the Flask routes against a seeded synthetic database.")
+    parser.add_argument("--clients", type=int, default=8, help="Number of concurrent clients.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Duration of the measured run in seconds.")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured warm-up in seconds (0 to measure the cold start too).")
+    parser.add_argument("--route", action="append", help="Route to request (repeatable). Defaults to all the routes.")
+    parser.add_argument("--max-p95", type=float, default=250.0, help="Maximum p95 latency per route in milliseconds.")
+    parser.add_argument("--max-p99", type=float, default=1000.0, help="Maximum p99 latency per route in milliseconds.")
+    parser.add_argument("--max-error-rate", type=float, default=0.0, help="Maximum share of failed requests per route.")
+    parser.add_argument("--min-rps", type=float, default=0.0, help="Minimum requests per second per route.")
+    parser.add_argument("--cold", action="store_true", help="Do not seed today's predictions, so '/' computes them in the background.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic data.")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="crypto_eye_load_")
+    db_path = os.path.join(workdir, "logs.db")
+    os.environ["CRYPTO_EYE_DB"] = db_path       # read by DBLogs when it is imported, so before the app
+
+    seed_database(db_path, cold=args.cold, seed=args.seed)
+    install_offline_yfinance(db_path)
+
+    from app import app
+    server, base_url = start_server(app)
+    routes = args.route or ROUTES
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            if args.warmup > 0:
+                deadline = time.perf_counter() + args.warmup
+                list(pool.map(lambda i: run_client(base_url, routes, deadline, i), range(args.clients)))
+
+            start = time.perf_counter()
+            deadline = start + args.duration
+            runs = list(pool.map(lambda i: run_client(base_url, routes, deadline, i), range(args.clients)))
+            elapsed = time.perf_counter() - start
+    finally:
+        server.shutdown()
+
+    summary = summarize([result for run in runs for result in run], elapsed)
+
+    failed = False
+    print(f"{args.clients} clients, {elapsed:.1f}s, database {db_path}")
+    for route, stats in summary.items():
+        status = "OK"
+        if (stats["p95_ms"] > args.max_p95 or stats["p99_ms"] > args.max_p99
+                or stats["error_rate"] > args.max_error_rate or stats["rps"] < args.min_rps):
+            status = "FAIL"
+            failed = True
+        print(f"{status:4} | {route:22} | {stats['requests']:6d} req | p50 {stats['p50_ms']:7.1f}ms | p95 {stats['p95_ms']:7.1f}ms"
+              f" | p99 {stats['p99_ms']:7.1f}ms | {stats['rps']:7.1f} rps | errors {stats['error_rate']:.1%}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,24 @@
+import functools
+import inspect
 import numpy as np
-from sklearn.metrics import precision_score, recall_score
-from sklearn.model_selection import TimeSeriesSplit, cross_val_score, cross_validate
-from functools import partial
+from sklearn.metrics import precision_score, recall_score, accuracy_score
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from val_functions.SharedArrays import SharedArrays
+from val_functions.WalkForwardSplit import WalkForwardSplit
+from val_functions.ResultCache import cached_fold, fold_key, get_fold_cache
 
 
 class CrossValidateTS:
     """
     Class containing useful functions to perform cross-validation on time series data.
+
+    The fold outputs of check_model_awf, check_model_rwf, the walk forward schedules (used by cross_validate_rts,
+    cross_validate_rts_na, find_best_threshold and refit_schedule_report) and permutation_importance are memoised on disk
+    by val_functions.ResultCache, keyed by the estimator params, the bounds of the fold and the content of its slices.
+    The test probabilities are cached before the threshold is applied, so a new threshold or a longer history
+    (where only the new folds differ) reuses the unchanged folds. The cache is off by default, set CRYPTO_EYE_CV_CACHE=1 to enable it.
+    Estimators with random_state=None are never cached (with a warning), their folds change from run to run.
     """
 
     @staticmethod
@@ -43,6 +55,32 @@ class CrossValidateTS:
         return scoring(y, y_pred, pos_label=1, zero_division=0)
     
 
+    @staticmethod
+    def fold_probabilities(model: object, X: np.ndarray, y: np.ndarray, train: slice, test: slice) -> np.ndarray:
+        """
+        Class 1 probabilities of X[test] from the model fitted on X[train], memoised per fold (see val_functions.ResultCache.cached_fold).
+        """
+        def compute() -> np.ndarray:
+            model.fit(X[train], y[train])      # views, no copy of the training window
+            return model.predict_proba(X[test])[:, 1]
+
+        return cached_fold("fold_probabilities", compute, model, X, y, train, test)
+
+
+    @staticmethod
+    def score_folds(model: object, X: np.ndarray, y: np.ndarray, cvts: WalkForwardSplit, threshold: float = 0.6) -> Tuple[float, float]:
+        """
+        Mean precision and recall over the folds of cvts, classifying the class 1 above the threshold.
+        """
+        precision, recall = [], []
+        for train, test in cvts.split_slices(X):
+            y_pred = (CrossValidateTS.fold_probabilities(model, X, y, train, test) > threshold).astype(int)
+            precision.append(precision_score(y[test], y_pred, pos_label=1, zero_division=0))
+            recall.append(recall_score(y[test], y_pred, pos_label=1, zero_division=0))
+
+        return np.mean(precision), np.mean(recall)
+
+
     @staticmethod
     def check_model_awf(model: object, X: np.array, y: np.array, splits: int = 5, threshold: float = 0.6) -> float:
         """
@@ -69,12 +107,14 @@ class CrossValidateTS:
         -------
         float
             The mean score of the cross-validation.
-        """
-        cvts = TimeSeriesSplit(n_splits=splits)
-        output = cross_validate(model, X, y, cv=cvts, scoring={"Precision": partial(CrossValidateTS.prediction_scorer_threshold, threshold=threshold),
-                                                            "Recall": partial(CrossValidateTS.prediction_scorer_threshold, threshold=threshold, scoring=recall_score)})
 
-        return np.mean(output["test_Precision"]), np.mean(output["test_Recall"])
+        Notes
+        -----
+        With the fold cache on (CRYPTO_EYE_CV_CACHE=1, seeded estimators only) the cached folds are not fitted again:
+        the model is left fitted on the last computed fold, or not fitted at all when every fold was cached.
+        """
+        cvts = WalkForwardSplit(n_splits=splits)     # anchored, slice-based folds
+        return CrossValidateTS.score_folds(model, X, y, cvts, threshold=threshold)
     
 
     @staticmethod
@@ -107,17 +147,20 @@ class CrossValidateTS:
         float
             The mean score of the cross-validation.
 
+
+        Notes
+        -----
+        With the fold cache on (CRYPTO_EYE_CV_CACHE=1, seeded estimators only) the cached folds are not fitted again:
+        the model is left fitted on the last computed fold, or not fitted at all when every fold was cached.
         """
         splits = (len(X)-max_train_size)//test_size
-        cvts = TimeSeriesSplit(n_splits=splits, max_train_size=max_train_size, test_size=test_size)
-        output = cross_validate(model, X, y, cv=cvts, scoring={"Precision": partial(CrossValidateTS.prediction_scorer_threshold, threshold=threshold),
-                                                            "Recall": partial(CrossValidateTS.prediction_scorer_threshold, threshold=threshold, scoring=recall_score)})
-
-        return np.mean(output["test_Precision"]), np.mean(output["test_Recall"])
+        cvts = WalkForwardSplit(n_splits=splits, max_train_size=max_train_size, test_size=test_size)     # rolling, slice-based folds
+        return CrossValidateTS.score_folds(model, X, y, cvts, threshold=threshold)
     
 
     @staticmethod
-    def cross_validate_rts(model: object, X: np.array, y: np.array, threshold: float = 0.6, n_days: int = 150):
+    def cross_validate_rts(model: object, X: np.array, y: np.array, threshold: float = 0.6, n_days: int = 150,
+                           refit_every: int = 1, refit_trigger: Optional[Callable[[np.ndarray, np.ndarray], bool]] = None):
         """
         Creates a Real-Time-Scenario backtesting cross-validation. 
         Training the model with the training set and predicting the test set of 1 observation.
@@ -139,6 +182,12 @@ class CrossValidateTS:
         n_Days : int, optional
             The size of the simulation. Default is 150.
 
+        refit_every : int, optional
+            Refit the model every k days and score the days in between with one batched predict_proba call. Default is 1 (refit every day).
+
+        refit_trigger : callable, optional
+            Called with (y_true, y_pred) of the days since the last refit, refits early when it returns True.
+
         Returns
         -------
         y_test : np.array
@@ -146,21 +195,19 @@ class CrossValidateTS:
 
         y_pred : np.array
             The predicted target values for the test set.
+
+        Notes
+        -----
+        The folds go through walk_forward_schedule: with the fold cache on, the model may be left unfitted (see its Notes).
         """
-        n_rows = len(X)
-        cv = TimeSeriesSplit(max_train_size=n_rows-n_days, test_size=1, n_splits=n_days)
-        y_test = []
-        y_pred = []
-        for train_id, test_id in cv.split(X):
-            model.fit(X[train_id], y[train_id])
-            y_prob = model.predict_proba(X[test_id])[:,1]
-            y_pred.append(y_prob > threshold)
-            y_test.append(y[test_id])
-        return np.ravel(np.array(y_test)), np.ravel(np.array(y_pred))
+        y_test, y_pred, _ = CrossValidateTS.walk_forward_schedule(model, X, y, threshold=threshold, n_days=n_days, max_train_size=len(X)-n_days,
+                                                                  refit_every=refit_every, refit_trigger=refit_trigger)
+        return y_test, y_pred
     
 
     @staticmethod
-    def cross_validate_rts_na(model: object, X: np.array, y: np.array, threshold: float = 0.6, n_days: int = 150):
+    def cross_validate_rts_na(model: object, X: np.array, y: np.array, threshold: float = 0.6, n_days: int = 150,
+                              refit_every: int = 1, refit_trigger: Optional[Callable[[np.ndarray, np.ndarray], bool]] = None):
         """
         Creates a Real-Time-Scenario backtesting cross-validation that is NON ANCHORED (ROLLING). 
         Training the model with the training set and predicting the test set of 1 observation.
@@ -182,6 +229,12 @@ class CrossValidateTS:
         n_Days : int, optional
             The size of the simulation. Default is 150.
 
+        refit_every : int, optional
+            Refit the model every k days and score the days in between with one batched predict_proba call. Default is 1 (refit every day).
+
+        refit_trigger : callable, optional
+            Called with (y_true, y_pred) of the days since the last refit, refits early when it returns True.
+
         Returns
         -------
         y_test : np.array
@@ -189,16 +242,279 @@ class CrossValidateTS:
 
         y_pred : np.array
             The predicted target values for the test set.
+
+        Notes
+        -----
+        The folds go through walk_forward_schedule: with the fold cache on, the model may be left unfitted (see its Notes).
+        """
+        y_test, y_pred, _ = CrossValidateTS.walk_forward_schedule(model, X, y, threshold=threshold, n_days=n_days, max_train_size=500,
+                                                                  refit_every=refit_every, refit_trigger=refit_trigger)
+        return y_test, y_pred
+
+
+    @staticmethod
+    def walk_forward_schedule(model: object, X: np.array, y: np.array, threshold: float = 0.6, n_days: int = 150, max_train_size: int = 500,
+                              refit_every: int = 1, refit_trigger: Optional[Callable[[np.ndarray, np.ndarray], bool]] = None) -> Tuple[np.ndarray, np.ndarray, int]:
         """
-        cv = TimeSeriesSplit(max_train_size=500, test_size=1, n_splits=n_days)
-        y_test = []
-        y_pred = []
-        for train_id, test_id in cv.split(X):
-            model.fit(X[train_id], y[train_id])
-            y_prob = model.predict_proba(X[test_id])[:,1]
-            y_pred.append(y_prob > threshold)
-            y_test.append(y[test_id])
-        return np.ravel(np.array(y_test)), np.ravel(np.array(y_pred))
+        Real-Time-Scenario backtest over the last n_days observations with a retraining schedule.
+        The model is refitted on the preceding max_train_size observations every refit_every days (or earlier, when refit_trigger fires),
+        and the days between the refits are scored with a single predict_proba call.
+
+        Parameters
+        ----------
+        model : object
+            The machine learning model to be used for training and prediction.
+
+        X : np.array
+            The input features for training and prediction.
+
+        y : np.array
+            The target variable for training and prediction.
+
+        threshold : float, optional
+            The threshold value for classification. Default is 0.6.
+
+        n_days : int, optional
+            The size of the simulation. Default is 150.
+
+        max_train_size : int, optional
+            The maximum size of the training window. Default is 500.
+
+        refit_every : int, optional
+            The number of days between the refits. Default is 1.
+
+        refit_trigger : callable, optional
+            Called with (y_true, y_pred) of the days since the last refit, refits early when it returns True.
+
+        Returns
+        -------
+        y_test : np.array
+            The actual target values for the test set.
+
+        y_pred : np.array
+            The predicted target values for the test set.
+
+        n_fits : int
+            The number of times the model was fitted.
+
+        Notes
+        -----
+        With the fold cache on (CRYPTO_EYE_CV_CACHE=1, seeded estimators only) the cached folds are not fitted again:
+        the model is left fitted on the last computed fold, or not fitted at all when every fold was cached.
+        """
+        n_rows = len(X)
+        y_test = y[n_rows - n_days:].copy()
+        y_pred = np.empty(n_days, dtype=bool)
+        n_fits = 0
+
+        if refit_trigger is None:
+            for train, test in WalkForwardSplit.real_time_scenario(n_days, max_train_size, refit_every).split_slices(X):
+                n_fits += 1
+                y_pred[test.start-(n_rows-n_days):test.stop-(n_rows-n_days)] = CrossValidateTS.fold_probabilities(model, X, y, train, test) > threshold     # one batched call per block
+            return y_test, y_pred, n_fits
+
+        # with a trigger the blocks depend on the outcomes, so the folds are generated on the fly
+        t = n_rows - n_days
+        while t < n_rows:
+            end = min(t + refit_every, n_rows)
+            block_pred = CrossValidateTS.fold_probabilities(model, X, y, slice(max(0, t - max_train_size), t), slice(t, end)) > threshold    # one batched call for the whole block
+            n_fits += 1
+
+            for i in range(1, end - t):         # cut the block after the first day on which the trigger fires
+                if refit_trigger(y[t:t+i], block_pred[:i]):
+                    end = t + i
+                    block_pred = block_pred[:i]
+                    break
+
+            y_pred[t-(n_rows-n_days):end-(n_rows-n_days)] = block_pred
+            t = end
+
+        return y_test, y_pred, n_fits
+
+
+    @staticmethod
+    def walk_forward_schedule_parallel(model: object, X: np.array, y: np.array, threshold: float = 0.6, n_days: int = 150, max_train_size: int = 500,
+                                       refit_every: int = 1, n_jobs: int = 2) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        Parallel version of walk_forward_schedule (without refit triggers, the blocks are independent).
+        X and y are published once into shared memory, every worker attaches to them by name and receives only
+        the (train_start, test_start, test_end) range of each fold. The cached folds are read in the main process and
+        only the missing ones are sent to the workers.
+
+        Parameters
+        ----------
+        n_jobs : int, optional
+            The number of worker processes. Default is 2.
+
+        See walk_forward_schedule for the other parameters and the returned values.
+        """
+        n_rows = len(X)
+        folds = [(train_start, test_start, test_end) for train_start, _, test_start, test_end
+                 in WalkForwardSplit.real_time_scenario(n_days, max_train_size, refit_every).get_folds(n_rows)]
+
+        cache = get_fold_cache(model)
+        keys = [fold_key("fold_probabilities", model, X, y, slice(train_start, test_start), slice(test_start, test_end))
+                for train_start, test_start, test_end in folds] if cache is not None else [None] * len(folds)
+        blocks = [cache.get(key) if cache is not None else (False, None) for key in keys]
+        missing = [i for i, (hit, _) in enumerate(blocks) if not hit]
+
+        if missing:
+            with SharedArrays(X=X, y=y) as shared:
+                with ProcessPoolExecutor(max_workers=n_jobs, initializer=_attach_worker, initargs=(shared.get_specs(), model)) as pool:
+                    computed = list(pool.map(_fit_predict_block, [folds[i] for i in missing]))
+            for i, y_prob in zip(missing, computed):
+                blocks[i] = (True, y_prob)
+                if cache is not None:
+                    cache.put(keys[i], y_prob)
+
+        y_pred = np.concatenate([y_prob for _, y_prob in blocks]) > threshold if blocks else np.empty(0, dtype=bool)
+        return y[n_rows - n_days:].copy(), y_pred, len(folds)
+
+
+    @staticmethod
+    def permutation_importance(model: object, X: np.ndarray, y: np.ndarray, feature_names: Sequence[str], n_splits: int = 5,
+                               max_train_size: Optional[int] = None, test_size: Optional[int] = None, threshold: float = 0.6,
+                               scoring=precision_score, n_repeats: int = 10, seed: int = 0, n_jobs: int = 2) -> Dict[str, np.ndarray]:
+        """
+        Out-of-sample permutation feature importance on the walk forward folds (anchored by default, like check_model_awf).
+
+        Every fold is fitted once, then every (fold, feature) pair is predicted again with the feature shuffled inside
+        the test fold, n_repeats times. The importance is the drop of the score against the baseline. Both phases run
+        in worker processes attached to X and y in shared memory; every shuffle is seeded by (seed, fold, feature, repeat),
+        so the result does not depend on n_jobs or on the scheduling. The baseline probabilities (shared with
+        fold_probabilities) and the shuffled ones of every fold are cached, and the scores are derived from them, so
+        changing threshold or scoring does not fit again: only the folds missing from the cache are fitted and shuffled.
+
+        Parameters
+        ----------
+        feature_names : Sequence[str]
+            Names of the columns of X.
+
+        n_splits, max_train_size, test_size : optional
+            Folds of WalkForwardSplit. Defaults to 5 anchored folds.
+
+        threshold : float, optional
+            The threshold value for classification. Default is 0.6.
+
+        scoring : function, optional
+            Scoring function of (y_true, y_pred) -> float, called with zero_division=0 when it accepts it.
+            Default is precision_score.
+
+        n_repeats : int, optional
+            The number of shuffles per fold and feature. Default is 10.
+
+        seed : int, optional
+            Seed of the shuffles. Default is 0.
+
+        n_jobs : int, optional
+            The number of worker processes. Default is 2.
+
+        Returns
+        -------
+        Dict[str, np.ndarray]
+            Features ranked by importance: "feature", "importance" (mean drop over the folds and repeats), "variance"
+            (over the folds and repeats), "fold_std" (standard deviation of the per-fold means) and "baseline" (mean score).
+        """
+        folds = WalkForwardSplit(n_splits=n_splits, max_train_size=max_train_size, test_size=test_size).get_folds(len(X))
+
+        cache = get_fold_cache(model)
+        # the probabilities do not depend on threshold and scoring, neither do their keys
+        keys = [(fold_key("fold_probabilities", model, X, y, slice(train_start, train_end), slice(test_start, test_end)),
+                 fold_key("permutation_importance", model, X, y, slice(train_start, train_end), slice(test_start, test_end),
+                          fold=f, n_repeats=n_repeats, seed=seed))
+                for f, (train_start, train_end, test_start, test_end) in enumerate(folds)] if cache is not None else []
+        probabilities = {}      # fold -> (baseline probabilities (test), shuffled probabilities (features, repeats, test))
+        for f, (baseline_key, shuffled_key) in enumerate(keys):
+            (baseline_hit, baseline), (shuffled_hit, shuffled) = cache.get(baseline_key), cache.get(shuffled_key)
+            if baseline_hit and shuffled_hit:
+                probabilities[f] = (baseline, shuffled)
+        missing = [f for f in range(len(folds)) if f not in probabilities]
+
+        if missing:
+            with SharedArrays(X=X, y=y) as shared:
+                with ProcessPoolExecutor(max_workers=n_jobs, initializer=_attach_worker, initargs=(shared.get_specs(), model)) as pool:
+                    fitted = dict(zip(missing, pool.map(_fit_fold, [folds[f] for f in missing])))     # (fitted model, baseline probabilities)
+
+                tasks = [(f, j) for f in missing for j in range(X.shape[1])]
+                initargs = (shared.get_specs(), {f: estimator for f, (estimator, _) in fitted.items()}, folds, n_repeats, seed)
+                with ProcessPoolExecutor(max_workers=n_jobs, initializer=_attach_importance_worker, initargs=initargs) as pool:
+                    shuffled = list(pool.map(_permute_feature, tasks))
+
+            for i, f in enumerate(missing):
+                probabilities[f] = (fitted[f][1], np.stack(shuffled[i * X.shape[1]:(i + 1) * X.shape[1]]))
+                if cache is not None:
+                    cache.put(keys[f][0], probabilities[f][0])
+                    cache.put(keys[f][1], probabilities[f][1])
+
+        baselines, importances = [], []
+        for f, (_, _, test_start, test_end) in enumerate(folds):
+            baseline, shuffled = probabilities[f]
+            y_test = y[test_start:test_end]
+            baselines.append(_score(scoring, y_test, baseline > threshold))
+            importances.append([[baselines[-1] - _score(scoring, y_test, y_prob > threshold) for y_prob in repeats] for repeats in shuffled])
+        importances = np.stack(importances, axis=1)     # (features, folds, repeats)
+
+        order = np.argsort(-importances.mean(axis=(1, 2)), kind="stable")
+        report = {"feature": np.asarray(feature_names)[order],
+                  "importance": importances.mean(axis=(1, 2))[order],
+                  "variance": importances.reshape(X.shape[1], -1).var(axis=1)[order],
+                  "fold_std": importances.mean(axis=2).std(axis=1)[order],
+                  "baseline": np.full(X.shape[1], np.mean(baselines))}
+
+        for feature, importance, variance, fold_std in zip(*(report[name].tolist() for name in ["feature", "importance", "variance", "fold_std"])):
+            print(f"{feature:10} --- | IMPORTANCE = {importance:+.4f} | VARIANCE = {variance:.6f} | FOLD STD = {fold_std:.4f}")
+
+        return report
+
+
+    @staticmethod
+    def precision_drop_trigger(min_precision: float = 0.5, min_days: int = 5) -> Callable[[np.ndarray, np.ndarray], bool]:
+        """
+        Returns a refit trigger that fires when the precision since the last refit falls below min_precision (after at least min_days days).
+        """
+        def trigger(y_true: np.ndarray, y_pred: np.ndarray) -> bool:
+            return len(y_true) >= min_days and y_pred.any() and precision_score(y_true, y_pred, zero_division=0) < min_precision
+
+        return trigger
+
+
+    @staticmethod
+    def refit_schedule_report(model: object, X: np.ndarray, y: np.ndarray, refit_every: List[int] = [1, 5, 10, 20], threshold: float = 0.6,
+                              n_days: int = 150, max_train_size: Optional[int] = None,
+                              refit_trigger: Optional[Callable[[np.ndarray, np.ndarray], bool]] = None) -> Dict[int, dict]:
+        """
+        Runs the Real-Time-Scenario backtest for every refit cadence and reports how the metrics change with k.
+
+        Parameters
+        ----------
+        refit_every : List[int], optional
+            The cadences (k) to compare. Default is [1, 5, 10, 20].
+
+        max_train_size : int, optional
+            The maximum size of the training window. Default is None (= len(X) - n_days, as in cross_validate_rts).
+
+        Returns
+        -------
+        Dict[int, dict]
+            k -> {"precision", "recall", "accuracy", "fits"}
+
+        Notes
+        -----
+        The folds go through walk_forward_schedule: with the fold cache on, the model may be left unfitted (see its Notes).
+        """
+        max_train_size = len(X) - n_days if max_train_size is None else max_train_size
+        report = {}
+
+        for k in refit_every:
+            y_test, y_pred, n_fits = CrossValidateTS.walk_forward_schedule(model, X, y, threshold=threshold, n_days=n_days, max_train_size=max_train_size,
+                                                                           refit_every=k, refit_trigger=refit_trigger)
+            report[k] = {"precision": precision_score(y_test, y_pred, zero_division=0),
+                         "recall": recall_score(y_test, y_pred, zero_division=0),
+                         "accuracy": accuracy_score(y_test, y_pred),
+                         "fits": n_fits}
+            print(f"REFIT EVERY {k} DAYS --- | FITS = {n_fits} | PRECISION = {report[k]['precision']} | RECALL = {report[k]['recall']} | ACCURACY = {report[k]['accuracy']}")
+
+        return report
     
     
     @staticmethod
@@ -206,6 +522,7 @@ class CrossValidateTS:
                                                              awf_splits: int = 5, rwf_max_train_size: int = 500, rwf_test_size: int = 100) -> None:
         """
         Prints the model performance with both - anchored and rolling walking forward CVs, for different thresholds.
+        The thresholds reuse the cached fold probabilities when the fold cache is on (see check_model_awf).
         """
         
         for thr in np.arange(min_threshold, max_threshold+step, step):
@@ -215,6 +532,66 @@ class CrossValidateTS:
             print(f"ANCHORED --- | PRECISION = {a_precision} | RECALL = {a_recall}")
             print(f"ROLLING --- | PRECISION = {r_precision} | RECALL = {r_recall}")
             print("\n\n")
-    
 
-    
+
+
+# Worker state of walk_forward_schedule_parallel: the shared X/y views and the model, set once per worker process
+_worker = {}
+
+
+def _attach_worker(specs: dict, model: object) -> None:
+    arrays, handles = SharedArrays.attach(specs)
+    _worker.update(arrays=arrays, handles=handles, model=model)
+
+
+def _fit_predict_block(fold: Tuple[int, int, int]) -> np.ndarray:
+    train_start, test_start, test_end = fold
+    X, y, model = _worker["arrays"]["X"], _worker["arrays"]["y"], _worker["model"]
+
+    model.fit(X[train_start:test_start], y[train_start:test_start])
+    return model.predict_proba(X[test_start:test_end])[:, 1]
+
+
+def _fit_fold(fold: Tuple[int, int, int, int]) -> Tuple[object, np.ndarray]:
+    train_start, train_end, test_start, test_end = fold
+    X, y, model = _worker["arrays"]["X"], _worker["arrays"]["y"], _worker["model"]
+
+    model.fit(X[train_start:train_end], y[train_start:train_end])
+    return model, model.predict_proba(X[test_start:test_end])[:, 1]     # the fitted model is pickled back with its baseline
+
+
+# Worker state of permutation_importance: the shared X/y views and the fitted model of every fold
+def _attach_importance_worker(specs: dict, models: Dict[int, object], folds: List[Tuple[int, int, int, int]], n_repeats: int, seed: int) -> None:
+    arrays, handles = SharedArrays.attach(specs)
+    _worker.update(arrays=arrays, handles=handles, models=models, folds=folds, n_repeats=n_repeats, seed=seed)
+
+
+def _permute_feature(task: Tuple[int, int]) -> np.ndarray:
+    """Class 1 probabilities (repeats, test) of n_repeats shuffles of one feature inside one test fold."""
+    f, j = task
+    _, _, test_start, test_end = _worker["folds"][f]
+    X_test = _worker["arrays"]["X"][test_start:test_end]
+
+    permuted = X_test.copy()        # the only copy, only column j changes between the repeats
+    probabilities = np.empty((_worker["n_repeats"], len(X_test)))
+    for r in range(_worker["n_repeats"]):
+        permuted[:, j] = X_test[np.random.default_rng([_worker["seed"], f, j, r]).permutation(len(X_test)), j]
+        probabilities[r] = _worker["models"][f].predict_proba(permuted)[:, 1]
+
+    return probabilities
+
+
+def _score(scoring: Callable, y_true: np.ndarray, y_pred: np.ndarray) -> float:
+    """Calls scoring(y_true, y_pred), with zero_division=0 only for the scorers that accept it (not e.g. accuracy_score)."""
+    if _accepts_zero_division(scoring):
+        return scoring(y_true, y_pred, zero_division=0)
+    return scoring(y_true, y_pred)
+
+
+@functools.lru_cache(maxsize=None)
+def _accepts_zero_division(scoring: Callable) -> bool:
+    try:
+        parameters = inspect.signature(scoring).parameters
+    except (TypeError, ValueError):
+        return False
+    return "zero_division" in parameters or any(p.kind is inspect.Parameter.VAR_KEYWORD for p in parameters.values())
@@ -0,0 +1,201 @@
+import functools
+import hashlib
+import os
+import pickle
+import sqlite3
+import time
+import warnings
+import numpy as np
+from typing import Any, Callable, Optional, Tuple
+
+# outside of the package, in the user cache directory (or CRYPTO_EYE_CV_CACHE_PATH)
+CACHE_PATH = os.environ.get("CRYPTO_EYE_CV_CACHE_PATH",
+                            os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")), "crypto_eye", "cv_results.db"))
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+
+
+class ResultCache:
+    """
+    Persistent, size-bounded memoisation of experiment results (SQLite, least recently used entries are evicted first).
+    Keys are content hashes of the estimator parameters, the data and the remaining call arguments,
+    so changing any of them (or the data) makes a new entry instead of returning a stale one.
+    """
+
+
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+                          CREATE TABLE IF NOT EXISTS results (
+                              key TEXT PRIMARY KEY,
+                              value BLOB NOT NULL,
+                              size INTEGER NOT NULL,
+                              last_access REAL NOT NULL);
+                          """)
+        self.conn.commit()
+
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Returns (True, value) on a hit and (False, None) on a miss."""
+        row = self.conn.execute("""SELECT value FROM results WHERE key = ?;""", (key,)).fetchone()
+        if row is None:
+            return False, None
+
+        self.conn.execute("""UPDATE results SET last_access = ? WHERE key = ?;""", (time.time(), key))
+        self.conn.commit()
+        return True, pickle.loads(row[0])
+
+
+    def put(self, key: str, value: Any) -> None:
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self.conn:
+            self.conn.execute("""INSERT OR REPLACE INTO results (key, value, size, last_access) VALUES (?, ?, ?, ?);""",
+                              (key, blob, len(blob), time.time()))
+            self.__evict()
+
+
+    def clear(self) -> None:
+        with self.conn:
+            self.conn.execute("""DELETE FROM results;""")
+
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+    def __evict(self) -> None:
+        """Deletes the least recently used entries until the cache fits into max_bytes."""
+        total = self.conn.execute("""SELECT COALESCE(SUM(size), 0) FROM results;""").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, size in self.conn.execute("""SELECT key, size FROM results ORDER BY last_access;""").fetchall():
+            self.conn.execute("""DELETE FROM results WHERE key = ?;""", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+
+    @staticmethod
+    def make_key(func: Callable, arguments: dict) -> str:
+        digest = hashlib.sha256(func.__qualname__.encode())
+        for name, value in sorted(arguments.items()):
+            digest.update(name.encode())
+            _update_fingerprint(digest, value)
+        return digest.hexdigest()
+
+
+
+def _update_fingerprint(digest: "hashlib._Hash", value: Any) -> None:
+    """Feeds a stable fingerprint of the value into the digest (content of arrays, parameters of estimators, identity of functions)."""
+    if isinstance(value, np.ndarray):
+        array = np.ascontiguousarray(value)
+        digest.update(f"ndarray{array.shape}{array.dtype.str}".encode())
+        digest.update(array.view(np.uint8).data if array.size else b"")
+
+    elif hasattr(value, "get_params") and hasattr(value, "fit"):
+        digest.update(f"{type(value).__module__}.{type(value).__qualname__}".encode())
+        for name, param in sorted(value.get_params(deep=False).items()):
+            digest.update(name.encode())
+            _update_fingerprint(digest, param)
+
+    elif isinstance(value, functools.partial):
+        _update_fingerprint(digest, (value.func, value.args, value.keywords))
+
+    elif callable(value) and hasattr(value, "__qualname__"):
+        digest.update(f"{getattr(value, '__module__', '')}.{value.__qualname__}".encode())
+        if "<locals>" in value.__qualname__:        # only nested functions: a module level one is closed over its decorators (e.g. sklearn's validation)
+            for cell in getattr(value, "__closure__", None) or ():     # e.g. the parameters of a refit trigger
+                _update_fingerprint(digest, cell.cell_contents)
+        _update_fingerprint(digest, getattr(value, "__defaults__", None))
+
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            _update_fingerprint(digest, item)
+
+    elif isinstance(value, dict):
+        _update_fingerprint(digest, sorted(value.items(), key=lambda item: repr(item[0])))
+
+    else:
+        digest.update(repr(value).encode())
+
+
+
+_default_cache: Optional[ResultCache] = None
+_warned_unseeded = set()
+_enabled = os.environ.get("CRYPTO_EYE_CV_CACHE", "0") == "1"     # opt-in: a cached fold leaves the estimator unfitted
+
+
+def get_default_cache() -> Optional[ResultCache]:
+    """Returns the shared cache (created on first use), or None when caching is disabled (the default, CRYPTO_EYE_CV_CACHE=1 enables it)."""
+    global _default_cache
+    if _enabled and _default_cache is None:
+        _default_cache = ResultCache()
+    return _default_cache if _enabled else None
+
+
+def set_default_cache(cache: Optional[ResultCache]) -> None:
+    """Replaces the shared cache; None disables caching."""
+    global _default_cache, _enabled
+    _default_cache, _enabled = cache, cache is not None
+
+
+def get_fold_cache(model: object) -> Optional[ResultCache]:
+    """
+    Returns the default cache for the folds of the model, None when caching is disabled or the model is not seeded:
+    the folds of an estimator with random_state=None change from run to run, a cached draw would hide that variance.
+    """
+    cache = get_default_cache()
+    if cache is None:
+        return None
+
+    params = model.get_params(deep=True) if hasattr(model, "get_params") else {}
+    unseeded = [name for name, value in params.items() if name.split("__")[-1] == "random_state" and value is None]
+    if unseeded and type(model) not in _warned_unseeded:     # once per class, sklearn resets the warning registry while fitting
+        _warned_unseeded.add(type(model))
+        warnings.warn(f"{type(model).__name__} is not seeded ({', '.join(unseeded)} = None), its folds are not cached."
+                      " Set random_state to cache them.", stacklevel=3)
+    if unseeded:
+        return None
+    return cache
+
+
+def fold_key(tag: str, model: object, X: np.ndarray, y: np.ndarray, train: slice, test: slice, **arguments) -> str:
+    """
+    Key of one walk forward fold: the estimator params, the bounds of the training and test slices, the content of
+    those slices only and the remaining arguments. Extending X with new rows changes only the folds that read them.
+    """
+    digest = hashlib.sha256(tag.encode())
+    _update_fingerprint(digest, model)
+    for part in (train, test):
+        digest.update(f"slice{part.start}:{part.stop}".encode())
+        _update_fingerprint(digest, X[part])
+        _update_fingerprint(digest, y[part])
+    for name, value in sorted(arguments.items()):
+        digest.update(name.encode())
+        _update_fingerprint(digest, value)
+    return digest.hexdigest()
+
+
+def cached_fold(tag: str, compute: Callable[[], Any], model: object, X: np.ndarray, y: np.ndarray, train: slice, test: slice, **arguments) -> Any:
+    """
+    Memoises the output of compute() for one fold in the default ResultCache, keyed by fold_key
+    (not for unseeded estimators, see get_fold_cache). On a hit the estimator passed in is not fitted.
+    """
+    cache = get_fold_cache(model)
+    if cache is None:
+        return compute()
+
+    key = fold_key(tag, model, X, y, train, test, **arguments)
+    hit, value = cache.get(key)
+    if hit:
+        return value
+
+    value = compute()
+    cache.put(key, value)
+    return value
@@ -0,0 +1,82 @@
+import sys
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+from typing import Dict, List, Tuple
+
+
+class SharedArrays:
+    """
+    Publishes NumPy arrays (e.g. the feature matrix and the labels) once into shared memory.
+    Worker processes attach to them by name and only receive index ranges per task, so nothing
+    is pickled per task and the memory does not grow with the number of workers.
+
+    Usage:
+        with SharedArrays(X=X, y=y) as shared:
+            specs = shared.get_specs()      # small, picklable
+            ...                             # in the worker: arrays, handles = SharedArrays.attach(specs)
+    """
+
+
+    def __init__(self, **arrays: np.ndarray):
+        self.blocks: Dict[str, shared_memory.SharedMemory] = {}
+        self.specs: Dict[str, Tuple[str, tuple, str]] = {}
+
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array     # the only copy
+
+            self.blocks[name] = block
+            self.specs[name] = (block.name, array.shape, array.dtype.str)
+
+
+    def get_specs(self) -> Dict[str, Tuple[str, tuple, str]]:
+        """Returns name -> (shared memory name, shape, dtype) for attaching in the workers."""
+        return self.specs
+
+
+    @staticmethod
+    def attach(specs: Dict[str, Tuple[str, tuple, str]]) -> Tuple[Dict[str, np.ndarray], List[shared_memory.SharedMemory]]:
+        """
+        Attaches to published arrays without copying them.
+
+        Returns:
+            Tuple[Dict[str, np.ndarray], List[shared_memory.SharedMemory]]: The read-only array views and the handles
+            that have to stay referenced (and be closed) as long as the views are used.
+        """
+        arrays, handles = {}, []
+        for name, (block_name, shape, dtype) in specs.items():
+            if sys.version_info >= (3, 13):
+                block = shared_memory.SharedMemory(name=block_name, track=False)
+            else:
+                # the publisher owns the block: attaching must not register it with the resource tracker,
+                # otherwise the tracker unlinks (or double-unlinks) it when a worker exits
+                register = resource_tracker.register
+                resource_tracker.register = lambda *args, **kwargs: None
+                try:
+                    block = shared_memory.SharedMemory(name=block_name)
+                finally:
+                    resource_tracker.register = register
+
+            array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+            array.flags.writeable = False
+            arrays[name] = array
+            handles.append(block)
+
+        return arrays, handles
+
+
+    def close(self) -> None:
+        """Releases and removes the shared memory blocks."""
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks = {}
+
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+
+    def __exit__(self, *exc) -> None:
+        self.close()
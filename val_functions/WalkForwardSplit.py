@@ -0,0 +1,88 @@
+import numpy as np
+from typing import Iterator, List, Optional, Tuple
+
+
+class WalkForwardSplit:
+    """
+    Walk forward fold generator that yields contiguous `slice` objects instead of index arrays,
+    so X[train], y[train] are views and a fold costs O(1) memory whatever the size of the training window.
+
+    - anchored (max_train_size=None): the training window always starts at the first row.
+    - rolling (max_train_size=n): the training window holds at most the n rows before the test fold.
+    - real-time-scenario: rolling with test_size=1 over the last n_days rows (see real_time_scenario).
+
+    gap purges the rows between the end of the training window and the test fold, embargo skips rows after
+    every test fold before the next one starts. Compatible with sklearn's cv= protocol (split / get_n_splits);
+    with indices=True index arrays are yielded instead of slices, for the sklearn utilities that need them.
+    """
+
+
+    def __init__(self, n_splits: int = 5, test_size: Optional[int] = None, max_train_size: Optional[int] = None,
+                 gap: int = 0, embargo: int = 0, first_test: Optional[int] = None, indices: bool = False):
+        """
+        Parameters:
+            n_splits (int): The number of folds (ignored when first_test is given). Default is 5.
+            test_size (int, optional): Rows per test fold. Defaults to n_samples // (n_splits + 1), like TimeSeriesSplit.
+            max_train_size (int, optional): Maximum rows of the training window. None means anchored.
+            gap (int): Rows purged between the training window and the test fold. Default is 0.
+            embargo (int): Rows skipped after every test fold. Default is 0.
+            first_test (int, optional): First row of the first test fold (negative counts from the end). Folds then continue
+                                        until the last row, the last fold may be shorter.
+            indices (bool): Yield np.arange index arrays instead of slices. Default is False.
+        """
+        self.n_splits = n_splits
+        self.test_size = test_size
+        self.max_train_size = max_train_size
+        self.gap = gap
+        self.embargo = embargo
+        self.first_test = first_test
+        self.indices = indices
+
+
+    @classmethod
+    def real_time_scenario(cls, n_days: int, max_train_size: int, refit_every: int = 1) -> "WalkForwardSplit":
+        """Folds of CrossValidateTS.cross_validate_rts: the last n_days rows, refit_every rows per fold."""
+        return cls(test_size=refit_every, max_train_size=max_train_size, first_test=-n_days)
+
+
+    def get_folds(self, n_samples: int) -> List[Tuple[int, int, int, int]]:
+        """Returns the (train_start, train_end, test_start, test_end) bounds of every fold."""
+        if self.first_test is None:
+            test_size = self.test_size or n_samples // (self.n_splits + 1)
+            first = n_samples - self.n_splits * test_size - (self.n_splits - 1) * self.embargo
+            starts = [first + i * (test_size + self.embargo) for i in range(self.n_splits)]
+        else:
+            test_size = self.test_size or 1
+            first = self.first_test if self.first_test >= 0 else n_samples + self.first_test
+            starts = list(range(first, n_samples, test_size + self.embargo))
+
+        folds = []
+        for test_start in starts:
+            train_end = test_start - self.gap
+            train_start = 0 if self.max_train_size is None else max(0, train_end - self.max_train_size)
+            if test_size <= 0 or train_end <= train_start:
+                raise ValueError(f"Too few samples ({n_samples}) for the requested folds.")
+            folds.append((train_start, train_end, test_start, min(test_start + test_size, n_samples)))
+
+        return folds
+
+
+    def split_slices(self, X, y=None, groups=None) -> Iterator[Tuple[slice, slice]]:
+        for train_start, train_end, test_start, test_end in self.get_folds(len(X)):
+            yield slice(train_start, train_end), slice(test_start, test_end)
+
+
+    def split(self, X, y=None, groups=None) -> Iterator[tuple]:
+        for train, test in self.split_slices(X):
+            if self.indices:
+                yield np.arange(train.start, train.stop), np.arange(test.start, test.stop)
+            else:
+                yield train, test
+
+
+    def get_n_splits(self, X=None, y=None, groups=None) -> int:
+        if self.first_test is None:
+            return self.n_splits
+        if X is None:
+            raise ValueError("X is needed to count the folds when first_test is given.")
+        return len(self.get_folds(len(X)))